@@ -1,11 +1,23 @@
 """
 Mesin analisis saham IDX: Teknikal, Fundamental, Bandarmology, Korelasi Makro.
 Menggunakan yfinance + pandas (tanpa pandas_ta agar kompatibel Python 3.14).
+run_full_analysis menjalankan fetch I/O (riwayat, fundamental, makro) paralel dengan batas waktu per tahap.
 """
+import time
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
-import yfinance as yf
 import numpy as np
 
+import data_provider
+import fundamentals_store
+import history_store
+import indicators
+import memo
+import online_indicators
+import pivot_zones
+import rate_limiter
+from quant_engine import aligned_returns, rolling_corr_beta
+
 # Saham LQ45 (contoh) untuk Big Caps / Foreign Flow proxy
 LQ45_TICKERS = {
     "BBCA", "BBRI", "BMRI", "BNGA", "BBNI", "ASII", "GOTO", "TLKM", "ICBP", "UNVR",
@@ -14,6 +26,14 @@ LQ45_TICKERS = {
     "AKRA", "BUKA", "EMTK", "EXCL", "GOTO", "BREN", "BUMI", "CTRA", "HRUM", "PGAS",
 }
 
+# Executor bersama untuk tahap I/O run_full_analysis dan batas waktu (detik, sejak analisis dimulai) per tahap.
+# Tahap yang lewat batas dikembalikan kosong/default agar halaman tidak menunggu panggilan paling lambat.
+_IO_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="analysis-io")
+_STAGE_DEADLINE_SEC = {"history": 25.0, "fundamental": 8.0, "macro": 8.0}
+
+# Zona pivot terdekat dipakai di rencana trading bila jaraknya dari harga tidak lebih dari 10%
+_PLAN_ZONE_RANGE = 0.10
+
 # Mapping sektor -> simbol komoditas/makro untuk korelasi
 SECTOR_MACRO = {
     "energi": ["ADRO", "PTBA", "ITMG", "ARII", "BUMI", "BYAN", "DOID", "HRUM", "PGAS", "AKRA"],
@@ -31,11 +51,10 @@ def ensure_jk(ticker: str) -> str:
 
 
 def get_history(ticker: str, period: str = "1y") -> pd.DataFrame:
-    """Ambil historis harga dari yfinance. Tangani ketika yfinance mengembalikan None atau error."""
+    """Ambil historis harga dari history store lokal (yfinance hanya untuk bar baru). Tangani None atau error."""
     t = ensure_jk(ticker)
     try:
-        obj = yf.Ticker(t)
-        df = obj.history(period=period, auto_adjust=True)
+        df = history_store.get_history(t, period)
         if df is None or df.empty or len(df) < 30:
             return pd.DataFrame()
         return df
@@ -43,18 +62,8 @@ def get_history(ticker: str, period: str = "1y") -> pd.DataFrame:
         return pd.DataFrame()
 
 
-# --- A. TEKNIKAL & TREN (tanpa pandas_ta: murni pandas/numpy) ---
-def _rsi(series: pd.Series, period: int = 14) -> pd.Series:
-    """RSI(14) dari harga penutupan."""
-    delta = series.diff()
-    gain = delta.where(delta > 0, 0.0)
-    loss = (-delta).where(delta < 0, 0.0)
-    avg_gain = gain.rolling(period, min_periods=period).mean()
-    avg_loss = loss.rolling(period, min_periods=period).mean()
-    rs = avg_gain / avg_loss.replace(0, np.nan)
-    return 100 - (100 / (1 + rs))
-
-
+# --- A. TEKNIKAL & TREN (tanpa pandas_ta: kernel bersama di indicators.py) ---
+@memo.memoize
 def add_technical_indicators(df: pd.DataFrame) -> pd.DataFrame:
     """Tambahkan Bollinger Bands (20,2), MA20, MA50, MA200, RSI(14)."""
     if df.empty or len(df) < 50:
@@ -62,19 +71,17 @@ def add_technical_indicators(df: pd.DataFrame) -> pd.DataFrame:
     df = df.copy()
     close = df["Close"]
     # Moving Averages
-    df["MA20"] = close.rolling(20).mean()
-    df["MA50"] = close.rolling(50).mean()
-    df["MA200"] = close.rolling(200).mean()
+    df["MA20"] = indicators.sma(close, 20)
+    df["MA50"] = indicators.sma(close, 50)
+    df["MA200"] = indicators.sma(close, 200)
     # Bollinger Bands (20, 2)
-    df["BB_mid"] = close.rolling(20).mean()
-    std20 = close.rolling(20).std()
-    df["BB_upper"] = df["BB_mid"] + 2 * std20
-    df["BB_lower"] = df["BB_mid"] - 2 * std20
+    df["BB_mid"], df["BB_upper"], df["BB_lower"] = indicators.bollinger(close, 20, 2)
     # RSI(14)
-    df["RSI"] = _rsi(close, 14)
+    df["RSI"] = indicators.rsi(close, 14)
     return df
 
 
+@memo.memoize
 def get_technical_summary(df: pd.DataFrame) -> dict:
     """
     Ringkasan teknikal: tren (Strong Uptrend / Downtrend), RSI (Oversold/Overbought),
@@ -152,13 +159,18 @@ def get_bandarmology_signal(df: pd.DataFrame, ticker: str) -> dict:
         return {"signal": "-", "big_cap_flow": False, "description": "Data belum cukup"}
 
     sym = ticker.replace(".JK", "").upper()
-    df = df.copy()
-    df["Vol_Avg20"] = df["Volume"].rolling(20).mean()
-    df["Price_Change"] = df["Close"].pct_change()
-    row = df.iloc[-1]
-    vol = row["Volume"]
-    avg_vol = row["Vol_Avg20"]
-    price_chg = row["Price_Change"]
+    # State indikator berjalan per ticker: hanya bar baru yang dihitung, bukan rolling ulang seluruh riwayat.
+    # Dikunci pada riwayat penuh tersimpan (awal tetap), bukan slice period yang bergeser setiap hari.
+    try:
+        full = history_store.get_history(ensure_jk(ticker), "max")
+    except Exception:
+        full = None
+    if full is None or full.empty or full.index[-1] != df.index[-1]:
+        full = df
+    live = online_indicators.sync(f"{ensure_jk(ticker)}_1d", full)
+    vol = live["Volume"]
+    avg_vol = live["Vol_Avg20"]
+    price_chg = live["Price_Change"]
 
     signal = "-"
     desc = []
@@ -187,14 +199,11 @@ def get_bandarmology_signal(df: pd.DataFrame, ticker: str) -> dict:
     # Volume Z-Score: (Volume Hari Ini - Rata2 Volume 20d) / Std Dev Volume 20d
     volume_zscore = None
     volume_spike_extreme = False
-    if "Volume" in df.columns and len(df) >= 20:
-        vol_series = df["Volume"].iloc[-21:-1]  # 20 hari sebelum hari ini
-        mean_vol = vol_series.mean()
-        std_vol = vol_series.std()
-        if pd.notna(mean_vol) and pd.notna(std_vol) and std_vol > 0:
-            volume_zscore = float((vol - mean_vol) / std_vol)
-            if volume_zscore > 3:
-                volume_spike_extreme = True
+    mean_vol, std_vol = live["Vol_Avg20_prev"], live["Vol_Std20_prev"]  # 20 hari sebelum hari ini
+    if pd.notna(mean_vol) and pd.notna(std_vol) and std_vol > 0:
+        volume_zscore = float((vol - mean_vol) / std_vol)
+        if volume_zscore > 3:
+            volume_spike_extreme = True
 
     return {
         "signal": signal,
@@ -212,10 +221,14 @@ def get_fundamental_summary(ticker: str) -> dict:
     Dari yfinance ticker.info: PER, PBV, ROE, DER.
     Hidden Gem: PER < 10 dan ROE > 15%.
     High Debt Risk: DER > 1.5 (kecuali bank).
+    Dibaca dari fundamentals_store (cache disk, diperbarui sekali per hari bursa setelah tutup).
     """
-    t = ensure_jk(ticker)
-    obj = yf.Ticker(t)
-    info = obj.info
+    return fundamentals_store.get_fundamentals(ensure_jk(ticker), _fetch_fundamental_summary)
+
+
+def _fetch_fundamental_summary(t: str) -> dict:
+    """Ambil dan ringkas yf.Ticker(t).info (lambat; dipanggil lewat fundamentals_store)."""
+    info = rate_limiter.call(data_provider.info, t)
     if not info or info.get("regularMarketPrice") is None:
         return {"error": "Data fundamental tidak tersedia", "per": None, "pbv": None, "roe": None, "der": None}
 
@@ -248,7 +261,7 @@ def get_fundamental_summary(ticker: str) -> dict:
         "roe": roe,
         "der": der,
         "labels": labels,
-        "company_name": info.get("shortName") or info.get("longName") or ticker,
+        "company_name": info.get("shortName") or info.get("longName") or t,
         "sector": info.get("sector") or "-",
         "industry": info.get("industry") or "-",
     }
@@ -275,14 +288,42 @@ def get_macro_correlation_data(ticker: str, period: str = "6mo") -> pd.DataFrame
     if not macro_sym:
         return pd.DataFrame()
     try:
-        return yf.Ticker(macro_sym).history(period=period, auto_adjust=True)
+        return rate_limiter.call(data_provider.history, macro_sym, period=period, auto_adjust=True,
+                                 validate=rate_limiter.non_empty)
     except Exception:
         return pd.DataFrame()
 
 
+def _daily_close(df: pd.DataFrame) -> pd.Series:
+    """Close per tanggal kalender tanpa zona waktu (agar saham IDX dan simbol luar negeri bisa di-align)."""
+    s = df["Close"].astype(float)
+    index = pd.DatetimeIndex(s.index)
+    s.index = (index.tz_localize(None) if index.tz is not None else index).normalize()
+    return s[~s.index.duplicated(keep="last")]
+
+
+def get_macro_link(stock_df: pd.DataFrame, macro_df: pd.DataFrame, windows: tuple = (20, 60)) -> dict:
+    """
+    Korelasi & beta return harian saham vs simbol makro per window (kernel yang sama dengan matriks universe,
+    macro_correlation). Return {window: {"corr", "beta"}}; window tanpa cukup data (3/4 window) dilewati.
+    """
+    if stock_df is None or macro_df is None or stock_df.empty or macro_df.empty:
+        return {}
+    close = _daily_close(stock_df).to_frame("stock")
+    stock_ret, macro_ret = aligned_returns(close, _daily_close(macro_df).to_frame("macro"))
+    out = {}
+    for w in windows:
+        corr, beta = rolling_corr_beta(stock_ret.iloc[-w:], macro_ret.iloc[-w:], w, max(10, w * 3 // 4))
+        if len(corr) and not np.isnan(corr[-1, 0, 0]):
+            out[w] = {"corr": float(corr[-1, 0, 0]), "beta": float(beta[-1, 0, 0])}
+    return out
+
+
 def get_macro_narrative(ticker: str, stock_df: pd.DataFrame, macro_df: pd.DataFrame) -> str:
     """
     Narasi korelasi: misal "Harga ANTM turun, tapi Emas Global naik. Divergensi Positif (Peluang)."
+    Arah 1 bulan (22 bar) saham vs makro dibaca bersama korelasi return harian 60/20 hari: divergensi hanya
+    disebut peluang/waspada bila saham memang berkorelasi dengan makronya (korelasi >= 0.3).
     """
     if macro_df.empty or stock_df.empty or len(stock_df) < 5 or len(macro_df) < 5:
         return ""
@@ -291,21 +332,38 @@ def get_macro_narrative(ticker: str, stock_df: pd.DataFrame, macro_df: pd.DataFr
     if not macro_label:
         return ""
 
-    # Sederhana: perubahan 1 bulan terakhir
+    # Arah 1 bulan terakhir
     stock_recent = stock_df["Close"].iloc[-1] / stock_df["Close"].iloc[-min(22, len(stock_df))] - 1
     macro_recent = macro_df["Close"].iloc[-1] / macro_df["Close"].iloc[-min(22, len(macro_df))] - 1
 
     stock_dir = "naik" if stock_recent > 0.02 else ("turun" if stock_recent < -0.02 else "stagnan")
     macro_dir = "naik" if macro_recent > 0.02 else ("turun" if macro_recent < -0.02 else "stagnan")
 
+    link = get_macro_link(stock_df, macro_df)
+    main = link.get(60) or link.get(20)
+    stats = ""
+    if main is not None:
+        parts = [f"{w} hari {v['corr']:+.2f} (beta {v['beta']:.2f})" for w, v in sorted(link.items(), reverse=True)]
+        stats = " Korelasi return harian: " + ", ".join(parts) + "."
+        if link.get(20) and link.get(60) and link[20]["corr"] - link[60]["corr"] <= -0.3:
+            stats += " Korelasi jangka pendek melemah tajam (hubungan sedang putus)."
+
     sym = ticker.replace(".JK", "")
-    if stock_dir == "turun" and macro_dir == "naik":
-        return f"Harga {sym} turun, tapi {macro_label} sedang naik. Ada Divergensi Positif (peluang koreksi ke atas)."
-    if stock_dir == "naik" and macro_dir == "turun":
-        return f"Harga {sym} naik sementara {macro_label} turun. Waspada divergensi negatif."
+    if main is not None and abs(main["corr"]) < 0.3:
+        return (
+            f"Saham {sym} ({stock_dir}) dan {macro_label} ({macro_dir}) berkorelasi lemah; "
+            f"pergerakan makro kurang menjelaskan harga saham saat ini.{stats}"
+        )
+    linked = main is None or main["corr"] >= 0.3
+    if linked and stock_dir == "turun" and macro_dir == "naik":
+        return f"Harga {sym} turun, tapi {macro_label} sedang naik. Ada Divergensi Positif (peluang koreksi ke atas).{stats}"
+    if linked and stock_dir == "naik" and macro_dir == "turun":
+        return f"Harga {sym} naik sementara {macro_label} turun. Waspada divergensi negatif.{stats}"
+    if main is not None and main["corr"] <= -0.3:
+        return f"Harga {sym} cenderung bergerak berlawanan dengan {macro_label} (korelasi negatif). Saham {stock_dir}, makro {macro_dir}.{stats}"
     if stock_dir == macro_dir and macro_dir != "stagnan":
-        return f"Harga {sym} dan {macro_label} bergerak searah ({macro_dir}) - korelasi positif."
-    return f"Konteks makro: {macro_label}. Saham {sym} ({stock_dir}), komoditas ({macro_dir})."
+        return f"Harga {sym} dan {macro_label} bergerak searah ({macro_dir}) - korelasi positif.{stats}"
+    return f"Konteks makro: {macro_label}. Saham {sym} ({stock_dir}), komoditas ({macro_dir}).{stats}"
 
 
 # --- KEY LEVELS (52w, 20d - untuk telaah mendalam) ---
@@ -339,26 +397,33 @@ def get_obv(df: pd.DataFrame) -> pd.Series:
     """On-Balance Volume: kumulatif +Volume jika Close naik, -Volume jika Close turun."""
     if df is None or df.empty or "Volume" not in df.columns or "Close" not in df.columns:
         return pd.Series(dtype=float)
-    close = df["Close"]
-    vol = df["Volume"].fillna(0)
-    direction = np.where(close > close.shift(1), 1, np.where(close < close.shift(1), -1, 0))
-    obv = (vol * direction).cumsum()
-    return obv
+    return indicators.obv(df["Close"], df["Volume"])
 
 
 # --- SUPPORT & RESISTANCE (swing high/low sederhana) ---
-def get_support_resistance(df: pd.DataFrame, lookback: int = 20) -> dict:
+def get_support_resistance(df: pd.DataFrame, lookback: int = 20, ticker: str = None) -> dict:
     """
-    Support/Resistance dari swing high dan swing low (local max/min) dalam lookback.
+    Support/Resistance dari zona swing pivot harian, mingguan dan bulanan (pivot_zones, cache per ticker +
+    bar terakhir). Return harga tengah 3 zona terdekat tiap sisi (support turun, resistance naik) plus detail
+    zona (rentang, jumlah sentuhan, timeframe). Riwayat terlalu pendek untuk pivot: High/Low ekstrem `lookback` bar.
     Berguna untuk area entry dan target.
     """
     if df is None or len(df) < lookback:
-        return {"support": [], "resistance": []}
+        return {"support": [], "resistance": [], "support_zones": [], "resistance_zones": []}
+    zones = pivot_zones.get_zones(ticker, df)
+    if zones["support"] or zones["resistance"]:
+        sup, res = zones["support"][:3], zones["resistance"][:3]
+        return {
+            "support": [z["price"] for z in sup],
+            "resistance": [z["price"] for z in res],
+            "support_zones": sup,
+            "resistance_zones": res,
+        }
     high = df["High"].iloc[-lookback:]
     low = df["Low"].iloc[-lookback:]
     res = high.nlargest(3).tolist()
     sup = low.nsmallest(3).tolist()
-    return {"support": sorted(set(sup)), "resistance": sorted(set(res), reverse=True)}
+    return {"support": sorted(set(sup)), "resistance": sorted(set(res), reverse=True), "support_zones": [], "resistance_zones": []}
 
 
 # --- RINGKASAN TELAAH (narasi terstruktur, jelas dan rinci) ---
@@ -546,10 +611,11 @@ def get_recommendation(
 
 
 # --- TRADING PLAN (Support / Resistance / SL) ---
-def get_trading_plan(df: pd.DataFrame) -> dict:
+def get_trading_plan(df: pd.DataFrame, ticker: str = None) -> dict:
     """
-    Rencana trading: Buy Area (support / lower BB), Target (resistance / upper BB),
-    Stop Loss 3-5% di bawah support.
+    Rencana trading: Buy Area (zona pivot support terdekat / lower BB), Target (zona pivot resistance
+    terdekat / upper BB), Stop Loss 3-5% di bawah support. Zona pivot dipakai bila berada dalam
+    _PLAN_ZONE_RANGE dari harga; selain itu Bollinger.
     """
     if df.empty or len(df) < 20:
         return {"buy_area": "-", "target_profit": "-", "stop_loss": "-", "support": None, "resistance": None, "stop_loss_value": None, "current_price": None}
@@ -560,14 +626,25 @@ def get_trading_plan(df: pd.DataFrame) -> dict:
 
     support = float(row["BB_lower"]) if "BB_lower" in df.columns and pd.notna(row.get("BB_lower")) else (close * 0.97 if close > 0 else 0)
     resistance = float(row["BB_upper"]) if "BB_upper" in df.columns and pd.notna(row.get("BB_upper")) else close * 1.03
+    support_label, resistance_label = "Support / Lower Bollinger", "Resistance / Upper Bollinger"
+
+    zones = pivot_zones.get_zones(ticker, df)
+    sup_zone = pivot_zones.nearest(zones, "support")
+    res_zone = pivot_zones.nearest(zones, "resistance")
+    if sup_zone is not None and sup_zone["price"] >= close * (1 - _PLAN_ZONE_RANGE):
+        support = sup_zone["price"]
+        support_label = f"Zona support {sup_zone['timeframes']}, {sup_zone['touches']}x sentuh"
+    if res_zone is not None and res_zone["price"] <= close * (1 + _PLAN_ZONE_RANGE):
+        resistance = res_zone["price"]
+        resistance_label = f"Zona resistance {res_zone['timeframes']}, {res_zone['touches']}x sentuh"
 
     # Stop loss 3-5% di bawah support
     sl_pct = 0.04
     stop_loss = support * (1 - sl_pct)
 
     return {
-        "buy_area": f"Rp {support:,.0f} (Support / Lower Bollinger)",
-        "target_profit": f"Rp {resistance:,.0f} (Resistance / Upper Bollinger)",
+        "buy_area": f"Rp {support:,.0f} ({support_label})",
+        "target_profit": f"Rp {resistance:,.0f} ({resistance_label})",
         "stop_loss": f"Rp {stop_loss:,.0f} (≈4% di bawah support)",
         "support": support,
         "resistance": resistance,
@@ -577,12 +654,31 @@ def get_trading_plan(df: pd.DataFrame) -> dict:
 
 
 # --- FULL ANALYSIS ---
+def _await_stage(future, started: float, stage: str, default, partial: list):
+    """Tunggu hasil tahap I/O sampai batas waktunya; jika timeout/error, catat di partial dan pakai default."""
+    remaining = max(_STAGE_DEADLINE_SEC[stage] - (time.monotonic() - started), 0.0)
+    try:
+        return future.result(timeout=remaining)
+    except Exception:
+        partial.append(stage)
+        return default
+
+
 def run_full_analysis(ticker: str, period: str = "1y") -> dict:
     """
     Jalankan semua analisis dan return satu dict untuk UI.
+    Riwayat harga, fundamental (yf .info, lambat) dan data makro diambil paralel; indikator teknikal
+    dihitung begitu riwayat tiba. Tahap yang melewati _STAGE_DEADLINE_SEC diisi default dan namanya
+    dicatat di "partial" (mis. ["fundamental"]) sehingga halaman tetap tampil.
     """
     t = ensure_jk(ticker)
-    df = get_history(t, period)
+    started = time.monotonic()
+    partial = []
+    f_history = _IO_EXECUTOR.submit(get_history, t, period)
+    f_fundamental = _IO_EXECUTOR.submit(get_fundamental_summary, t)
+    f_macro = _IO_EXECUTOR.submit(get_macro_correlation_data, t, "6mo")
+
+    df = _await_stage(f_history, started, "history", pd.DataFrame(), partial)
     if df.empty:
         return {
             "success": False,
@@ -593,14 +689,17 @@ def run_full_analysis(ticker: str, period: str = "1y") -> dict:
     df = add_technical_indicators(df)
     technical = get_technical_summary(df)
     bandar = get_bandarmology_signal(df, t)
-    fundamental = get_fundamental_summary(t)
-    plan = get_trading_plan(df)
-
-    macro_df = get_macro_correlation_data(t, "6mo")
-    macro_narrative = get_macro_narrative(t, df, macro_df)
+    plan = get_trading_plan(df, t)
     key_levels = get_key_levels(df)
     obv = get_obv(df)
-    support_resistance = get_support_resistance(df, 20)
+    support_resistance = get_support_resistance(df, 20, t)
+
+    fundamental = _await_stage(f_fundamental, started, "fundamental", {
+        "error": "Data fundamental belum tersedia (timeout). Coba refresh beberapa saat lagi.",
+        "per": None, "pbv": None, "roe": None, "der": None, "labels": [],
+    }, partial)
+    macro_df = _await_stage(f_macro, started, "macro", pd.DataFrame(), partial)
+    macro_narrative = get_macro_narrative(t, df, macro_df)
     insight_summary = get_insight_summary(technical, bandar, fundamental, plan, key_levels)
     recommendation = get_recommendation(t, df, technical, bandar, fundamental, plan, key_levels)
 
@@ -624,4 +723,5 @@ def run_full_analysis(ticker: str, period: str = "1y") -> dict:
         "recommendation": recommendation,
         "data_as_of": data_as_of,
         "trading_days_count": len(df),
+        "partial": partial,
     }
@@ -18,22 +18,34 @@ from data_engine import get_stock_data, get_benchmark, get_stock_and_benchmark
 from quant_engine import compute_atr, safe_entry_calculator, compute_mansfield_rs, compute_seasonality
 from sentiment_engine import sentiment_score, gauge_value
 from utils import format_idr, format_pct
-from market_scanner import run_scan, get_ihsg_today, get_intraday_15m, vwap_intraday, fetch_market_data, get_top_sectors
+import history_store
+import seasonality_cube
+import macro_correlation
+from market_scanner import LQ45, run_scan, run_custom_screens, get_rs_leaderboard, get_ihsg_today, get_intraday_15m, vwap_intraday, fetch_market_data, get_top_sectors
 from macro_engine import calculate_market_mood, get_macro_indicators
+from cache_warmer import read_warm
+from screen_dsl import PRESETS as SCREEN_PRESETS
+import circuit_breaker
 
 
+# Hasil hangat dari cache_warmer.py (proses terpisah) dipakai jika ada; hitung sendiri hanya jika basi/absen
 @st.cache_data(ttl=120)
 def _cached_market_mood():
-    return calculate_market_mood()
+    warm = read_warm("market_mood")
+    return warm if warm is not None else calculate_market_mood()
 
 
 @st.cache_data(ttl=120)
 def _cached_macro_indicators():
-    return get_macro_indicators()
+    warm = read_warm("macro_indicators")
+    return warm if warm is not None else get_macro_indicators()
 
 
 @st.cache_data(ttl=120)
 def _cached_sector_leaderboard():
+    warm = read_warm("sector_leaderboard")
+    if warm is not None:
+        return warm
     data = fetch_market_data()
     return get_top_sectors(data) if data else []
 
@@ -345,6 +357,9 @@ with st.sidebar:
     st.caption(f"Simbol: {ticker}")
 
 # --- Main content ---
+if circuit_breaker.is_open():
+    st.warning("Yahoo Finance sedang gangguan. Menampilkan data tersimpan terakhir (mungkin basi); pembaruan dicoba otomatis berkala.")
+
 if menu == "Peluang Hari Ini":
     # ========== DAILY OPPORTUNITY DASHBOARD (Landing Page) ==========
     st.header("Peluang Hari Ini")
@@ -363,8 +378,16 @@ if menu == "Peluang Hari Ini":
     except Exception:
         st.warning("Data IHSG hari ini tidak tersedia (pasar mungkin tutup).")
 
+    scan_all = st.checkbox("Pindai seluruh bursa (~900 saham)", key="scan_all_universe", help="Lebih lama saat pertama kali; default hanya LQ45 & IDX80.")
     with st.spinner("Memindai pasar..."):
-        scan = run_scan()
+        scan = run_scan(universe="all" if scan_all else "prioritas")
+    if scan_all and not scan.get("universe_from_file", True):
+        st.warning(
+            "Daftar seluruh emiten IDX belum tersedia (file idx_universe.txt / IDX_UNIVERSE_FILE, lihat DEPLOY.md); "
+            "yang dipindai hanya LQ45 & IDX80."
+        )
+    if scan_all and scan.get("failed_chunks"):
+        st.caption(f"{scan['failed_chunks']} kelompok ticker gagal diunduh; hasil dari {scan.get('scanned', 0)} saham lainnya.")
     if scan.get("error"):
         st.warning(scan["error"])
     day_list = scan.get("day_trade") or []
@@ -393,7 +416,8 @@ if menu == "Peluang Hari Ini":
         for i, p in enumerate(swing_list[:3], 1):
             sym = p.get("ticker", "").replace(".JK", "")
             dist = p.get("dist_support_pct", 0)
-            st.markdown(f"**#{i} {sym}** · Jarak ke MA20: **{dist:.2f}%**")
+            zone = f" · Support {format_idr(p['support_zone'], 0)}" if p.get("support_zone") else ""
+            st.markdown(f"**#{i} {sym}** · Jarak ke MA20: **{dist:.2f}%**{zone}")
     with c3:
         st.markdown("**Invest Picks**")
         st.caption("Saham bluechip yang sedang koreksi wajar.")
@@ -402,6 +426,70 @@ if menu == "Peluang Hari Ini":
             disc = p.get("discount_pct", 0)
             st.markdown(f"**#{i} {sym}** · Diskon dari ATH 52w: **{disc:.1f}%**")
 
+    with st.expander("Relative Strength Leaderboard · Mansfield RS vs IHSG"):
+        st.caption("Peringkat kekuatan relatif semua saham hasil pindai. Slope > 0 = RS sedang menguat (10 bar terakhir).")
+        try:
+            rs_board = get_rs_leaderboard(universe="all" if scan_all else "prioritas", top=10)
+        except Exception as e:
+            rs_board = []
+            st.warning(f"RS leaderboard tidak dapat dimuat: {e}")
+        for p in rs_board:
+            sym = p["ticker"].replace(".JK", "")
+            trend = "menguat" if p["slope"] > 0 else "melemah"
+            st.markdown(f"**#{p['rank']} {sym}** · RS **{p['mansfield_rs']:+.2f}** · persentil {p['percentile']:.0f} · {trend}")
+
+    with st.expander("Korelasi Makro · Sektor × Komoditas"):
+        st.caption("Rata-rata korelasi return harian 60 hari saham per sektor terhadap minyak, emas, kurs USD/IDR dan IHSG.")
+        try:
+            corr_matrix = macro_correlation.get_matrix(universe="all" if scan_all else "prioritas")
+            sector_corr = macro_correlation.sector_matrix(corr_matrix, window=60)
+        except Exception as e:
+            sector_corr = pd.DataFrame()
+            st.warning(f"Matriks korelasi tidak dapat dimuat: {e}")
+        if not sector_corr.empty:
+            fig_corr = go.Figure(data=go.Heatmap(
+                z=sector_corr.values,
+                x=sector_corr.columns.tolist(),
+                y=sector_corr.index.tolist(),
+                colorscale="RdBu",
+                zmid=0,
+                zmin=-1,
+                zmax=1,
+                text=[[f"{v:+.2f}" if pd.notna(v) else "" for v in row] for row in sector_corr.values],
+                texttemplate="%{text}",
+                textfont={"size": 11},
+            ))
+            fig_corr.update_layout(
+                template="plotly_dark",
+                height=260,
+                margin=dict(t=20, b=30, l=80, r=20),
+                paper_bgcolor="rgba(0,0,0,0)",
+                plot_bgcolor="rgba(22,27,34,0.4)",
+            )
+            st.plotly_chart(fig_corr, use_container_width=True)
+
+    with st.expander("Screen Kustom"):
+        st.caption(
+            "Satu screen per baris: `nama: ekspresi`. Contoh: `close > ma(200) and rsi(14) between 40 and 65`. "
+            "Nama: open, high, low, close, volume, prev_close, vwap, bars. Fungsi: ma, ema, rsi, macd, macd_signal, "
+            "atr, avg_volume, highest, lowest, change, bb_upper, bb_lower."
+        )
+        default_screens = "\n".join(f"{name}: {expr}" for name, expr in SCREEN_PRESETS.items())
+        screens_text = st.text_area("Screen", value=default_screens, key="custom_screens", height=120, label_visibility="collapsed")
+        screens = {}
+        for line in screens_text.splitlines():
+            name, sep, expr = line.partition(":")
+            if sep and name.strip() and expr.strip():
+                screens[name.strip()] = expr.strip()
+        if screens:
+            custom = run_custom_screens(screens, universe="all" if scan_all else "prioritas")
+            for name, res in custom.items():
+                if res["error"]:
+                    st.warning(f"**{name}**: {res['error']}")
+                    continue
+                picks = ", ".join(f"{p['ticker'].replace('.JK', '')} ({p['pct_change']:+.2f}%)" for p in res["matches"])
+                st.markdown(f"**{name}** · {res['count']} saham lolos" + (f" · {picks}" if picks else ""))
+
     # Instant Chart: Day #1, atau fallback saham defensif #1, atau BBCA
     day_picks = day_list
     if day_picks:
@@ -506,6 +594,11 @@ elif menu == "Analisis Mendalam" or menu == "Market Overview":
     data_as_of = result.get("data_as_of")
     trading_days_count = result.get("trading_days_count", 0)
 
+    _partial_labels = {"fundamental": "fundamental", "macro": "korelasi makro", "history": "riwayat harga"}
+    if result.get("partial"):
+        missing = ", ".join(_partial_labels.get(stage, stage) for stage in result["partial"])
+        st.warning(f"Sebagian data belum tersedia (waktu habis): {missing}. Hasil lain tetap tampil; coba Refresh data beberapa saat lagi.")
+
     # Pilih bagian (radio agar tetap di tab yang sama saat input berubah; st.tabs tidak simpan state saat rerun)
     _tab_names = ["Dashboard Utama", "Manajemen Risiko (ATR)", "Analisis Musiman", "Sentimen Berita"]
     if "analisis_sub_tab" not in st.session_state:
@@ -522,6 +615,7 @@ elif menu == "Analisis Mendalam" or menu == "Market Overview":
     with col_refresh:
         if st.button("Refresh data", help="Perbarui data pasar dan analisis (clear cache)"):
             st.cache_data.clear()
+            history_store.clear_memory()
             st.rerun()
 
     _chart_layout = dict(
@@ -770,9 +864,15 @@ elif menu == "Analisis Mendalam" or menu == "Market Overview":
 
         sr = support_resistance
         if sr.get("support") or sr.get("resistance"):
-            with st.expander("Support & Resistance (20 hari)", expanded=False):
+            with st.expander("Support & Resistance (Zona Pivot Harian/Mingguan/Bulanan)", expanded=False):
                 st.markdown("**Resistance (area jual):** " + ", ".join([format_idr(x) for x in sr.get("resistance", [])]))
                 st.markdown("**Support (area beli):** " + ", ".join([format_idr(x) for x in sr.get("support", [])]))
+                for label, zones in (("R", sr.get("resistance_zones") or []), ("S", sr.get("support_zones") or [])):
+                    for z in zones:
+                        st.caption(
+                            f"{label} · {format_idr(z['low'])} – {format_idr(z['high'])} · {z['touches']}x sentuh · "
+                            f"timeframe {z['timeframes']}"
+                        )
 
         with st.expander("Ringkasan Teknikal & Tren", expanded=True):
             st.markdown(f"**Tren:** {tech['trend']}")
@@ -955,6 +1055,25 @@ elif menu == "Analisis Mendalam" or menu == "Market Overview":
                 wr = seas["win_rate_by_month"]
                 st.caption("Win rate (% bulan positif): " + ", ".join([f"{month_names[i-1]} {wr.get(i, 0):.0f}%" for i in range(1, 13) if i in wr.index]))
 
+        st.subheader("Pemindai Musiman · Win Rate Tertinggi per Bulan")
+        month_labels = ["Jan", "Feb", "Mar", "Apr", "Mei", "Jun", "Jul", "Agu", "Sep", "Okt", "Nov", "Des"]
+        next_month = datetime.now().month % 12 + 1
+        scan_month = st.selectbox("Bulan", list(range(1, 13)), index=next_month - 1, format_func=lambda m: month_labels[m - 1], key="seasonality_scan_month")
+        only_lq45 = st.checkbox("Hanya LQ45", value=True, key="seasonality_scan_lq45")
+        try:
+            seasonal_picks = seasonality_cube.scan(scan_month, tickers=LQ45 if only_lq45 else None, top=10)
+        except Exception as e:
+            seasonal_picks = []
+            st.warning(f"Pemindai musiman tidak dapat dimuat: {e}")
+        if seasonal_picks:
+            for i, p in enumerate(seasonal_picks, 1):
+                sym = p["ticker"].replace(".JK", "")
+                st.markdown(f"**#{i} {sym}** · Win rate **{p['win_rate']:.0f}%** · Rata-rata **{p['avg_return_pct']:+.2f}%** ({p['years']} tahun)")
+        elif seasonality_cube.building():
+            st.info("Data musiman seluruh saham sedang dibangun di background (beberapa menit saat pertama kali). Buka lagi tab ini nanti.")
+        else:
+            st.caption("Belum ada data musiman yang cukup (minimal 5 tahun per saham).")
+
     # ========== TAB 4: Sentimen Berita (Leksikon Indonesia) ==========
     elif sub_tab == "Sentimen Berita":
         st.subheader("Analisis Sentimen Berita · Leksikon Pasar Modal Indonesia")
@@ -0,0 +1,102 @@
+"""
+Bars: representasi ringkas bar harian banyak ticker untuk data pasar yang di-cache (fetch_market_data).
+- dict ticker -> DataFrame membawa index tanggal, blok pandas dan overhead objek per ticker, dan st.cache_data
+  mem-pickle seluruh dict pada setiap hit. BarSet menyimpan OHLC dalam satu array float32 kontigu
+  (4 x tanggal x ticker), Volume int64 (tanggal x ticker) dan satu index tanggal bersama, sehingga
+  pickle/unpickle hanya menyalin beberapa buffer.
+- float32 menyimpan harga IDX (bilangan bulat < 2^24) persis; harga adjusted tetap presisi ~7 digit,
+  jauh di bawah fraksi harga. NaN di Close = tidak ada bar; Open kosong diisi Close (seperti build_panel).
+- panel() memberi view OHLC tanpa salinan untuk screener/indikator (format market_scanner.build_panel).
+- Tetap bisa dipakai seperti dict ticker -> DataFrame (data[ticker], in, items()) untuk kode per ticker;
+  DataFrame dibangun saat diminta.
+"""
+from collections.abc import Mapping
+
+import numpy as np
+import pandas as pd
+
+OHLC_FIELDS = ("Open", "High", "Low", "Close")
+
+
+class BarSet(Mapping):
+    """Bar harian banyak ticker: ohlc float32 (4 x tanggal x ticker), volume int64, index tanggal bersama."""
+
+    def __init__(self, index: pd.DatetimeIndex, tickers, ohlc: np.ndarray, volume: np.ndarray, rows: np.ndarray, last: np.ndarray):
+        self.index = index
+        self.tickers = np.asarray(tickers, dtype=object)
+        self.ohlc = ohlc
+        self.volume = volume
+        self.rows = rows
+        self.last = last
+        self._pos = {t: j for j, t in enumerate(self.tickers)}
+
+    @classmethod
+    def from_frames(cls, data: dict) -> "BarSet":
+        """Bangun dari dict ticker -> DataFrame (Open, High, Low, Close, Volume); frame kosong dilewati."""
+        frames = {sym: df for sym, df in data.items() if df is not None and len(df) and "Close" in df.columns}
+        tickers = list(frames)
+        dfs = list(frames.values())
+        if not dfs:
+            return cls(pd.DatetimeIndex([]), [], np.empty((4, 0, 0), dtype=np.float32),
+                       np.empty((0, 0), dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+        index = dfs[0].index.append([df.index for df in dfs[1:]]).unique().sort_values()
+        ohlc = np.full((len(OHLC_FIELDS), len(index), len(tickers)), np.nan, dtype=np.float32)
+        volume = np.zeros((len(index), len(tickers)), dtype=np.int64)
+        for j, df in enumerate(dfs):
+            rows = slice(None) if df.index.equals(index) else index.get_indexer(df.index)
+            for k, field in enumerate(OHLC_FIELDS):
+                if field in df.columns:
+                    ohlc[k, rows, j] = df[field].to_numpy(dtype=np.float32)
+            if "Volume" in df.columns:
+                volume[rows, j] = np.nan_to_num(df["Volume"].to_numpy(dtype=float)).astype(np.int64)
+        np.copyto(ohlc[0], ohlc[3], where=np.isnan(ohlc[0]))
+        rows = np.array([len(df) for df in dfs])
+        last = index.get_indexer([df.index[-1] for df in dfs])
+        return cls(index, tickers, ohlc, volume, rows, last)
+
+    # --- Mapping: ticker -> DataFrame ---
+    def __getitem__(self, ticker: str) -> pd.DataFrame:
+        j = self._pos[ticker]
+        present = np.flatnonzero(~np.isnan(self.ohlc[3, :, j]))
+        df = pd.DataFrame({field: self.ohlc[k, present, j] for k, field in enumerate(OHLC_FIELDS)},
+                          index=self.index[present])
+        df["Volume"] = self.volume[present, j]
+        return df
+
+    def __iter__(self):
+        return iter(self.tickers.tolist())
+
+    def __len__(self) -> int:
+        return len(self.tickers)
+
+    def __contains__(self, ticker) -> bool:
+        return ticker in self._pos
+
+    def __repr__(self) -> str:
+        return f"BarSet({len(self.tickers)} ticker x {len(self.index)} bar, {self.nbytes / 1e6:.1f} MB)"
+
+    @property
+    def nbytes(self) -> int:
+        """Perkiraan byte array bar + index."""
+        return self.ohlc.nbytes + self.volume.nbytes + self.index.nbytes
+
+    def field(self, name: str) -> np.ndarray:
+        """View (tanggal x ticker) satu field OHLC tanpa salinan; Volume int64 (0 = tidak ada bar)."""
+        if name == "Volume":
+            return self.volume
+        return self.ohlc[OHLC_FIELDS.index(name)]
+
+    def panel(self) -> dict:
+        """
+        Panel untuk screener (format market_scanner.build_panel): OHLC = view float32 tanpa salinan,
+        Volume float64 dengan NaN di tanggal tanpa bar, plus "index", "tickers", "rows", "last".
+        """
+        if not len(self.tickers):
+            return {}
+        panel = {field: self.ohlc[k] for k, field in enumerate(OHLC_FIELDS)}
+        panel["Volume"] = np.where(np.isnan(self.ohlc[3]), np.nan, self.volume)
+        panel["index"] = self.index
+        panel["tickers"] = self.tickers
+        panel["rows"] = self.rows
+        panel["last"] = self.last
+        return panel
@@ -0,0 +1,75 @@
+"""
+Benchmark ATR: loop Wilder RMA lama (.iloc per baris) vs quant_engine.compute_atr (vektor) dan
+compute_atr_panel (seluruh universe dalam satu panggilan). Data sintetis, tanpa jaringan.
+Jalankan dari root repo: python benchmarks/atr_benchmark.py [--rows 2500] [--tickers 900]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from quant_engine import compute_atr, compute_atr_panel  # noqa: E402
+
+
+def _atr_loop(df: pd.DataFrame, period: int = 14) -> pd.Series:
+    """Implementasi lama compute_atr (referensi nilai dan waktu)."""
+    high, low, close = df["High"], df["Low"], df["Close"]
+    prev_close = close.shift(1)
+    tr = pd.concat([high - low, (high - prev_close).abs(), (low - prev_close).abs()], axis=1).max(axis=1)
+    atr_rma = tr.copy().astype(float)
+    atr_rma.iloc[: period - 1] = np.nan
+    atr_rma.iloc[period - 1] = tr.iloc[:period].mean()
+    for i in range(period, len(tr)):
+        atr_rma.iloc[i] = (atr_rma.iloc[i - 1] * (period - 1) + tr.iloc[i]) / period
+    return atr_rma
+
+
+def _synthetic(rows: int, tickers: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    close = 1000 * np.exp(np.cumsum(rng.normal(0, 0.02, (rows, tickers)), axis=0))
+    high = close * (1 + rng.random((rows, tickers)) * 0.02)
+    low = close * (1 - rng.random((rows, tickers)) * 0.02)
+    index = pd.bdate_range("2015-01-01", periods=rows)
+    cols = [f"T{i:03d}" for i in range(tickers)]
+    return (pd.DataFrame(high, index=index, columns=cols), pd.DataFrame(low, index=index, columns=cols),
+            pd.DataFrame(close, index=index, columns=cols))
+
+
+def _best(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark ATR loop vs vektor.")
+    parser.add_argument("--rows", type=int, default=2500, help="jumlah bar (10 tahun ~ 2500)")
+    parser.add_argument("--tickers", type=int, default=900, help="jumlah ticker untuk mode panel")
+    args = parser.parse_args(argv)
+
+    high, low, close = _synthetic(args.rows, args.tickers)
+    one = pd.DataFrame({"High": high.iloc[:, 0], "Low": low.iloc[:, 0], "Close": close.iloc[:, 0]})
+
+    ref = _atr_loop(one)
+    new = compute_atr(one)
+    diff = float(np.nanmax(np.abs(ref - new) / ref))
+    t_loop = _best(lambda: _atr_loop(one), repeat=1)
+    t_vec = _best(lambda: compute_atr(one))
+    print(f"1 ticker x {args.rows} bar: loop {t_loop * 1000:.1f} ms, vektor {t_vec * 1000:.2f} ms "
+          f"({t_loop / t_vec:.0f}x), selisih relatif maks {diff:.1e}")
+
+    t_panel = _best(lambda: compute_atr_panel(high, low, close))
+    print(f"panel {args.tickers} ticker x {args.rows} bar: {t_panel * 1000:.1f} ms satu panggilan "
+          f"(loop lama perkiraan {t_loop * args.tickers:.0f} s)")
+
+
+if __name__ == "__main__":
+    main()
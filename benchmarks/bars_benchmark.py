@@ -0,0 +1,73 @@
+"""
+Benchmark BarSet: dict ticker -> DataFrame (format lama fetch_market_data) vs bars.BarSet untuk ukuran memori
+dan biaya pickle/unpickle (yang dibayar st.cache_data di setiap hit). Data sintetis, tanpa jaringan.
+Jalankan dari root repo: python benchmarks/bars_benchmark.py [--rows 125] [--tickers 900]
+"""
+import argparse
+import gc
+import os
+import pickle
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bars import BarSet  # noqa: E402
+
+
+def _synthetic(rows: int, tickers: int, seed: int = 0) -> dict:
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range("2025-01-01", periods=rows, tz="Asia/Jakarta")
+    data = {}
+    for i in range(tickers):
+        close = np.round(1000 * np.exp(np.cumsum(rng.normal(0, 0.02, rows))))
+        data[f"T{i:03d}.JK"] = pd.DataFrame({
+            "Open": np.round(close * (1 + rng.normal(0, 0.01, rows))),
+            "High": close + rng.integers(0, 20, rows),
+            "Low": close - rng.integers(0, 20, rows),
+            "Close": close,
+            "Volume": rng.integers(100_000, 10_000_000, rows).astype(float),
+        }, index=index)
+    return data
+
+
+def _best(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark dict DataFrame vs BarSet.")
+    parser.add_argument("--rows", type=int, default=125, help="jumlah bar (6 bulan ~ 125)")
+    parser.add_argument("--tickers", type=int, default=900, help="jumlah ticker universe")
+    args = parser.parse_args(argv)
+
+    data = _synthetic(args.rows, args.tickers)
+    bars = BarSet.from_frames(data)
+    resident = {}
+    for name, obj in (("dict DataFrame", data), ("BarSet", bars)):
+        blob = pickle.dumps(obj)
+        t_dump = _best(lambda: pickle.dumps(obj))
+        t_load = _best(lambda: pickle.loads(blob))
+        # Memori hasil unpickle (yang ditahan cache Streamlit per hit), termasuk overhead objek pandas
+        gc.collect()
+        tracemalloc.start()
+        loaded = pickle.loads(blob)
+        resident[name] = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del loaded
+        print(f"{name}: pickle {len(blob) / 1e6:.1f} MB, dump {t_dump * 1000:.1f} ms, load {t_load * 1000:.1f} ms, "
+              f"memori {resident[name] / 1e6:.1f} MB")
+    print(f"memori BarSet {resident['dict DataFrame'] / resident['BarSet']:.1f}x lebih kecil")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Benchmark screener: loop per ticker (implementasi lama) vs panel market_scanner (screen_swing/screen_invest/
+screen_day_trade), termasuk universe dengan tanggal bolong (suspensi, bar hilang) yang harus menghasilkan
+pick yang sama. Data sintetis, tanpa jaringan.
+Jalankan dari root repo: python benchmarks/scanner_benchmark.py [--rows 300] [--tickers 900] [--seeds 4]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import indicators  # noqa: E402
+from bars import BarSet  # noqa: E402
+from market_scanner import build_panel, screen_day_trade, screen_invest, screen_swing  # noqa: E402
+
+
+def _loop_day_trade(data: dict) -> list:
+    out = []
+    for sym, df in data.items():
+        if len(df) < 21:
+            continue
+        last = df.iloc[-1]
+        avg = df["Volume"].iloc[-21:-1].mean()
+        vwap = (last["High"] + last["Low"] + last["Close"]) / 3
+        if avg > 0 and last["Volume"] >= 1.2 * avg and last["Close"] > last["Open"] and last["Close"] > vwap:
+            out.append((sym, (last["Close"] / last["Open"] - 1) * 100))
+    return [s for s, _ in sorted(out, key=lambda x: x[1], reverse=True)[:3]]
+
+
+def _loop_swing(data: dict) -> list:
+    out = []
+    for sym, df in data.items():
+        if len(df) < 35:
+            continue
+        close = df["Close"]
+        ma20 = indicators.sma(close, 20).iloc[-1]
+        rsi = indicators.rsi(close, 14).iloc[-1]
+        line, signal = indicators.macd(close)
+        if close.iloc[-1] > ma20 and 40 <= rsi <= 65 and line.iloc[-1] > signal.iloc[-1]:
+            out.append((sym, -min(abs(rsi - 50), abs(rsi - 60))))
+    return [s for s, _ in sorted(out, key=lambda x: x[1], reverse=True)[:3]]
+
+
+def _loop_invest(data: dict) -> list:
+    out = []
+    for sym, df in data.items():
+        if len(df) < 200:
+            continue
+        close = df["Close"]
+        high_52w = close.iloc[-252:].max()
+        discount = (1 - close.iloc[-1] / high_52w) * 100
+        if close.iloc[-1] > indicators.sma(close, 200).iloc[-1] and 5 <= discount <= 15:
+            out.append((sym, discount))
+    return [s for s, _ in sorted(out, key=lambda x: x[1], reverse=True)[:3]]
+
+
+def _synthetic(rows: int, tickers: int, seed: int, gaps: bool) -> dict:
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range("2024-01-01", periods=rows, tz="Asia/Jakarta")
+    data = {}
+    for i in range(tickers):
+        close = np.round(1000 * np.cumprod(1 + rng.normal(0.0015, 0.02, rows)))
+        open_ = np.round(close * (1 + rng.normal(0, 0.01, rows)))
+        df = pd.DataFrame({
+            "Open": open_,
+            "High": np.maximum(close, open_) + rng.integers(0, 20, rows),
+            "Low": np.minimum(close, open_) - rng.integers(0, 20, rows),
+            "Close": close,
+            "Volume": rng.integers(100_000, 10_000_000, rows).astype(float),
+        }, index=index)
+        if i % 9 == 0:
+            df = df.iloc[rng.integers(1, 80):]
+        if gaps and i % 2 == 0:
+            drop = rng.choice(np.arange(5, len(df) - 2), size=rng.integers(1, 15), replace=False)
+            df = df.drop(df.index[drop])
+        data[f"T{i:03d}.JK"] = df
+    return data
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark screener loop vs panel.")
+    parser.add_argument("--rows", type=int, default=300, help="jumlah bar")
+    parser.add_argument("--tickers", type=int, default=900, help="jumlah ticker universe")
+    parser.add_argument("--seeds", type=int, default=4, help="jumlah universe acak per mode")
+    args = parser.parse_args(argv)
+
+    screens = (("day_trade", _loop_day_trade, screen_day_trade), ("swing", _loop_swing, screen_swing),
+               ("invest", _loop_invest, screen_invest))
+    for gaps in (False, True):
+        mismatches, t_loop, t_panel = 0, 0.0, 0.0
+        for seed in range(args.seeds):
+            data = _synthetic(args.rows, args.tickers, seed, gaps)
+            for source in (data, BarSet.from_frames(data)):
+                t0 = time.perf_counter()
+                panel = build_panel(source)
+                picks = {name: [p["ticker"] for p in fn(source, panel)] for name, _, fn in screens}
+                t_panel += time.perf_counter() - t0
+                t0 = time.perf_counter()
+                for name, loop, _ in screens:
+                    if loop(data) != picks[name]:
+                        mismatches += 1
+                t_loop += time.perf_counter() - t0
+        runs = args.seeds * 2
+        print(f"{'dengan' if gaps else 'tanpa'} tanggal bolong: {mismatches} pick berbeda dari loop per ticker; "
+              f"loop {t_loop / runs * 1000:.0f} ms, panel {t_panel / runs * 1000:.0f} ms per scan")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Cache Warmer: pemanasan cache data pasar di luar sesi Streamlit (proses terpisah).
+- Sebelum sesi dibuka (08:30 WIB) dan berkala selama jam bursa: perbarui history store untuk ticker
+  prioritas + IHSG, lalu hitung Market Mood, Macro Dashboard dan Sector Leaderboard.
+- Seasonality cube (seasonality_cube) diperbarui saat ada bulan baru yang selesai.
+- Hasil hitungan ditulis ke cache_dir("warm") sebagai JSON; app.py membaca hasil hangat ini dan hanya
+  menghitung sendiri jika warmer tidak berjalan / hasilnya basi. Riwayat harga dibaca app langsung dari
+  Parquet history store yang sudah segar, jadi fetch_market_data tidak perlu ke Yahoo.
+- Setelah penutupan dijalankan sekali lagi, lalu tidur sampai pre-open hari bursa berikutnya.
+Jalankan: python cache_warmer.py            (loop terjadwal)
+          python cache_warmer.py --once     (sekali jalan, mis. dari cron)
+"""
+import argparse
+import json
+import os
+import time
+import pandas as pd
+
+import history_store
+import seasonality_cube
+from macro_engine import calculate_market_mood, get_macro_indicators
+from market_scanner import TICKERS_PRIORITAS, _jk_list, get_top_sectors
+from utils import cache_dir
+
+_TZ = "Asia/Jakarta"
+# Jadwal (WIB): warm pertama sebelum pre-open, berkala sampai setelah penutupan
+_PREOPEN = pd.Timedelta(hours=8, minutes=30)
+_SESSION_END = pd.Timedelta(hours=16, minutes=15)
+# Jeda re-warm saat jam bursa; di bawah TTL history store (300 dtk) agar Parquet selalu segar
+_INTERVAL_SEC = 240
+# Umur maksimum hasil hangat yang masih dipakai app saat jam bursa
+_WARM_MAX_AGE_SEC = 600
+
+
+def _path(name: str) -> str:
+    return os.path.join(cache_dir("warm"), f"{name}.json")
+
+
+def _write_warm(name: str, data) -> None:
+    path = _path(name)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"computed_at": time.time(), "data": data}, f, default=str)
+        os.replace(tmp, path)
+    except Exception:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+
+
+def _now() -> pd.Timestamp:
+    return pd.Timestamp.now(tz=_TZ)
+
+
+def _in_session(now: pd.Timestamp) -> bool:
+    """Hari kerja antara pre-open dan setelah penutupan (WIB)."""
+    return now.weekday() < 5 and _PREOPEN <= now - now.normalize() < _SESSION_END
+
+
+def _last_session_end(now: pd.Timestamp) -> pd.Timestamp:
+    end = now.normalize() + _SESSION_END
+    if now < end:
+        end -= pd.Timedelta(days=1)
+    while end.weekday() >= 5:
+        end -= pd.Timedelta(days=1)
+    return end
+
+
+def _next_preopen(now: pd.Timestamp) -> pd.Timestamp:
+    start = now.normalize() + _PREOPEN
+    if now >= start:
+        start += pd.Timedelta(days=1)
+    while start.weekday() >= 5:
+        start += pd.Timedelta(days=1)
+    return start
+
+
+def read_warm(name: str):
+    """
+    Hasil hangat untuk name ("market_mood", "macro_indicators", "sector_leaderboard") atau None jika
+    belum ada/basi. Saat jam bursa basi = lebih tua dari _WARM_MAX_AGE_SEC; di luar jam bursa hasil yang
+    dihitung setelah penutupan terakhir tetap dipakai (data tidak berubah sampai sesi berikutnya).
+    """
+    try:
+        with open(_path(name), encoding="utf-8") as f:
+            payload = json.load(f)
+        computed_at = float(payload["computed_at"])
+    except Exception:
+        return None
+    now = _now()
+    if time.time() - computed_at < _WARM_MAX_AGE_SEC:
+        return payload["data"]
+    if not _in_session(now) and computed_at >= _last_session_end(now).timestamp():
+        return payload["data"]
+    return None
+
+
+def warm_once() -> dict:
+    """Satu putaran pemanasan. Return ringkasan {dataset: "ok" | pesan error} untuk log."""
+    report = {}
+    try:
+        data = history_store.get_many(_jk_list(TICKERS_PRIORITAS), period="6mo")
+        history_store.get_history("^JKSE", "1y")
+        _write_warm("sector_leaderboard", get_top_sectors(data) if data else [])
+        report["market_data"] = f"ok ({len(data)} ticker)"
+    except Exception as e:
+        report["market_data"] = str(e)
+    try:
+        # No-op kecuali ada bulan baru yang selesai (incremental)
+        cube = seasonality_cube.update("prioritas")
+        report["seasonality_cube"] = f"ok (s.d. {cube['through']})"
+    except Exception as e:
+        report["seasonality_cube"] = str(e)
+    for name, fn in (("market_mood", calculate_market_mood), ("macro_indicators", get_macro_indicators)):
+        try:
+            _write_warm(name, fn())
+            report[name] = "ok"
+        except Exception as e:
+            report[name] = str(e)
+    return report
+
+
+def run_forever(interval: int = _INTERVAL_SEC) -> None:
+    """Loop terjadwal: warm tiap interval detik saat jam bursa, sekali setelah tutup, lalu tidur sampai pre-open."""
+    last_run = None
+    while True:
+        now = _now()
+        if _in_session(now) or last_run is None or last_run < _last_session_end(now):
+            started = time.time()
+            report = warm_once()
+            last_run = _now()
+            print(f"[{last_run:%Y-%m-%d %H:%M:%S}] warm {time.time() - started:.1f}s {report}", flush=True)
+            if _in_session(last_run):
+                time.sleep(max(interval - (time.time() - started), 1))
+                continue
+        time.sleep(max((_next_preopen(_now()) - _now()).total_seconds(), 1))
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Pemanasan cache data pasar IDX-Pro Insight (proses terpisah).")
+    parser.add_argument("--once", action="store_true", help="jalankan satu putaran lalu keluar")
+    parser.add_argument("--interval", type=int, default=_INTERVAL_SEC, help="jeda re-warm saat jam bursa (detik)")
+    args = parser.parse_args(argv)
+    if args.once:
+        print(warm_once(), flush=True)
+        return
+    run_forever(args.interval)
+
+
+if __name__ == "__main__":
+    main()
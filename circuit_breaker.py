@@ -0,0 +1,102 @@
+"""
+Circuit Breaker: putus cepat saat upstream (Yahoo Finance) gangguan, per provider.
+- closed: panggilan normal; _FAILURE_THRESHOLD kegagalan beruntun -> open.
+- open: semua panggilan langsung ditolak (CircuitOpenError) selama _OPEN_COOLDOWN_SEC, tanpa menunggu
+  timeout/retry; pemanggil memakai data tersimpan terakhir dan menandainya basi (stale).
+- half-open: setelah cooldown, tepat satu panggilan probe diizinkan; sukses -> closed, gagal -> open lagi.
+Dipakai otomatis oleh rate_limiter.call; modul data cukup cek is_open() untuk melewati refresh.
+"""
+import threading
+import time
+
+_FAILURE_THRESHOLD = 5
+_OPEN_COOLDOWN_SEC = 30.0
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Upstream sedang diputus (circuit open); jangan tunggu, pakai data tersimpan."""
+
+
+class _Circuit:
+    __slots__ = ("state", "failures", "opened_at", "probe_in_flight", "rejected", "trips")
+
+    def __init__(self):
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.rejected = 0
+        self.trips = 0
+
+
+_LOCK = threading.Lock()
+_CIRCUITS = {}
+
+
+def _circuit(provider: str) -> _Circuit:
+    c = _CIRCUITS.get(provider)
+    if c is None:
+        c = _CIRCUITS[provider] = _Circuit()
+    return c
+
+
+def allow(provider: str = "yahoo") -> bool:
+    """True jika panggilan boleh jalan (closed, atau pemanggil ini terpilih sebagai probe half-open)."""
+    with _LOCK:
+        c = _circuit(provider)
+        if c.state == CLOSED:
+            return True
+        if c.state == OPEN and time.monotonic() - c.opened_at >= _OPEN_COOLDOWN_SEC:
+            c.state = HALF_OPEN
+        if c.state == HALF_OPEN and not c.probe_in_flight:
+            c.probe_in_flight = True
+            return True
+        c.rejected += 1
+        return False
+
+
+def record_success(provider: str = "yahoo") -> None:
+    with _LOCK:
+        c = _circuit(provider)
+        c.state = CLOSED
+        c.failures = 0
+        c.probe_in_flight = False
+
+
+def record_failure(provider: str = "yahoo") -> None:
+    with _LOCK:
+        c = _circuit(provider)
+        c.failures += 1
+        if c.state == HALF_OPEN or c.failures >= _FAILURE_THRESHOLD:
+            if c.state != OPEN:
+                c.trips += 1
+            c.state = OPEN
+            c.opened_at = time.monotonic()
+            c.probe_in_flight = False
+
+
+def is_open(provider: str = "yahoo") -> bool:
+    """
+    True jika panggilan ke provider saat ini akan ditolak (open dalam cooldown, atau half-open dengan probe
+    sedang berjalan): lewati refresh dan pakai data tersimpan sebagai data basi. Tidak memakai jatah probe.
+    """
+    with _LOCK:
+        c = _circuit(provider)
+        if c.state == OPEN:
+            return time.monotonic() - c.opened_at < _OPEN_COOLDOWN_SEC
+        return c.state == HALF_OPEN and c.probe_in_flight
+
+
+def state(provider: str = "yahoo") -> dict:
+    """Kondisi breaker: state, consecutive_failures, open_for_sec, rejected, trips."""
+    with _LOCK:
+        c = _circuit(provider)
+        return {
+            "state": c.state,
+            "consecutive_failures": c.failures,
+            "open_for_sec": round(time.monotonic() - c.opened_at, 1) if c.state != CLOSED else 0.0,
+            "rejected": c.rejected,
+            "trips": c.trips,
+        }
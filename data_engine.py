@@ -1,11 +1,15 @@
 """
 Data Engine: penarikan data harga saham dan indeks via yfinance.
 Selalu menyertakan IHSG (^JKSE) sebagai benchmark untuk analisis komparatif.
+Riwayat harian dibaca dari history_store (Parquet lokal, hanya bar baru yang diunduh saat refresh).
+Sesi yang meminta ticker yang sama bersamaan digabung ke satu fetch (single_flight).
 """
 import pandas as pd
-import yfinance as yf
 import streamlit as st
 
+import history_store
+from single_flight import coalesce
+
 # Ticker benchmark wajib untuk Mansfield RS dan analisis relatif
 BENCHMARK_TICKER = "^JKSE"
 
@@ -21,9 +25,10 @@ def ensure_jk(ticker: str) -> str:
 
 
 @st.cache_data(ttl=300)
+@coalesce
 def get_stock_data(ticker: str, period: str = "1y") -> pd.DataFrame:
     """
-    Ambil data historis saham dari yfinance dengan caching (5 menit).
+    Ambil data historis saham dari history store lokal dengan caching (5 menit).
     Mengembalikan DataFrame dengan kolom Open, High, Low, Close, Volume.
     Mengembalikan DataFrame kosong jika ticker tidak ditemukan atau delisting.
     """
@@ -31,8 +36,7 @@ def get_stock_data(ticker: str, period: str = "1y") -> pd.DataFrame:
     if not t:
         return pd.DataFrame()
     try:
-        obj = yf.Ticker(t)
-        df = obj.history(period=period, auto_adjust=True)
+        df = history_store.get_history(t, period)
         if df is None or df.empty or len(df) < 5:
             return pd.DataFrame()
         return df
@@ -41,14 +45,14 @@ def get_stock_data(ticker: str, period: str = "1y") -> pd.DataFrame:
 
 
 @st.cache_data(ttl=300)
+@coalesce
 def get_benchmark(period: str = "1y") -> pd.DataFrame:
     """
     Ambil data Indeks Harga Saham Gabungan (IHSG) sebagai benchmark wajib
     untuk Mansfield Relative Strength dan analisis komparatif.
     """
     try:
-        obj = yf.Ticker(BENCHMARK_TICKER)
-        df = obj.history(period=period, auto_adjust=True)
+        df = history_store.get_history(BENCHMARK_TICKER, period)
         if df is None or df.empty:
             return pd.DataFrame()
         return df
@@ -3,29 +3,175 @@ Sumber data alternatif (fallback) selain Yahoo Finance.
 Digunakan hanya ketika yfinance gagal; output dinormalisasi agar tidak mengubah tampilan atau struktur data.
 - Alpha Vantage (opsional): API key di secrets → [alpha_vantage] api_key = "..."
   Free tier: 25 req/hari. Daftar: https://www.alphavantage.co/support/#api-key
+- Respons disimpan di disk per (function, parameter) dengan TTL sesuai seri harian, dan kuota harian
+  dihitung persisten (reset tiap tanggal UTC) sehingga outage Yahoo tidak menghabiskan kuota dalam menit.
+  Kuota dipakai bersama aplikasi dan cache_warmer (proses lain): baca-ubah-tulis dijaga file lock.
+  Statistik: av_metrics().
 """
+import hashlib
+import json
+import os
+import threading
 import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
 import requests
 
+try:
+    import fcntl
+except ImportError:  # Windows: pakai lockfile O_EXCL
+    fcntl = None
+
+from utils import cache_dir
+
 _BASE_AV = "https://www.alphavantage.co/query"
 _AV_TIMEOUT = 12
+# Kuota harian (free tier 25; sisakan cadangan) dan TTL cache respons per function (detik)
+_AV_DAILY_BUDGET = int(os.environ.get("IDX_AV_DAILY_BUDGET", "23"))
+_AV_TTL_SEC = {"FX_DAILY": 6 * 3600, "DIGITAL_CURRENCY_DAILY": 6 * 3600}
+_AV_DEFAULT_TTL_SEC = 3600
+
+_QUOTA_LOCK = threading.Lock()
+# Lockfile O_EXCL (tanpa fcntl) yang lebih tua dari ini dianggap sisa proses yang mati
+_LOCKFILE_STALE_SEC = 30
+# Metrik proses ini (kuota harian tersimpan di disk, lihat _quota_path)
+_METRICS = {"cache_hits": 0, "cache_misses": 0, "requests": 0, "refused_quota": 0, "errors": 0}
+
+
+def _cache_path(params: dict) -> str:
+    key = json.dumps(params, sort_keys=True)
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(cache_dir("alpha_vantage"), f"{params.get('function', 'av')}_{digest}.json")
+
+
+def _quota_path() -> str:
+    return os.path.join(cache_dir("alpha_vantage"), "quota.json")
+
+
+def _write_json(path: str, payload: dict) -> None:
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(payload, f)
+        os.replace(tmp, path)
+    except Exception:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+
+
+def _read_json(path: str):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+
+def _today() -> str:
+    # Kuota Alpha Vantage direset per hari; pakai tanggal UTC
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+def _quota_used() -> int:
+    q = _read_json(_quota_path()) or {}
+    return int(q.get("used", 0)) if q.get("date") == _today() else 0
+
+
+@contextmanager
+def _quota_file_lock():
+    """Lock antar-proses untuk file kuota (flock; tanpa fcntl: lockfile O_EXCL di sebelah quota.json)."""
+    path = f"{_quota_path()}.lock"
+    if fcntl is not None:
+        with open(path, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        return
+    while True:
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(path) > _LOCKFILE_STALE_SEC:
+                    os.remove(path)
+                    continue
+            except OSError:
+                continue
+            time.sleep(0.05)
+    try:
+        yield
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _take_quota() -> bool:
+    """Pakai satu jatah request hari ini. False jika budget harian sudah habis."""
+    with _QUOTA_LOCK, _quota_file_lock():
+        used = _quota_used()
+        if used >= _AV_DAILY_BUDGET:
+            return False
+        _write_json(_quota_path(), {"date": _today(), "used": used + 1})
+        return True
+
+
+def _cache_get(params: dict, allow_stale: bool = False):
+    entry = _read_json(_cache_path(params))
+    if not entry:
+        return None
+    ttl = _AV_TTL_SEC.get(params.get("function"), _AV_DEFAULT_TTL_SEC)
+    if allow_stale or time.time() - float(entry.get("fetched_at", 0)) < ttl:
+        return entry.get("data")
+    return None
 
 
 def _av_request(params: dict, api_key: str) -> dict | None:
-    """Request ke Alpha Vantage. Return JSON dict atau None."""
+    """
+    Request ke Alpha Vantage. Return JSON dict atau None.
+    Urutan: cache disk (masih dalam TTL) -> request (jika kuota harian masih ada) -> cache basi.
+    """
     if not api_key or not str(api_key).strip():
         return None
-    params = {**params, "apikey": api_key.strip()}
+    cached = _cache_get(params)
+    if cached is not None:
+        _METRICS["cache_hits"] += 1
+        return cached
+    _METRICS["cache_misses"] += 1
+    if not _take_quota():
+        _METRICS["refused_quota"] += 1
+        return _cache_get(params, allow_stale=True)
+    _METRICS["requests"] += 1
     try:
-        r = requests.get(_BASE_AV, params=params, timeout=_AV_TIMEOUT)
+        r = requests.get(_BASE_AV, params={**params, "apikey": api_key.strip()}, timeout=_AV_TIMEOUT)
         if r.status_code != 200:
-            return None
+            raise ValueError(f"HTTP {r.status_code}")
         data = r.json()
-        if not data or "Error Message" in data or "Note" in data:
-            return None
-        return data
+        if not data or "Error Message" in data or "Note" in data or "Information" in data:
+            raise ValueError("Respons Alpha Vantage tidak valid / limit")
     except Exception:
-        return None
+        _METRICS["errors"] += 1
+        return _cache_get(params, allow_stale=True)
+    _write_json(_cache_path(params), {"fetched_at": time.time(), "data": data})
+    return data
+
+
+def av_metrics() -> dict:
+    """Pemakaian kuota hari ini (persisten) dan statistik cache/request proses ini."""
+    used = _quota_used()
+    return {
+        **_METRICS,
+        "quota_date": _today(),
+        "quota_used": used,
+        "quota_budget": _AV_DAILY_BUDGET,
+        "quota_remaining": max(_AV_DAILY_BUDGET - used, 0),
+    }
 
 
 def fetch_fx_av(api_key: str, from_currency: str = "USD", to_currency: str = "IDR") -> dict | None:
@@ -0,0 +1,158 @@
+"""
+Data Provider: satu pintu untuk semua panggilan data pasar (yf.Ticker().history, yf.download, .info).
+Provider bisa diganti tanpa mengubah engine, untuk benchmark dan load test yang bisa diulang / tanpa jaringan:
+- "live"   (default): langsung ke yfinance.
+- "record": seperti live, tapi setiap respons disimpan ke direktori fixture.
+- "replay": tidak ke jaringan; respons dibaca dari fixture, dengan latensi buatan opsional.
+Pilih lewat env: IDX_DATA_PROVIDER=live|record|replay, IDX_FIXTURE_DIR (default cache_dir("fixtures")),
+IDX_REPLAY_LATENCY_MS (default 0). Dari kode: data_provider.use(ReplayProvider(latency_ms=150)).
+Catatan: untuk replay yang konsisten, pakai IDX_CACHE_DIR kosong yang sama seperti saat record, karena
+history store menentukan request berikutnya (mis. start=...) dari data yang sudah tersimpan.
+"""
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+import pandas as pd
+import yfinance as yf
+
+from utils import cache_dir
+
+
+def _fixture_key(kind: str, args: tuple, kwargs: dict) -> str:
+    raw = json.dumps([kind, list(args), sorted(kwargs.items())], default=str, sort_keys=True)
+    return f"{kind}_{hashlib.sha1(raw.encode('utf-8')).hexdigest()[:20]}"
+
+
+class DataProvider:
+    """Antarmuka provider: history(symbol, **kw), download(tickers, **kw), info(symbol)."""
+
+    name = "base"
+
+    def history(self, symbol: str, **kwargs) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def download(self, tickers, **kwargs) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def info(self, symbol: str) -> dict:
+        raise NotImplementedError
+
+
+class LiveProvider(DataProvider):
+    """Langsung ke Yahoo Finance lewat yfinance."""
+
+    name = "live"
+
+    def history(self, symbol: str, **kwargs) -> pd.DataFrame:
+        return yf.Ticker(symbol).history(**kwargs)
+
+    def download(self, tickers, **kwargs) -> pd.DataFrame:
+        return yf.download(tickers, **kwargs)
+
+    def info(self, symbol: str) -> dict:
+        return yf.Ticker(symbol).info
+
+
+class RecordingProvider(LiveProvider):
+    """Live + simpan setiap respons sukses ke fixture_dir (pickle per request)."""
+
+    name = "record"
+
+    def __init__(self, fixture_dir: str = None):
+        self.fixture_dir = fixture_dir or os.environ.get("IDX_FIXTURE_DIR") or cache_dir("fixtures")
+        os.makedirs(self.fixture_dir, exist_ok=True)
+
+    def _record(self, kind: str, args: tuple, kwargs: dict, value):
+        path = os.path.join(self.fixture_dir, _fixture_key(kind, args, kwargs) + ".pkl")
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                pickle.dump(value, f)
+            os.replace(tmp, path)
+        except Exception:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+        return value
+
+    def history(self, symbol: str, **kwargs) -> pd.DataFrame:
+        return self._record("history", (symbol,), kwargs, super().history(symbol, **kwargs))
+
+    def download(self, tickers, **kwargs) -> pd.DataFrame:
+        return self._record("download", (tickers,), kwargs, super().download(tickers, **kwargs))
+
+    def info(self, symbol: str) -> dict:
+        return self._record("info", (symbol,), {}, super().info(symbol))
+
+
+class ReplayProvider(DataProvider):
+    """
+    Layani respons dari fixture hasil RecordingProvider, tanpa jaringan. latency_ms ditambahkan ke tiap
+    panggilan untuk mensimulasikan Yahoo. Request tanpa fixture mengembalikan data kosong (dicatat di misses).
+    """
+
+    name = "replay"
+
+    def __init__(self, fixture_dir: str = None, latency_ms: float = None):
+        self.fixture_dir = fixture_dir or os.environ.get("IDX_FIXTURE_DIR") or cache_dir("fixtures")
+        if latency_ms is None:
+            latency_ms = float(os.environ.get("IDX_REPLAY_LATENCY_MS", "0") or 0)
+        self.latency_ms = latency_ms
+        self.hits = 0
+        self.misses = []
+
+    def _replay(self, kind: str, args: tuple, kwargs: dict, empty):
+        if self.latency_ms > 0:
+            time.sleep(self.latency_ms / 1000.0)
+        key = _fixture_key(kind, args, kwargs)
+        try:
+            with open(os.path.join(self.fixture_dir, key + ".pkl"), "rb") as f:
+                value = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            self.misses.append((kind, args, kwargs))
+            return empty
+        self.hits += 1
+        return value
+
+    def history(self, symbol: str, **kwargs) -> pd.DataFrame:
+        return self._replay("history", (symbol,), kwargs, pd.DataFrame())
+
+    def download(self, tickers, **kwargs) -> pd.DataFrame:
+        return self._replay("download", (tickers,), kwargs, pd.DataFrame())
+
+    def info(self, symbol: str) -> dict:
+        return self._replay("info", (symbol,), {}, {})
+
+
+_PROVIDERS = {"live": LiveProvider, "record": RecordingProvider, "replay": ReplayProvider}
+_PROVIDER = _PROVIDERS.get(os.environ.get("IDX_DATA_PROVIDER", "live").strip().lower(), LiveProvider)()
+
+
+def use(provider: DataProvider) -> DataProvider:
+    """Ganti provider aktif (mis. di skrip benchmark). Return provider sebelumnya."""
+    global _PROVIDER
+    previous, _PROVIDER = _PROVIDER, provider
+    return previous
+
+
+def current() -> DataProvider:
+    return _PROVIDER
+
+
+def history(symbol: str, **kwargs) -> pd.DataFrame:
+    """Setara yf.Ticker(symbol).history(**kwargs) lewat provider aktif."""
+    return _PROVIDER.history(symbol, **kwargs)
+
+
+def download(tickers, **kwargs) -> pd.DataFrame:
+    """Setara yf.download(tickers, **kwargs) lewat provider aktif."""
+    return _PROVIDER.download(tickers, **kwargs)
+
+
+def info(symbol: str) -> dict:
+    """Setara yf.Ticker(symbol).info lewat provider aktif."""
+    return _PROVIDER.info(symbol)
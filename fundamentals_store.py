@@ -0,0 +1,116 @@
+"""
+Fundamentals Store: cache ringkasan fundamental (PER, PBV, ROE, DER, sektor) per ticker di disk (JSON).
+- yf.Ticker(t).info lambat (1-3 detik) dan datanya nyaris tidak berubah dalam sehari, jadi cukup
+  diperbarui sekali per hari bursa setelah penutupan (default 16:00 WIB, lihat _REFRESH_HOUR_WIB).
+- Stale-while-revalidate: jika sudah ada nilai tersimpan (walau basi), nilai itu langsung dikembalikan
+  dan pembaruan berjalan di background; halaman hanya menunggu .info untuk ticker yang belum pernah diambil.
+- Hanya hasil tanpa error yang disimpan, agar kegagalan sementara Yahoo tidak menimpa data yang baik.
+Lokasi file: cache_dir("fundamentals") (lihat utils.cache_dir). Jendela segar bisa diubah lewat env
+IDX_FUNDAMENTAL_MAX_AGE_SEC (detik; jika diisi, menggantikan aturan "sekali per hari setelah tutup").
+"""
+import json
+import os
+import re
+import threading
+import time
+import pandas as pd
+
+import single_flight
+from utils import cache_dir
+
+# Jam penutupan bursa (WIB); data yang diambil sebelum penutupan terakhir dianggap basi
+_REFRESH_HOUR_WIB = 16
+_TZ = "Asia/Jakarta"
+
+# Ticker yang sedang diperbarui di background (hindari thread ganda untuk ticker sama)
+_REFRESHING = set()
+_REFRESHING_LOCK = threading.Lock()
+
+
+def _path(ticker: str) -> str:
+    safe = re.sub(r"[^A-Za-z0-9._=-]", "_", ticker)
+    return os.path.join(cache_dir("fundamentals"), f"{safe}.json")
+
+
+def _load(ticker: str):
+    """Return (data, fetched_at_epoch) dari disk, atau (None, 0.0) jika belum ada / file rusak."""
+    try:
+        with open(_path(ticker), encoding="utf-8") as f:
+            payload = json.load(f)
+        return payload["data"], float(payload["fetched_at"])
+    except Exception:
+        return None, 0.0
+
+
+def _save(ticker: str, data: dict) -> None:
+    path = _path(ticker)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"fetched_at": time.time(), "data": data}, f, default=str)
+        os.replace(tmp, path)
+    except Exception:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+
+
+def _last_close_epoch() -> float:
+    """Epoch penutupan bursa terakhir (hari kerja, _REFRESH_HOUR_WIB) yang sudah lewat."""
+    now = pd.Timestamp.now(tz=_TZ)
+    close = now.normalize() + pd.Timedelta(hours=_REFRESH_HOUR_WIB)
+    if now < close:
+        close -= pd.Timedelta(days=1)
+    while close.weekday() >= 5:
+        close -= pd.Timedelta(days=1)
+    return close.timestamp()
+
+
+def is_fresh(fetched_at: float) -> bool:
+    """Segar jika diambil setelah penutupan bursa terakhir (atau dalam IDX_FUNDAMENTAL_MAX_AGE_SEC bila diset)."""
+    max_age = os.environ.get("IDX_FUNDAMENTAL_MAX_AGE_SEC")
+    if max_age:
+        try:
+            return time.time() - fetched_at < float(max_age)
+        except ValueError:
+            pass
+    return fetched_at >= _last_close_epoch()
+
+
+def _refresh(ticker: str, fetch) -> dict:
+    data = single_flight.run(("fundamentals", ticker), fetch, ticker)
+    if data and not data.get("error"):
+        _save(ticker, data)
+    return data
+
+
+def _refresh_in_background(ticker: str, fetch) -> None:
+    with _REFRESHING_LOCK:
+        if ticker in _REFRESHING:
+            return
+        _REFRESHING.add(ticker)
+
+    def _job():
+        try:
+            _refresh(ticker, fetch)
+        except Exception:
+            pass
+        finally:
+            with _REFRESHING_LOCK:
+                _REFRESHING.discard(ticker)
+
+    threading.Thread(target=_job, name=f"fundamentals-{ticker}", daemon=True).start()
+
+
+def get_fundamentals(ticker: str, fetch) -> dict:
+    """
+    Ringkasan fundamental ticker dari cache disk. fetch(ticker) -> dict dipanggil hanya jika belum ada
+    data (sinkron) atau data basi (di background, sementara data lama langsung dikembalikan).
+    """
+    data, fetched_at = _load(ticker)
+    if data is None:
+        return _refresh(ticker, fetch)
+    if not is_fresh(fetched_at):
+        _refresh_in_background(ticker, fetch)
+    return data
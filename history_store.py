@@ -0,0 +1,485 @@
+"""
+History Store: penyimpanan lokal riwayat harga harian (OHLCV) per ticker dalam format Parquet.
+- Riwayat penuh (backfill 10 tahun) diunduh sekali, lalu refresh hanya mengambil bar baru dan di-append.
+- Scan (get_many) di store kosong hanya mengunduh period yang diminta (mis. 6mo) dan menandai file parsial;
+  get_history satu ticker dan permintaan "max" (seasonality cube lewat cache_warmer) melengkapinya ke 10 tahun.
+- Ticker yang tidak dikembalikan bulk download (delisting, salah ketik) diingat _NO_DATA_TTL_SEC agar tidak
+  diunduh ulang setiap scan.
+- Bertahan antar-restart server, sehingga latensi halaman dan tekanan rate limit Yahoo jauh berkurang.
+- Jika harga historis berubah (adjustment dividen/split), riwayat di-backfill ulang agar tetap konsisten.
+- Saat circuit breaker Yahoo open, riwayat tersimpan terakhir langsung dikembalikan dengan attrs["stale"]=True.
+- Satu frame riwayat penuh per ticker disimpan di memori; setiap permintaan period dilayani sebagai
+  slice (tanpa salin) dari frame yang sama, jadi 1y, 6mo dan 10y untuk satu ticker cukup satu fetch.
+Lokasi file: cache_dir("history") (lihat utils.cache_dir, bisa diubah lewat env IDX_CACHE_DIR).
+"""
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import pandas as pd
+
+import circuit_breaker
+import data_provider
+import rate_limiter
+from single_flight import coalesce
+from utils import cache_dir
+
+# Periode unduhan awal (riwayat penuh) dan umur minimum sebelum cek bar baru ke Yahoo
+_BACKFILL_PERIOD = "10y"
+_REFRESH_TTL_SEC = 300
+# Toleransi selisih Close pada bar overlap; lebih dari ini dianggap ada adjustment (dividen/split)
+_ADJUST_TOLERANCE = 1e-3
+_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+# Batas jumlah frame riwayat penuh di memori (LRU); sisanya dibaca ulang dari disk bila perlu
+_MAX_FRAMES = 256
+# Toleransi awal riwayat parsial terhadap titik potong period (hari libur di awal window)
+_COVER_SLACK = pd.Timedelta(days=7)
+# Ticker tanpa data di bulk download (delisting, kode salah) tidak diminta ulang selama ini
+_NO_DATA_TTL_SEC = 6 * 3600
+
+# ticker -> (waktu data terakhir diperbarui, DataFrame riwayat penuh); diakses banyak sesi sekaligus
+_FRAMES = OrderedDict()
+_FRAMES_LOCK = threading.Lock()
+
+# ticker -> waktu kedaluwarsa catatan "tanpa data" (lihat _NO_DATA_TTL_SEC)
+_NO_DATA = {}
+_NO_DATA_LOCK = threading.Lock()
+
+# Offset untuk argumen period gaya yfinance ("5d", "6mo", "1y", ...)
+_PERIOD_UNITS = {"d": "days", "wk": "weeks", "mo": "months", "y": "years"}
+
+
+def _path(ticker: str) -> str:
+    safe = re.sub(r"[^A-Za-z0-9._=-]", "_", ticker)
+    return os.path.join(cache_dir("history"), f"{safe}.parquet")
+
+
+def _normalize(df: pd.DataFrame) -> pd.DataFrame:
+    """Seragamkan frame dari yfinance: kolom OHLCV, index tanggal tanpa timezone, tanpa baris Close kosong."""
+    if df is None or df.empty:
+        return pd.DataFrame()
+    if isinstance(df.columns, pd.MultiIndex):
+        df = df.copy()
+        df.columns = df.columns.get_level_values(0)
+    cols = [c for c in _COLUMNS if c in df.columns]
+    if "Close" not in cols:
+        return pd.DataFrame()
+    df = df[cols].copy()
+    idx = pd.DatetimeIndex(df.index)
+    if idx.tz is not None:
+        idx = idx.tz_localize(None)
+    df.index = idx.normalize()
+    df.index.name = "Date"
+    df = df.dropna(subset=["Close"])
+    df = df[~df.index.duplicated(keep="last")].sort_index()
+    return df
+
+
+def load_history(ticker: str) -> pd.DataFrame:
+    """Baca riwayat tersimpan dari disk. DataFrame kosong jika belum ada atau file rusak."""
+    path = _path(ticker)
+    if not os.path.exists(path):
+        return pd.DataFrame()
+    try:
+        return pd.read_parquet(path)
+    except Exception:
+        return pd.DataFrame()
+
+
+def _save(ticker: str, df: pd.DataFrame) -> None:
+    """Tulis atomik (file sementara lalu os.replace) agar pembaca lain tidak melihat file setengah jadi."""
+    path = _path(ticker)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        df.to_parquet(tmp)
+        os.replace(tmp, path)
+    except Exception:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+
+
+def _partial_path(ticker: str) -> str:
+    return _path(ticker)[:-len(".parquet")] + ".partial"
+
+
+def _is_partial(ticker: str) -> bool:
+    """True jika riwayat tersimpan baru sebagian (backfill period scan, bukan _BACKFILL_PERIOD)."""
+    return os.path.exists(_partial_path(ticker))
+
+
+def _set_partial(ticker: str, period: str = None) -> None:
+    """Tandai riwayat tersimpan hasil backfill period (lebih pendek dari _BACKFILL_PERIOD); None = lengkap."""
+    path = _partial_path(ticker)
+    try:
+        if period is None or period == _BACKFILL_PERIOD:
+            os.remove(path)
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(period)
+    except OSError:
+        pass
+
+
+def _covers(ticker: str, df: pd.DataFrame, period: str) -> bool:
+    """
+    Riwayat tersimpan cukup untuk period: lengkap, parsial dari backfill period yang sama/lebih panjang
+    (ticker muda tidak diunduh ulang terus), atau parsial tapi sudah mulai sebelum titik potong period.
+    """
+    try:
+        with open(_partial_path(ticker), encoding="utf-8") as f:
+            fetched = f.read().strip()
+    except OSError:
+        return True
+    cutoff = _cutoff(period)
+    if cutoff is None:
+        return False
+    fetched_cutoff = _cutoff(fetched)
+    if fetched_cutoff is not None and fetched_cutoff <= cutoff:
+        return True
+    return df.index[0] <= cutoff + _COVER_SLACK
+
+
+def _no_data(ticker: str) -> bool:
+    with _NO_DATA_LOCK:
+        expiry = _NO_DATA.get(ticker)
+        if expiry is not None and expiry <= time.time():
+            del _NO_DATA[ticker]
+            expiry = None
+    return expiry is not None
+
+
+def _remember_no_data(tickers: list) -> None:
+    expiry = time.time() + _NO_DATA_TTL_SEC
+    with _NO_DATA_LOCK:
+        for t in tickers:
+            _NO_DATA[t] = expiry
+
+
+def _touch(ticker: str) -> None:
+    try:
+        os.utime(_path(ticker))
+    except OSError:
+        pass
+
+
+def _mtime(ticker: str) -> float:
+    try:
+        return os.path.getmtime(_path(ticker))
+    except OSError:
+        return 0.0
+
+
+def _is_fresh(ticker: str) -> bool:
+    return time.time() - _mtime(ticker) < _REFRESH_TTL_SEC
+
+
+def _remember(ticker: str, df: pd.DataFrame, updated_at: float = None) -> None:
+    if df is None or df.empty:
+        return
+    with _FRAMES_LOCK:
+        _FRAMES[ticker] = (updated_at or time.time(), df)
+        _FRAMES.move_to_end(ticker)
+        while len(_FRAMES) > _MAX_FRAMES:
+            _FRAMES.popitem(last=False)
+
+
+def _cached(ticker: str):
+    """Frame riwayat penuh di memori jika masih dalam _REFRESH_TTL_SEC, selain itu None."""
+    with _FRAMES_LOCK:
+        hit = _FRAMES.get(ticker)
+        if hit is None or time.time() - hit[0] >= _REFRESH_TTL_SEC:
+            return None
+        _FRAMES.move_to_end(ticker)
+        return hit[1]
+
+
+def clear_memory() -> None:
+    """Kosongkan frame di memori (mis. tombol Refresh data). File di disk tetap dipakai sesuai TTL."""
+    with _FRAMES_LOCK:
+        _FRAMES.clear()
+
+
+def _fetch(ticker: str, period: str = None, start=None) -> pd.DataFrame:
+    """
+    Unduh dari yfinance (period atau mulai tanggal start). DataFrame kosong jika gagal atau simbol tanpa data
+    (respons kosong satu simbol tidak dihitung gangguan Yahoo, lihat rate_limiter.call).
+    """
+    try:
+        if start is not None:
+            df = rate_limiter.call(data_provider.history, ticker, start=start, auto_adjust=True,
+                                   validate=rate_limiter.non_empty)
+        else:
+            df = rate_limiter.call(data_provider.history, ticker, period=period or _BACKFILL_PERIOD, auto_adjust=True,
+                                   validate=rate_limiter.non_empty)
+        return _normalize(df)
+    except Exception:
+        return pd.DataFrame()
+
+
+def _merge(stored: pd.DataFrame, new: pd.DataFrame):
+    """
+    Gabungkan bar baru ke riwayat tersimpan. Bar overlap diganti versi baru (bar hari ini bisa parsial).
+    Return (frame_gabungan, perlu_backfill). perlu_backfill=True jika Close bar lama yang overlap berubah
+    (harga historis di-adjust ulang oleh Yahoo) sehingga append akan membuat riwayat tidak konsisten.
+    """
+    if new.empty:
+        return stored, False
+    overlap = stored.index.intersection(new.index)
+    # Bar overlap terakhir bisa bar berjalan (parsial); cek hanya bar overlap sebelumnya
+    check = overlap[:-1] if len(overlap) > 1 else overlap[:0]
+    if len(check):
+        old_c = stored.loc[check, "Close"].astype(float)
+        new_c = new.loc[check, "Close"].astype(float)
+        rel = ((new_c - old_c).abs() / old_c.abs().replace(0, float("nan"))).max()
+        if pd.notna(rel) and rel > _ADJUST_TOLERANCE:
+            return stored, True
+    merged = pd.concat([stored[~stored.index.isin(new.index)], new]).sort_index()
+    return merged, False
+
+
+def _incremental_start(stored: pd.DataFrame):
+    """Mulai unduh dari bar kedua terakhir: satu bar overlap untuk cek adjustment + bar terakhir (mungkin parsial)."""
+    pos = max(len(stored) - 2, 0)
+    return stored.index[pos].strftime("%Y-%m-%d")
+
+
+@coalesce
+def refresh_history(ticker: str) -> pd.DataFrame:
+    """
+    Perbarui riwayat satu ticker: backfill penuh jika belum ada (atau baru parsial dari scan), selain itu
+    hanya ambil bar sejak tanggal terakhir tersimpan dan append. Return riwayat penuh (atau yang tersimpan
+    jika Yahoo gagal). Pemanggilan bersamaan untuk ticker yang sama digabung menjadi satu fetch (single_flight).
+    """
+    stored = load_history(ticker)
+    if stored.empty or _is_partial(ticker):
+        full = _fetch(ticker, period=_BACKFILL_PERIOD)
+        if not full.empty:
+            _save(ticker, full)
+            _set_partial(ticker)
+            return full
+        if stored.empty:
+            return full
+    new = _fetch(ticker, start=_incremental_start(stored))
+    merged, need_backfill = _merge(stored, new)
+    if need_backfill:
+        full = _fetch(ticker, period=_BACKFILL_PERIOD)
+        if not full.empty:
+            _save(ticker, full)
+            _set_partial(ticker)
+            return full
+        return stored
+    if merged is stored:
+        _touch(ticker)
+    else:
+        _save(ticker, merged)
+    return merged
+
+
+def _cutoff(period: str):
+    """Tanggal awal period gaya yfinance dihitung mundur dari hari ini; None untuk "max"/tidak dikenal."""
+    if not period or period == "max":
+        return None
+    today = pd.Timestamp.now().normalize()
+    if period == "ytd":
+        return pd.Timestamp(year=today.year, month=1, day=1)
+    m = re.fullmatch(r"(\d+)(d|wk|mo|y)", period)
+    if not m:
+        return None
+    return today - pd.DateOffset(**{_PERIOD_UNITS[m.group(2)]: int(m.group(1))})
+
+
+def slice_period(df: pd.DataFrame, period: str = "1y") -> pd.DataFrame:
+    """
+    Potong riwayat penuh sesuai period gaya yfinance ("5d", "1mo", "6mo", "1y", "10y", "ytd", "max").
+    Titik potong dihitung mundur dari hari ini, sama seperti yfinance. Hasil berupa slice posisi
+    (iloc) dari frame asal, bukan salinan.
+    """
+    cutoff = _cutoff(period)
+    if df is None or df.empty or cutoff is None:
+        return df
+    return df.iloc[df.index.searchsorted(cutoff):]
+
+
+def _last_good(ticker: str) -> pd.DataFrame:
+    """Riwayat terakhir yang valid tanpa ke Yahoo: frame di memori (berapa pun umurnya), lalu disk."""
+    with _FRAMES_LOCK:
+        hit = _FRAMES.get(ticker)
+    return hit[1] if hit is not None else load_history(ticker)
+
+
+def _mark_stale(df: pd.DataFrame) -> pd.DataFrame:
+    """View baru dengan attrs["stale"]=True (frame asal di memori tidak ikut ditandai)."""
+    if df is None or df.empty:
+        return df
+    df = df.iloc[:]
+    df.attrs = {**df.attrs, "stale": True}
+    return df
+
+
+def _full_history(ticker: str) -> pd.DataFrame:
+    """
+    Riwayat penuh satu ticker: memori -> disk (jika masih segar) -> refresh incremental ke Yahoo.
+    Jika circuit breaker Yahoo open, langsung kembalikan data terakhir yang valid (ditandai stale).
+    """
+    partial = _is_partial(ticker)
+    hit = None if partial else _cached(ticker)
+    if hit is not None:
+        return hit
+    if _is_fresh(ticker) and not partial:
+        df = load_history(ticker)
+        if not df.empty:
+            _remember(ticker, df, _mtime(ticker))
+            return df
+    if circuit_breaker.is_open():
+        return _mark_stale(_last_good(ticker))
+    df = refresh_history(ticker)
+    _remember(ticker, df)
+    return df
+
+
+def get_history(ticker: str, period: str = "1y") -> pd.DataFrame:
+    """
+    Riwayat harian ticker untuk period tertentu. Semua period dilayani dari satu frame riwayat penuh
+    (memori/disk); ke Yahoo hanya jika data lebih tua dari _REFRESH_TTL_SEC, dan itu pun hanya bar baru.
+    """
+    if not ticker:
+        return pd.DataFrame()
+    return slice_period(_full_history(ticker), period)
+
+
+def _split_bulk(df: pd.DataFrame, tickers: list) -> dict:
+    """Pecah hasil yf.download multi-ticker (group_by='ticker') menjadi dict ticker -> frame ternormalisasi."""
+    out = {}
+    if df is None or df.empty:
+        return out
+    if isinstance(df.columns, pd.MultiIndex):
+        for sym in df.columns.get_level_values(0).unique():
+            try:
+                sub = _normalize(df[sym])
+                if not sub.empty:
+                    out[sym] = sub
+            except Exception:
+                continue
+    elif len(tickers) == 1:
+        sub = _normalize(df)
+        if not sub.empty:
+            out[tickers[0]] = sub
+    return out
+
+
+def _bulk_download(tickers: list, **kwargs) -> dict:
+    try:
+        df = rate_limiter.call(
+            data_provider.download, tickers, group_by="ticker", auto_adjust=True, threads=True, progress=False,
+            validate=rate_limiter.non_empty, empty_is_failure=len(tickers) > 1, **kwargs
+        )
+    except Exception:
+        return {}
+    return _split_bulk(df, tickers)
+
+
+def get_many(tickers: list, period: str = "6mo", backfill: str = None) -> dict:
+    """
+    Riwayat banyak ticker sekaligus (untuk scanner). Ticker yang basi diperbarui dengan maksimal dua
+    bulk download: backfill untuk ticker baru dan incremental (sejak tanggal terlama) untuk sisanya.
+    Backfill hanya sepanjang `backfill` (default period; "max" = _BACKFILL_PERIOD) dan file ditandai parsial
+    bila lebih pendek dari _BACKFILL_PERIOD; riwayat parsial yang tidak mencakup period ikut di-backfill.
+    Return dict ticker -> DataFrame (sudah dipotong sesuai period); ticker tanpa data dilewati.
+    Saat circuit breaker Yahoo open, tidak ada download: frame tersimpan dikembalikan dengan attrs["stale"]=True.
+    """
+    backfill = backfill or period
+    if _cutoff(backfill) is None or backfill == _BACKFILL_PERIOD:
+        backfill = _BACKFILL_PERIOD
+    frames = {}
+    missing, stale = [], []
+    for t in tickers:
+        hit = _cached(t)
+        if hit is not None and _covers(t, hit, backfill):
+            frames[t] = hit
+            continue
+        df = load_history(t) if hit is None else hit
+        if df.empty or not _covers(t, df, backfill):
+            if not _no_data(t):
+                missing.append(t)
+            if not df.empty:
+                frames[t] = df
+            continue
+        frames[t] = df
+        if _is_fresh(t):
+            _remember(t, df, _mtime(t))
+        else:
+            stale.append(t)
+
+    if (missing or stale) and circuit_breaker.is_open():
+        for t in stale + [t for t in missing if t in frames]:
+            frames[t] = _mark_stale(frames[t])
+        missing, stale = [], []
+
+    if missing:
+        fetched = _bulk_download(missing, period=backfill)
+        for t, df in fetched.items():
+            _save(t, df)
+            _set_partial(t, backfill)
+            _remember(t, df)
+            frames[t] = df
+        if fetched:
+            # Yahoo menjawab batch ini; ticker yang tidak ada di hasilnya memang tanpa data
+            _remember_no_data([t for t in missing if t not in fetched and t not in frames])
+
+    if stale:
+        start = min(_incremental_start(frames[t]) for t in stale)
+        fetched = _bulk_download(stale, start=start)
+        for t in stale:
+            merged, need_backfill = _merge(frames[t], fetched.get(t, pd.DataFrame()))
+            if need_backfill:
+                merged = _fetch(t, period=_BACKFILL_PERIOD)
+                if merged.empty:
+                    continue
+                _set_partial(t)
+            if merged is frames[t]:
+                _touch(t)
+            else:
+                _save(t, merged)
+                frames[t] = merged
+            _remember(t, merged)
+
+    return {t: slice_period(df, period) for t, df in frames.items() if not df.empty}
+
+
+def _compact_slice(df: pd.DataFrame, period: str) -> pd.DataFrame:
+    """Potongan period sebagai salinan mandiri, agar frame riwayat penuh tidak ikut tertahan di memori."""
+    out = slice_period(df, period)
+    return out.copy() if out is not None else out
+
+
+def get_many_chunked(tickers: list, period: str = "6mo", chunk_size: int = 100, workers: int = 4, convert=None):
+    """
+    get_many untuk universe besar: ticker dipecah per chunk_size dan diunduh paralel (workers thread,
+    tetap di bawah rate_limiter bersama). Chunk yang gagal dilewati tanpa menghentikan chunk lain.
+    Setiap chunk langsung dikonversi (convert(df, period), default salinan potongan period) begitu selesai,
+    sehingga memori dibatasi oleh hasil ringkas, bukan riwayat penuh semua ticker.
+    Return (dict ticker -> frame, jumlah chunk gagal).
+    """
+    convert = convert or _compact_slice
+    chunks = [tickers[i:i + chunk_size] for i in range(0, len(tickers), chunk_size)]
+    out, failed = {}, 0
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(chunks) or 1)), thread_name_prefix="history-chunk") as pool:
+        futures = [pool.submit(get_many, chunk, "max", period) for chunk in chunks]
+        for fut in as_completed(futures):
+            try:
+                frames = fut.result()
+            except Exception:
+                failed += 1
+                continue
+            if not frames:
+                failed += 1
+                continue
+            for t, df in frames.items():
+                small = convert(df, period)
+                if small is not None and not small.empty:
+                    out[t] = small
+    return out, failed
@@ -0,0 +1,155 @@
+"""
+Indicators: satu pustaka indikator teknikal bersama untuk semua engine (analysis, scanner, macro, quant).
+- Setiap kernel menerima 1-D (satu ticker) atau 2-D (waktu x ticker) dan mengembalikan bentuk/tipe yang sama:
+  ndarray -> ndarray, Series -> Series, DataFrame -> DataFrame (index/kolom dipertahankan).
+- Perhitungan berjalan per kolom di atas array NumPy (rolling/ewm memakai kernel compiled pandas),
+  jadi satu panel universe dihitung dalam satu panggilan dan optimasi kernel mempercepat semua pemanggil.
+- Definisi mengikuti yang sudah dipakai aplikasi: RSI = rata-rata sederhana gain/loss (bukan Wilder),
+  MACD = EMA tanpa adjust, Bollinger std sampel (ddof=1), ATR Wilder (default) atau SMA dari TR.
+Tanpa pandas_ta agar kompatibel Python 3.14+.
+"""
+import numpy as np
+import pandas as pd
+
+
+def _panel(x):
+    """Return (array 2-D float, fungsi untuk mengembalikan hasil ke bentuk/tipe input)."""
+    if isinstance(x, pd.DataFrame):
+        return x.to_numpy(dtype=float), lambda a: pd.DataFrame(a, index=x.index, columns=x.columns)
+    if isinstance(x, pd.Series):
+        return x.to_numpy(dtype=float)[:, None], lambda a: pd.Series(a[:, 0], index=x.index, name=x.name)
+    arr = np.asarray(x, dtype=float)
+    if arr.ndim == 1:
+        return arr[:, None], lambda a: a[:, 0]
+    return arr, lambda a: a
+
+
+def _frame(a: np.ndarray) -> pd.DataFrame:
+    return pd.DataFrame(a, copy=False)
+
+
+# --- Panel dengan tanggal bolong ---
+def compact_rows(values, valid=None):
+    """
+    Per kolom, geser baris valid (default: bukan NaN) ke atas dengan urutan tetap. Return (compact, order, counts):
+    compact[k, j] = baris valid ke-k kolom j (sisanya NaN), order untuk mengembalikan ke baris asal, counts =
+    jumlah baris valid. Indikator di atas compact sama dengan menghitung per ticker setelah dropna, jadi tanggal
+    tanpa bar di panel gabungan (suspensi, belum listing) tidak memutus rolling/EMA/delta.
+    """
+    values = np.asarray(values, dtype=float)
+    valid = ~np.isnan(values) if valid is None else np.asarray(valid, dtype=bool)
+    order = np.argsort(~valid, axis=0, kind="stable")
+    counts = valid.sum(axis=0)
+    compact = np.take_along_axis(values, order, axis=0)
+    compact[np.arange(len(values))[:, None] >= counts[None, :]] = np.nan
+    return compact, order, counts
+
+
+# --- Rata-rata & sebaran ---
+def sma(x, window: int, min_periods: int = None):
+    """Simple moving average per kolom."""
+    a, back = _panel(x)
+    return back(_frame(a).rolling(window, min_periods=min_periods).mean().to_numpy(copy=True))
+
+
+def rolling_std(x, window: int, ddof: int = 1):
+    """Standar deviasi bergulir per kolom (default sampel, ddof=1, sama seperti pandas)."""
+    a, back = _panel(x)
+    return back(_frame(a).rolling(window).std(ddof=ddof).to_numpy(copy=True))
+
+
+def ema(x, span: int):
+    """Exponential moving average (adjust=False) per kolom."""
+    a, back = _panel(x)
+    return back(_frame(a).ewm(span=span, adjust=False).mean().to_numpy(copy=True))
+
+
+def bollinger(x, window: int = 20, k: float = 2.0):
+    """Bollinger Bands: (mid, upper, lower) dengan mid = SMA(window), pita = mid +/- k * std(window)."""
+    a, back = _panel(x)
+    f = _frame(a).rolling(window)
+    mid = f.mean().to_numpy(copy=True)
+    std = f.std().to_numpy(copy=True)
+    return back(mid), back(mid + k * std), back(mid - k * std)
+
+
+# --- Momentum ---
+def rsi(x, period: int = 14):
+    """RSI(period): rata-rata sederhana gain/loss `period` bar; 100 - 100/(1+RS). Loss 0 -> NaN."""
+    a, back = _panel(x)
+    delta = np.full_like(a, np.nan)
+    delta[1:] = a[1:] - a[:-1]
+    with np.errstate(invalid="ignore"):
+        gain = np.where(delta > 0, delta, 0.0)
+        loss = np.where(delta < 0, -delta, 0.0)
+    # Bar pertama tidak punya delta; rolling pandas lama menghitungnya sebagai 0
+    f_gain = _frame(gain).rolling(period, min_periods=period).mean().to_numpy()
+    f_loss = _frame(loss).rolling(period, min_periods=period).mean().to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = f_gain / np.where(f_loss == 0, np.nan, f_loss)
+        out = 100 - (100 / (1 + rs))
+    return back(out)
+
+
+def macd(x, fast: int = 12, slow: int = 26, signal: int = 9):
+    """MACD: (macd_line, signal_line) dari EMA(fast) - EMA(slow), signal = EMA(signal) dari macd_line."""
+    a, back = _panel(x)
+    f = _frame(a)
+    line = (f.ewm(span=fast, adjust=False).mean() - f.ewm(span=slow, adjust=False).mean()).to_numpy(copy=True)
+    sig = _frame(line).ewm(span=signal, adjust=False).mean().to_numpy(copy=True)
+    return back(line), back(sig)
+
+
+# --- Volatilitas ---
+def true_range(high, low, close):
+    """TR = max(High - Low, |High - PrevClose|, |Low - PrevClose|); bar pertama = High - Low."""
+    h, back = _panel(high)
+    lo, _ = _panel(low)
+    c, _ = _panel(close)
+    prev_close = np.full_like(c, np.nan)
+    prev_close[1:] = c[:-1]
+    with np.errstate(invalid="ignore"):
+        tr = np.fmax(np.fmax(h - lo, np.abs(h - prev_close)), np.abs(lo - prev_close))
+    return back(tr)
+
+
+def wilder_rma(x, period: int):
+    """
+    Wilder's RMA: nilai pertama = SMA dari `period` nilai valid pertama (per kolom), lalu
+    RMA_t = (RMA_{t-1}*(period-1) + x_t) / period, yaitu EWM alpha=1/period tanpa adjust yang di-seed SMA.
+    NaN di awal (ticker belum listing) dilewati; NaN di tengah tetap NaN di output.
+    """
+    a, back = _panel(x)
+    if len(a) == 0:
+        return back(a.copy())
+    count = np.cumsum(~np.isnan(a), axis=0)
+    has_seed = count[-1] >= period
+    seed_row = np.argmax(count >= period, axis=0)
+    cols = np.arange(a.shape[1])
+    seed = np.nancumsum(a, axis=0)[seed_row, cols] / period
+    seeded = a.copy()
+    seeded[np.arange(len(a))[:, None] < seed_row[None, :]] = np.nan
+    seeded[seed_row[has_seed], cols[has_seed]] = seed[has_seed]
+    seeded[:, ~has_seed] = np.nan
+    out = _frame(seeded).ewm(alpha=1.0 / period, adjust=False, ignore_na=True).mean().to_numpy(copy=True)
+    out[np.isnan(seeded)] = np.nan
+    return back(out)
+
+
+def atr(high, low, close, period: int = 14, method: str = "wilder"):
+    """ATR(period) dari True Range: method "wilder" (RMA, default) atau "sma" (rata-rata sederhana TR)."""
+    tr = true_range(high, low, close)
+    if method == "sma":
+        return sma(tr, period)
+    return wilder_rma(tr, period)
+
+
+# --- Volume ---
+def obv(close, volume):
+    """On-Balance Volume: kumulatif +Volume jika Close naik, -Volume jika turun (volume NaN = 0)."""
+    c, back = _panel(close)
+    v, _ = _panel(volume)
+    prev = np.full_like(c, np.nan)
+    prev[1:] = c[:-1]
+    direction = np.where(c > prev, 1.0, np.where(c < prev, -1.0, 0.0))
+    return back(np.cumsum(np.nan_to_num(v) * direction, axis=0))
@@ -0,0 +1,93 @@
+"""
+Macro Correlation: korelasi & beta bergulir seluruh saham universe terhadap simbol makro (minyak, emas, kurs, IHSG).
+- get_macro_narrative dulu hanya membandingkan perubahan 22 bar satu saham dan satu simbol. Di sini panel return
+  harian universe (panel scanner) dan makro (snapshot macro_engine) disejajarkan sekali per tanggal, lalu korelasi
+  dan beta semua pasangan saham x makro untuk beberapa window (WINDOWS) dihitung sekaligus dari jumlah berjalan
+  (quant_engine.rolling_corr_beta), tanpa loop per ticker.
+- correlation_matrix di-memo per isi data (memo): dihitung sekali per refresh panel/snapshot, rerun memakai cache.
+- sector_matrix() merangkum rata-rata korelasi per sektor (SECTOR_STOCKS) untuk heatmap.
+"""
+import numpy as np
+import pandas as pd
+
+import memo
+from macro_engine import get_macro_snapshot
+from market_scanner import SECTOR_STOCKS, _jk_list, _naive_dates, get_panel
+from quant_engine import aligned_returns, rolling_corr_beta
+
+# Simbol snapshot makro yang dikorelasikan -> label singkat
+MACRO_SYMBOLS = {"CL=F": "Minyak", "GC=F": "Emas", "IDR=X": "USD/IDR", "^JKSE": "IHSG"}
+WINDOWS = (20, 60, 120)
+
+
+def _min_obs(window: int) -> int:
+    # Toleransi suspensi/bar hilang: cukup 3/4 window bar valid
+    return max(10, window * 3 // 4)
+
+
+def macro_closes(snapshot: dict = None) -> pd.DataFrame:
+    """Close harian MACRO_SYMBOLS dari snapshot makro: DataFrame (tanggal tanpa zona waktu x simbol)."""
+    snapshot = get_macro_snapshot() if snapshot is None else snapshot
+    cols = {}
+    for sym in MACRO_SYMBOLS:
+        df = snapshot.get(sym)
+        if df is None or df.empty or "Close" not in df:
+            continue
+        s = df["Close"].copy()
+        s.index = _naive_dates(s.index)
+        cols[sym] = s[~s.index.duplicated(keep="last")]
+    return pd.DataFrame(cols)
+
+
+@memo.memoize
+def correlation_matrix(close: pd.DataFrame, macro_close: pd.DataFrame, windows: tuple = WINDOWS) -> dict:
+    """
+    Matriks saham x makro pada bar terakhir: {"corr": {window: DataFrame ticker x simbol}, "beta": {...},
+    "as_of": tanggal bar terakhir}. close dan macro_close ber-index tanggal tanpa zona waktu.
+    Pasangan dengan bar valid < 3/4 window bernilai NaN.
+    """
+    out = {"corr": {}, "beta": {}, "as_of": close.index[-1] if len(close) else None}
+    if close.empty or macro_close.empty:
+        return out
+    stock_ret, macro_ret = aligned_returns(close, macro_close)
+    for w in windows:
+        # Hanya bar terakhir yang dibutuhkan: jumlah berjalan atas `w` baris terakhir
+        corr, beta = rolling_corr_beta(stock_ret.iloc[-w:], macro_ret.iloc[-w:], w, _min_obs(w))
+        out["corr"][w] = pd.DataFrame(corr[-1], index=close.columns, columns=macro_close.columns)
+        out["beta"][w] = pd.DataFrame(beta[-1], index=close.columns, columns=macro_close.columns)
+    return out
+
+
+def get_matrix(universe: str = "prioritas", panel: dict = None) -> dict:
+    """correlation_matrix untuk seluruh ticker hasil scan (panel market_scanner) vs snapshot makro."""
+    if panel is None:
+        panel, _ = get_panel(universe)
+    if not panel:
+        return {"corr": {}, "beta": {}, "as_of": None}
+    close = pd.DataFrame(panel["Close"], index=_naive_dates(panel["index"]), columns=panel["tickers"])
+    return correlation_matrix(close, macro_closes())
+
+
+def sector_matrix(matrix: dict, window: int = 60) -> pd.DataFrame:
+    """Rata-rata korelasi per sektor (SECTOR_STOCKS) x simbol makro untuk heatmap; sektor tanpa data dilewati."""
+    corr = matrix.get("corr", {}).get(window)
+    if corr is None or corr.empty:
+        return pd.DataFrame()
+    rows = {}
+    for sector, symbols in SECTOR_STOCKS.items():
+        members = corr.reindex(_jk_list(symbols)).dropna(how="all")
+        if not members.empty:
+            rows[sector] = members.mean()
+    out = pd.DataFrame(rows).T
+    return out.rename(columns=MACRO_SYMBOLS) if not out.empty else out
+
+
+def strongest_links(matrix: dict, symbol: str, window: int = 60, top: int = 10) -> list:
+    """Ticker dengan |korelasi| terbesar terhadap `symbol`: list dict ticker, corr, beta (urut |corr| turun)."""
+    corr = matrix.get("corr", {}).get(window)
+    if corr is None or symbol not in corr:
+        return []
+    c = corr[symbol].dropna()
+    b = matrix["beta"][window][symbol]
+    order = np.argsort(-np.abs(c.to_numpy()), kind="stable")[:top]
+    return [{"ticker": t, "corr": float(c[t]), "beta": float(b[t])} for t in c.index[order]]
@@ -3,60 +3,150 @@ Macro Engine: konteks makroekonomi dan sentimen pasar IHSG.
 - IDX Fear & Greed Index (custom model).
 - Macro Dashboard: USD/IDR, Minyak WTI, Emas, Bitcoin.
 Sumber utama: yfinance. Fallback opsional: Alpha Vantage untuk USD/IDR dan BTC (lihat data_fallback.py).
-Retry + jeda antar-request untuk kurangi "offline" saat jam buka. Tidak mengubah struktur data lain.
+Semua request lewat rate_limiter (token bucket bersama): tanpa jeda saat sehat, backoff berjitter saat gagal.
+Tidak mengubah struktur data lain.
+Semua simbol makro/indeks diambil lewat satu snapshot bersama (get_macro_snapshot): satu multi-ticker
+download pada window terpanjang yang dibutuhkan, diperbarui di background; Market Mood, Macro Dashboard
+dan header IHSG (market_scanner.get_ihsg_today) dihitung dari snapshot yang sama.
 """
+import threading
 import time
 import pandas as pd
-import numpy as np
-import yfinance as yf
 
-# Retry dan jeda untuk kurangi rate limit / gagal sementara Yahoo
+import data_provider
+import indicators
+import rate_limiter
+import single_flight
+
+# Jumlah percobaan per simbol (jeda antar-percobaan diatur rate_limiter, hanya saat gagal)
 _MACRO_RETRIES = 3
-_MACRO_DELAY_SEC = 1.2
-_SYMBOL_DELAY_SEC = 0.8
 
+# Snapshot makro: simbol yang dipakai bersama dan window terpanjang yang dibutuhkan (MA200/RSI IHSG)
+SNAPSHOT_SYMBOLS = ["^JKSE", "IDR=X", "CL=F", "GC=F", "BTC-USD"]
+_SNAPSHOT_PERIOD = "1y"
+# Window 1y kadang gagal/terlalu pendek untuk indeks: ulang dengan 6mo (cukup untuk RSI/MA Market Mood)
+_SNAPSHOT_FALLBACK_PERIOD = "6mo"
+_SNAPSHOT_MIN_BARS = 100
+_SNAPSHOT_TTL_SEC = 120
+
+# {"frames": {simbol: DataFrame}, "fetched_at": epoch}; diganti utuh saat refresh
+_SNAPSHOT = {"frames": {}, "fetched_at": 0.0}
+_SNAPSHOT_LOCK = threading.Lock()
+_SNAPSHOT_REFRESHING = threading.Event()
+
+
+def _download_with_retry(ticker: str, period: str = "5d", retries: int = _MACRO_RETRIES):
+    """Download dengan retry lewat rate_limiter (backoff berjitter hanya setelah gagal). Return DataFrame atau None."""
+    def _get():
+        df = data_provider.download(ticker, period=period, auto_adjust=True, progress=False, threads=False)
+        if df is None or df.empty:
+            raise ValueError("Empty")
+        if isinstance(df.columns, pd.MultiIndex):
+            df = df.copy()
+            df.columns = df.columns.get_level_values(0)
+        return df
+
+    try:
+        return rate_limiter.call(_get, retries=retries)
+    except Exception:
+        return None
+
+
+def _download_batch(tickers: list, period: str = "5d") -> dict:
+    """
+    Satu yf.download untuk banyak simbol sekaligus (tanpa jeda). Return dict simbol -> DataFrame
+    berkolom datar (Open, High, Low, Close, Volume); simbol yang gagal/kosong tidak dimasukkan.
+    """
+    try:
+        df = rate_limiter.call(
+            data_provider.download, tickers, period=period, group_by="ticker", auto_adjust=True, progress=False, threads=True,
+            validate=rate_limiter.non_empty, empty_is_failure=True,
+        )
+    except Exception:
+        return {}
+    if df is None or df.empty:
+        return {}
+    out = {}
+    if isinstance(df.columns, pd.MultiIndex):
+        for sym in tickers:
+            if sym not in df.columns.get_level_values(0):
+                continue
+            sub = df[sym].dropna(how="all")
+            if "Close" in sub.columns and not sub["Close"].dropna().empty:
+                out[sym] = sub
+    elif len(tickers) == 1 and "Close" in df.columns:
+        out[tickers[0]] = df.dropna(how="all")
+    return out
 
-def _download_with_retry(ticker: str, period: str = "5d", retries: int = _MACRO_RETRIES, delay: float = _MACRO_DELAY_SEC):
-    """Download dengan retry; jeda antar percobaan. Return DataFrame atau None."""
-    for attempt in range(retries):
+
+def _fetch_snapshot() -> dict:
+    """
+    Satu batch download untuk semua SNAPSHOT_SYMBOLS; simbol yang kosong diulang per simbol (dengan retry).
+    Simbol yang tetap kosong atau < _SNAPSHOT_MIN_BARS bar dicoba lagi dengan _SNAPSHOT_FALLBACK_PERIOD
+    (yang lebih panjang dipakai).
+    """
+    frames = _download_batch(SNAPSHOT_SYMBOLS, period=_SNAPSHOT_PERIOD)
+    for sym in SNAPSHOT_SYMBOLS:
+        df = frames.get(sym)
+        if df is None:
+            df = _download_with_retry(sym, period=_SNAPSHOT_PERIOD, retries=2)
+        if df is None or len(df) < _SNAPSHOT_MIN_BARS:
+            short = _download_with_retry(sym, period=_SNAPSHOT_FALLBACK_PERIOD, retries=2)
+            if short is not None and (df is None or len(short) > len(df)):
+                df = short
+        if df is not None:
+            frames[sym] = df
+    return frames
+
+
+def _refresh_snapshot() -> dict:
+    frames = single_flight.run("macro_snapshot", _fetch_snapshot)
+    with _SNAPSHOT_LOCK:
+        # Simbol yang gagal kali ini tetap memakai data terakhir yang valid
+        merged = {**_SNAPSHOT["frames"], **frames}
+        _SNAPSHOT.update(frames=merged, fetched_at=time.time())
+    return merged
+
+
+def _refresh_in_background() -> None:
+    # Cek-dan-set di bawah lock: rerun bersamaan tidak boleh memulai dua thread refresh
+    with _SNAPSHOT_LOCK:
+        if _SNAPSHOT_REFRESHING.is_set():
+            return
+        _SNAPSHOT_REFRESHING.set()
+
+    def _job():
         try:
-            df = yf.download(ticker, period=period, auto_adjust=True, progress=False, threads=False)
-            if df is None or df.empty:
-                raise ValueError("Empty")
-            if isinstance(df.columns, pd.MultiIndex):
-                df = df.copy()
-                df.columns = df.columns.get_level_values(0)
-            return df
+            _refresh_snapshot()
         except Exception:
-            if attempt < retries - 1:
-                time.sleep(delay)
-            else:
-                return None
-    return None
+            pass
+        finally:
+            _SNAPSHOT_REFRESHING.clear()
 
+    threading.Thread(target=_job, name="macro-snapshot-refresh", daemon=True).start()
 
-def _rsi(series: pd.Series, period: int = 14) -> pd.Series:
-    """RSI(period) dari harga penutupan."""
-    delta = series.diff()
-    gain = delta.where(delta > 0, 0.0)
-    loss = (-delta).where(delta < 0, 0.0)
-    avg_gain = gain.rolling(period, min_periods=period).mean()
-    avg_loss = loss.rolling(period, min_periods=period).mean()
-    rs = avg_gain / avg_loss.replace(0, np.nan)
-    return 100 - (100 / (1 + rs))
+
+def get_macro_snapshot() -> dict:
+    """
+    Snapshot makro/indeks bersama: dict simbol -> DataFrame harian (window _SNAPSHOT_PERIOD).
+    Belum ada data: fetch sinkron (pemanggil bersamaan digabung). Lebih tua dari _SNAPSHOT_TTL_SEC:
+    kembalikan data lama seketika dan perbarui di background (stale-while-revalidate).
+    """
+    with _SNAPSHOT_LOCK:
+        frames = _SNAPSHOT["frames"]
+        age = time.time() - _SNAPSHOT["fetched_at"]
+    if not frames:
+        return _refresh_snapshot()
+    if age >= _SNAPSHOT_TTL_SEC:
+        _refresh_in_background()
+    return frames
 
 
 def _atr_series(df: pd.DataFrame, period: int = 14) -> pd.Series:
-    """ATR(period) untuk deteksi volatilitas."""
+    """ATR(period) untuk deteksi volatilitas (rata-rata sederhana TR; cukup untuk deteksi spike)."""
     if df is None or df.empty or len(df) < 2:
         return pd.Series(dtype=float)
-    high = df["High"]
-    low = df["Low"]
-    close = df["Close"]
-    prev = close.shift(1)
-    tr = pd.concat([high - low, (high - prev).abs(), (low - prev).abs()], axis=1).max(axis=1)
-    atr = tr.rolling(period).mean()
-    return atr
+    return indicators.atr(df["High"], df["Low"], df["Close"], period, method="sma")
 
 
 def calculate_market_mood() -> dict:
@@ -70,20 +160,18 @@ def calculate_market_mood() -> dict:
     """
     out = {"score": 50, "label": "Neutral", "error": None}
     try:
-        ihsg = _download_with_retry("^JKSE", period="1y", retries=_MACRO_RETRIES, delay=_MACRO_DELAY_SEC)
-        if ihsg is None or ihsg.empty or len(ihsg) < 100:
-            ihsg = _download_with_retry("^JKSE", period="6mo", retries=2, delay=_MACRO_DELAY_SEC)
+        snap = get_macro_snapshot()
+        ihsg = snap.get("^JKSE")
         if ihsg is None or ihsg.empty or len(ihsg) < 50:
             out["error"] = "Data IHSG tidak cukup untuk Market Mood. Coba refresh beberapa saat lagi."
             return out
-        time.sleep(_SYMBOL_DELAY_SEC)
-        idr = _download_with_retry("IDR=X", period="3mo", retries=2, delay=_MACRO_DELAY_SEC)
+        idr = snap.get("IDR=X")
         score = 50.0
         close = ihsg["Close"] if "Close" in ihsg.columns else ihsg.iloc[:, 0]
         n = len(ihsg)
         ihsg = ihsg.copy()
-        ihsg["MA200"] = close.rolling(min(200, n)).mean()
-        ihsg["RSI"] = _rsi(close, 14)
+        ihsg["MA200"] = indicators.sma(close, min(200, n))
+        ihsg["RSI"] = indicators.rsi(close, 14)
         atr = _atr_series(ihsg, 14)
         last = ihsg.iloc[-1]
         rsi = last.get("RSI")
@@ -101,7 +189,7 @@ def calculate_market_mood() -> dict:
                 score -= 10
         if idr is not None and not idr.empty and len(idr) >= 20:
             idr_close = idr["Close"] if "Close" in idr.columns else idr.iloc[:, 0]
-            idr_ma20 = idr_close.rolling(20).mean().iloc[-1]
+            idr_ma20 = indicators.sma(idr_close, 20).iloc[-1]
             idr_last = float(idr_close.iloc[-1])
             if pd.notna(idr_ma20) and idr_ma20 > 0:
                 if idr_last > idr_ma20:
@@ -134,7 +222,8 @@ def calculate_market_mood() -> dict:
 def get_macro_indicators() -> dict:
     """
     Harga real-time: USD/IDR (IDR=X), Minyak WTI (CL=F), Emas (GC=F), BTC (BTC-USD).
-    Sumber utama: Yahoo Finance (yfinance). Jika gagal untuk IDR/BTC, coba fallback Alpha Vantage (opsional).
+    Sumber utama: snapshot makro bersama (get_macro_snapshot, satu batch download + retry per simbol yang kosong).
+    Jika tetap gagal untuk IDR/BTC, coba fallback Alpha Vantage (opsional).
     Return: dict dengan key idr, oil, gold, btc; masing-masing {price, pct_change, error}.
     """
     symbols = {"idr": "IDR=X", "oil": "CL=F", "gold": "GC=F", "btc": "BTC-USD"}
@@ -146,20 +235,19 @@ def get_macro_indicators() -> dict:
     except Exception:
         pass
 
+    snap = get_macro_snapshot()
     for key, ticker in symbols.items():
         result[key] = {"price": None, "pct_change": 0.0, "error": None}
-        df = _download_with_retry(ticker, period="5d", retries=_MACRO_RETRIES, delay=_MACRO_DELAY_SEC)
+        df = snap.get(ticker)
         if df is None or len(df) < 2:
             result[key]["error"] = "Data sementara tidak tersedia"
             if av_key and key == "idr":
-                time.sleep(_SYMBOL_DELAY_SEC)
                 fallback = fetch_fx_av(av_key, "USD", "IDR")
                 if fallback:
                     result[key]["price"] = fallback["price"]
                     result[key]["pct_change"] = fallback["pct_change"]
                     result[key]["error"] = None
             elif av_key and key == "btc":
-                time.sleep(_SYMBOL_DELAY_SEC)
                 fallback = fetch_crypto_av(av_key, "BTC", "USD")
                 if fallback:
                     result[key]["price"] = fallback["price"]
@@ -168,6 +256,7 @@ def get_macro_indicators() -> dict:
         else:
             try:
                 close = df["Close"] if "Close" in df.columns else df.iloc[:, 0]
+                close = close.dropna()
                 last = float(close.iloc[-1])
                 prev = float(close.iloc[-2])
                 pct = (last / prev - 1) * 100 if prev and prev > 0 else 0.0
@@ -175,5 +264,4 @@ def get_macro_indicators() -> dict:
                 result[key]["pct_change"] = round(pct, 2)
             except Exception:
                 result[key]["error"] = "Data sementara tidak tersedia"
-        time.sleep(_SYMBOL_DELAY_SEC)
     return result
@@ -1,15 +1,35 @@
 """
 Daily Opportunity Dashboard - Market Scanner.
 Memindai saham likuid (LQ45 & IDX80) untuk rekomendasi Day Trade, Swing, dan Invest.
+Mode universe="all": seluruh saham tercatat di IDX (daftar dari file, lihat load_universe), diunduh per chunk paralel.
 Tanpa pandas_ta: RSI, MACD, MA, VWAP dihitung manual (kompatibel Python 3.14).
+Screener bekerja di panel lebar (tanggal x ticker, lihat build_panel): indikator dihitung sekali untuk semua
+ticker dan kondisi dievaluasi sebagai mask boolean, bukan loop per ticker. Indikator dihitung atas bar milik
+masing-masing ticker (_ticker_rows), jadi tanggal bolong di panel gabungan tidak mengubah hasil. Zona pivot S/R seluruh panel
+dihitung sekali per scan (pivot_zones) dan pick membawa support/resistance terdekat.
+Panel di-cache per isi data (get_panel) dan dipakai bersama scan, screen kustom, RS leaderboard dan korelasi makro.
 """
+import os
+import threading
 import pandas as pd
 import numpy as np
-import yfinance as yf
 import streamlit as st
 from datetime import datetime, timezone
 import pytz
 
+import data_provider
+import history_store
+import indicators
+import memo
+import pivot_zones
+import rate_limiter
+import screen_dsl
+from bars import BarSet
+from macro_engine import get_macro_snapshot
+from quant_engine import rs_leaderboard
+from single_flight import coalesce
+from utils import cache_dir
+
 # Daftar saham likuid prioritas scan (LQ45 + IDX80, unik)
 LQ45 = [
     "BBCA", "BBRI", "BMRI", "BNGA", "BBNI", "ASII", "GOTO", "TLKM", "ICBP", "UNVR",
@@ -38,6 +58,11 @@ SECTOR_STOCKS = {
 }
 
 
+# Scan seluruh bursa: ukuran chunk bulk download dan jumlah chunk paralel (tetap di bawah rate_limiter)
+UNIVERSE_CHUNK_SIZE = 100
+_UNIVERSE_WORKERS = 4
+
+
 def _ensure_jk(symbol: str) -> str:
     return f"{symbol}.JK" if not symbol.endswith(".JK") else symbol
 
@@ -47,171 +72,305 @@ def _jk_list(symbols: list) -> list:
 
 
 @st.cache_data(ttl=600)
+@coalesce
 def fetch_market_data():
     """
-    Bulk download data 6 bulan untuk semua ticker prioritas.
-    Mengembalikan dict ticker -> DataFrame (Open, High, Low, Close, Volume).
+    Data 6 bulan untuk semua ticker prioritas, dibaca dari history store lokal
+    (bulk download hanya untuk ticker baru dan bar yang belum tersimpan).
+    Mengembalikan BarSet ringkas (bars.py; bisa dipakai seperti dict ticker -> DataFrame OHLCV)
+    agar cache Streamlit kecil dan murah di-pickle.
     """
     tickers = _jk_list(TICKERS_PRIORITAS)
     try:
-        df = yf.download(
-            tickers,
-            period="6mo",
-            group_by="ticker",
-            auto_adjust=True,
-            threads=True,
-            progress=False,
-        )
-        if df.empty or len(df) < 20:
+        out = history_store.get_many(tickers, period="6mo")
+        if not out or max(len(df) for df in out.values()) < 20:
             return {}
-        # MultiIndex columns (group_by='ticker'): level 0 = ticker symbol
-        if isinstance(df.columns, pd.MultiIndex):
-            out = {}
-            for sym in df.columns.get_level_values(0).unique():
-                try:
-                    sub = df[sym].copy()
-                    if sub is None or sub.empty:
-                        continue
-                    if isinstance(sub.columns, pd.MultiIndex):
-                        sub.columns = sub.columns.get_level_values(0)
-                    if "Close" not in sub.columns:
-                        continue
-                    out[sym] = sub
-                except Exception:
-                    continue
-            return out
-        # Satu ticker: DataFrame flat (Open, High, Low, Close, Volume)
-        return {tickers[0]: df.copy()} if len(tickers) == 1 else {}
+        return BarSet.from_frames(out)
     except Exception:
         return {}
 
 
-def _rsi(close: pd.Series, period: int = 14) -> pd.Series:
-    delta = close.diff()
-    gain = delta.where(delta > 0, 0.0)
-    loss = (-delta).where(delta < 0, 0.0)
-    avg_gain = gain.rolling(period).mean()
-    avg_loss = loss.rolling(period).mean()
-    rs = avg_gain / avg_loss.replace(0, np.nan)
-    return 100 - (100 / (1 + rs))
+def load_universe():
+    """
+    Kode seluruh saham IDX (tanpa .JK) untuk scan universe="all". Dibaca dari file env IDX_UNIVERSE_FILE,
+    default cache_dir()/idx_universe.txt: satu kode per baris (atau CSV, kolom pertama; baris "#" diabaikan).
+    Daftar emiten berubah (IPO/delisting) sehingga tidak di-hardcode (lihat DEPLOY.md untuk cara mengisinya).
+    Return (kode, from_file); jika file tidak ada atau kosong: (TICKERS_PRIORITAS, False), agar UI bisa memberi tahu.
+    """
+    path = os.environ.get("IDX_UNIVERSE_FILE") or os.path.join(cache_dir(), "idx_universe.txt")
+    try:
+        with open(path, encoding="utf-8") as f:
+            codes = [line.split(",")[0].strip().upper() for line in f]
+    except OSError:
+        return list(TICKERS_PRIORITAS), False
+    codes = [c.replace(".JK", "") for c in codes if c and not c.startswith("#") and c.replace(".JK", "").isalnum()]
+    codes = list(dict.fromkeys(codes))
+    return (codes, True) if codes else (list(TICKERS_PRIORITAS), False)
+
 
+@st.cache_data(ttl=600)
+@coalesce
+def fetch_universe_data():
+    """
+    Data 6 bulan untuk seluruh universe IDX (load_universe), diunduh per UNIVERSE_CHUNK_SIZE ticker secara
+    paralel; chunk yang gagal dilewati. Return (BarSet ticker -> bar, jumlah chunk gagal, from_file);
+    from_file False = file universe tidak ada dan yang dipindai hanya TICKERS_PRIORITAS.
+    """
+    codes, from_file = load_universe()
+    tickers = _jk_list(codes)
+    try:
+        data, failed = history_store.get_many_chunked(
+            tickers, period="6mo", chunk_size=UNIVERSE_CHUNK_SIZE, workers=_UNIVERSE_WORKERS
+        )
+        return BarSet.from_frames(data), failed, from_file
+    except Exception:
+        return {}, 0, from_file
 
-def _macd(close: pd.Series, fast=12, slow=26, signal=9):
-    ema_fast = close.ewm(span=fast, adjust=False).mean()
-    ema_slow = close.ewm(span=slow, adjust=False).mean()
-    macd_line = ema_fast - ema_slow
-    signal_line = macd_line.ewm(span=signal, adjust=False).mean()
-    return macd_line, signal_line
 
+_PANEL_FIELDS = ("Open", "High", "Low", "Close", "Volume")
 
-def _vwap_daily(row: pd.Series) -> float:
-    """VWAP satu hari: Typical Price (H+L+C)/3 (proxy tanpa data intraday)."""
-    h, l, c = row.get("High", row.get("Close")), row.get("Low", row.get("Close")), row["Close"]
-    return (h + l + c) / 3 if pd.notna(h) and pd.notna(l) else float(c)
+# universe -> (sidik jari data, panel, Evaluator) terakhir (lihat get_panel)
+_PANELS = {}
+_PANEL_LOCK = threading.Lock()
 
 
-def screen_day_trade(data: dict) -> list:
+def build_panel(data: dict) -> dict:
     """
-    Day Trading: Volume spike > 1.2x avg vol 20d, candle hijau (Close > Open), Harga > VWAP.
-    Output: Top 3 dengan % kenaikan hari ini tertinggi.
+    Satu panel lebar (tanggal x ticker) per field OHLCV dari dict ticker -> DataFrame, index = gabungan tanggal.
+    Open yang kosong diisi Close (candle tanpa Open tidak dihitung hijau). Selain field, panel membawa:
+    - "tickers": urutan kolom (urutan dict data), "rows": jumlah bar per ticker (len(df)),
+    - "last": posisi baris bar terakhir tiap ticker di panel, agar kondisi tetap dievaluasi di bar terakhir
+      masing-masing ticker meskipun ada saham yang disuspensi / belum punya bar hari ini.
+    Dibangun sekali per scan dan dipakai bersama oleh screen_day_trade, screen_swing, dan screen_invest.
+    data berupa BarSet (fetch_market_data): panel langsung dari view array-nya, tanpa menyalin OHLC.
     """
-    results = []
-    for sym, df in data.items():
-        if df is None or len(df) < 21:
-            continue
-        try:
-            df = df.copy()
-            last = df.iloc[-1]
-            prev = df.iloc[-21:-1]
-            vol_today = last.get("Volume") or 0
-            avg_vol_20 = prev["Volume"].mean() if "Volume" in prev else 0
-            if avg_vol_20 <= 0 or vol_today < 1.2 * avg_vol_20:
-                continue
-            open_ = last.get("Open", last["Close"])
-            close = last["Close"]
-            if close <= open_:
-                continue
-            vwap_today = _vwap_daily(last)
-            if close <= vwap_today:
-                continue
-            pct = (close / open_ - 1) * 100 if open_ and open_ > 0 else 0
-            results.append({"ticker": sym, "close": close, "pct_change": pct, "volume_ratio": vol_today / avg_vol_20})
-        except Exception:
-            continue
-    results.sort(key=lambda x: x["pct_change"], reverse=True)
-    return results[:3]
+    if isinstance(data, BarSet):
+        return data.panel()
+    frames = {sym: df for sym, df in data.items() if df is not None and len(df) and "Close" in df.columns}
+    if not frames:
+        return {}
+    tickers = list(frames)
+    dfs = list(frames.values())
+    index = dfs[0].index.append([df.index for df in dfs[1:]]).unique().sort_values()
+    panel = {field: np.full((len(index), len(tickers)), np.nan) for field in _PANEL_FIELDS}
+    for j, df in enumerate(dfs):
+        rows = slice(None) if df.index.equals(index) else index.get_indexer(df.index)
+        for field in _PANEL_FIELDS:
+            if field in df.columns:
+                panel[field][rows, j] = df[field].to_numpy(dtype=float)
+    panel["Open"] = np.where(np.isnan(panel["Open"]), panel["Close"], panel["Open"])
+    panel["index"] = index
+    panel["tickers"] = np.array(tickers, dtype=object)
+    panel["rows"] = np.array([len(df) for df in dfs])
+    panel["last"] = index.get_indexer([df.index[-1] for df in dfs])
+    return panel
+
+
+def _data_key(data) -> tuple:
+    """Sidik jari isi data pasar: st.cache_data mengembalikan salinan baru tiap rerun, jadi identitas objek tak bisa dipakai."""
+    if isinstance(data, BarSet):
+        return ("bars", len(data.index), memo._digest(data.index.asi8, data.tickers, data.ohlc, data.volume))
+    return ("frames", tuple((sym, memo.fingerprint(df)) for sym, df in data.items() if df is not None))
+
+
+def get_panel(universe: str = "prioritas"):
+    """
+    Panel (build_panel) + screen_dsl.Evaluator untuk data universe saat ini, dibangun sekali per isi data dan
+    dipakai bersama oleh run_scan, run_custom_screens, get_rs_leaderboard dan macro_correlation.get_matrix di
+    setiap rerun. Evaluator ikut di-cache, jadi indikator screen kustom tidak dihitung ulang selama data sama.
+    Return (panel, evaluator); ({}, None) jika data tidak tersedia.
+    """
+    data = fetch_universe_data()[0] if universe == "all" else fetch_market_data()
+    if not data:
+        return {}, None
+    key = _data_key(data)
+    with _PANEL_LOCK:
+        hit = _PANELS.get(universe)
+    if hit is not None and hit[0] == key:
+        return hit[1], hit[2]
+    panel = build_panel(data)
+    evaluator = screen_dsl.Evaluator(panel) if panel else None
+    with _PANEL_LOCK:
+        _PANELS[universe] = (key, panel, evaluator)
+    return panel, evaluator
+
+
+def _at(values: np.ndarray, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+    """Ambil satu nilai per ticker: values[rows[i], cols[i]]."""
+    return values[rows, cols]
+
+
+def _top_n(scores: np.ndarray, n: int = 3) -> np.ndarray:
+    """
+    Indeks n skor tertinggi, urut turun (seri: urutan asal seperti sort stabil). Partial sort: hanya kandidat
+    >= skor ke-n yang diurutkan, bukan seluruh universe.
+    """
+    if len(scores) > n:
+        kth = np.partition(scores, len(scores) - n)[len(scores) - n]
+        idx = np.flatnonzero(scores >= kth)
+    else:
+        idx = np.arange(len(scores))
+    return idx[np.lexsort((idx, -scores[idx]))][:n]
+
 
+def _eligible(panel: dict, min_rows: int):
+    """(kolom, baris bar terakhir) ticker dengan minimal min_rows bar."""
+    cols = np.flatnonzero(panel["rows"] >= min_rows)
+    return cols, panel["last"][cols]
 
-def screen_swing(data: dict) -> list:
+
+def _ticker_rows(panel: dict, field: str, cols: np.ndarray):
     """
-    Swing: Harga > MA20, RSI(14) antara 40-65, MACD > Signal.
-    Output: Top 3 dengan RSI paling dekat 50-60 (seimbang).
+    panel[field][:, cols] dalam urutan bar milik tiap ticker (indicators.compact_rows dengan mask Close): tanggal
+    tanpa bar ticker itu (suspensi, belum listing) dibuang, jadi indikator sama dengan dihitung per ticker.
+    Return (values, last) dengan last = baris bar terakhir tiap ticker di values.
     """
-    results = []
-    for sym, df in data.items():
-        if df is None or len(df) < 35:
-            continue
-        try:
-            df = df.copy()
-            close = df["Close"]
-            df["MA20"] = close.rolling(20).mean()
-            df["RSI"] = _rsi(close, 14)
-            macd_line, signal_line = _macd(close)
-            df["MACD"], df["MACD_signal"] = macd_line, signal_line
-            last = df.iloc[-1]
-            ma20 = last.get("MA20")
-            rsi = last.get("RSI")
-            macd_val = last.get("MACD")
-            sig_val = last.get("MACD_signal")
-            if pd.isna(ma20) or last["Close"] <= ma20:
-                continue
-            if pd.isna(rsi) or rsi < 40 or rsi > 65:
-                continue
-            if pd.isna(macd_val) or pd.isna(sig_val) or macd_val <= sig_val:
-                continue
-            dist = min(abs(rsi - 50), abs(rsi - 60))
-            support_dist = (last["Close"] - ma20) / ma20 * 100 if ma20 and ma20 > 0 else 0
-            results.append({
-                "ticker": sym, "close": last["Close"], "rsi": rsi, "ma20": ma20,
-                "dist_support_pct": support_dist, "score_balance": -dist,
-            })
-        except Exception:
-            continue
-    results.sort(key=lambda x: x["score_balance"], reverse=True)
-    return results[:3]
+    values, _, counts = indicators.compact_rows(panel[field][:, cols], ~np.isnan(panel["Close"][:, cols]))
+    return values, counts - 1
 
 
-def screen_invest(data: dict) -> list:
+def screen_day_trade(data: dict, panel: dict = None) -> list:
+    """
+    Day Trading: Volume spike > 1.2x avg vol 20d, candle hijau (Close > Open), Harga > VWAP.
+    Output: Top 3 dengan % kenaikan hari ini tertinggi.
+    VWAP harian = Typical Price (H+L+C)/3 (proxy tanpa data intraday). Semua kondisi berupa mask vektor di panel.
+    """
+    panel = panel if panel is not None else build_panel(data)
+    if not panel:
+        return []
+    cols, last = _eligible(panel, 21)
+    if not len(cols):
+        return []
+    # Rata-rata volume 20 bar (milik ticker) sebelum bar terakhir (bar terakhir tidak ikut)
+    volume, vol_last = _ticker_rows(panel, "Volume", cols)
+    avg_vol_20 = _at(indicators.sma(volume, 20, min_periods=1), vol_last - 1, np.arange(len(cols)))
+    vol = np.nan_to_num(panel["Volume"][last, cols])
+    open_, high, low, close = (panel[f][last, cols] for f in ("Open", "High", "Low", "Close"))
+    vwap = np.where(np.isnan(high) | np.isnan(low), close, (high + low + close) / 3)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mask = (avg_vol_20 > 0) & (vol >= 1.2 * avg_vol_20) & (close > open_) & (close > vwap)
+        pct = np.where(open_ > 0, (close / open_ - 1) * 100, 0.0)
+    sel = np.flatnonzero(mask)
+    return [
+        {"ticker": panel["tickers"][cols[i]], "close": float(close[i]), "pct_change": float(pct[i]),
+         "volume_ratio": float(vol[i] / avg_vol_20[i])}
+        for i in sel[_top_n(pct[sel])]
+    ]
+
+
+def screen_swing(data: dict, panel: dict = None) -> list:
+    """
+    Swing: Harga > MA20, RSI(14) antara 40-65, MACD > Signal.
+    Output: Top 3 dengan RSI paling dekat 50-60 (seimbang).
+    MA20, RSI, dan MACD dihitung sekali untuk seluruh panel (satu panggilan indicators per indikator).
+    """
+    panel = panel if panel is not None else build_panel(data)
+    if not panel:
+        return []
+    cols, last = _eligible(panel, 35)
+    if not len(cols):
+        return []
+    close_panel, last = _ticker_rows(panel, "Close", cols)
+    pos = np.arange(len(cols))
+    close = close_panel[last, pos]
+    ma20 = _at(indicators.sma(close_panel, 20), last, pos)
+    rsi = _at(indicators.rsi(close_panel, 14), last, pos)
+    macd_line, signal_line = indicators.macd(close_panel)
+    macd_val, sig_val = _at(macd_line, last, pos), _at(signal_line, last, pos)
+    with np.errstate(invalid="ignore"):
+        mask = (close > ma20) & (rsi >= 40) & (rsi <= 65) & (macd_val > sig_val)
+        score = -np.minimum(np.abs(rsi - 50), np.abs(rsi - 60))
+        support = np.where(ma20 > 0, (close - ma20) / ma20 * 100, 0.0)
+    sel = np.flatnonzero(mask)
+    return [
+        {"ticker": panel["tickers"][cols[i]], "close": float(close[i]), "rsi": float(rsi[i]), "ma20": float(ma20[i]),
+         "dist_support_pct": float(support[i]), "score_balance": float(score[i])}
+        for i in sel[_top_n(score[sel])]
+    ]
+
+
+def screen_invest(data: dict, panel: dict = None) -> list:
     """
     Invest: Harga > MA200, koreksi 5-15% dari high 52 minggu (buy on dip).
     Output: Top 3 yang memenuhi.
     """
-    results = []
-    for sym, df in data.items():
-        if df is None or len(df) < 200:
-            continue
+    panel = panel if panel is not None else build_panel(data)
+    if not panel:
+        return []
+    cols, last = _eligible(panel, 200)
+    if not len(cols):
+        return []
+    close_panel, last = _ticker_rows(panel, "Close", cols)
+    pos = np.arange(len(cols))
+    close = close_panel[last, pos]
+    ma200 = _at(indicators.sma(close_panel, 200), last, pos)
+    # High 52 minggu = maks 252 bar terakhir (atau seluruh riwayat jika lebih pendek)
+    high_52w = _at(pd.DataFrame(close_panel).rolling(252, min_periods=1).max().to_numpy(), last, pos)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        discount = (1 - close / high_52w) * 100
+        mask = (close > ma200) & (high_52w > 0) & (discount >= 5) & (discount <= 15)
+    sel = np.flatnonzero(mask)
+    return [  # diskon lebih dalam = lebih "murah"
+        {"ticker": panel["tickers"][cols[i]], "close": float(close[i]), "ma200": float(ma200[i]),
+         "high_52w": float(high_52w[i]), "discount_pct": float(discount[i])}
+        for i in sel[_top_n(discount[sel])]
+    ]
+
+
+def run_custom_screens(screens: dict, universe: str = "prioritas", limit: int = 10) -> dict:
+    """
+    Jalankan screen buatan pengguna (nama -> ekspresi screen_dsl) di panel universe yang sama dengan run_scan.
+    Semua screen dievaluasi dengan Evaluator bersama (get_panel), jadi indikator yang sama hanya dihitung sekali
+    per data, juga lintas rerun. Return nama -> {"matches": [{"ticker", "close", "pct_change"}] (Top limit,
+    % hari ini tertinggi), "count": jumlah lolos, "error": pesan jika ekspresi tidak valid}.
+    """
+    panel, ev = get_panel(universe)
+    out = {}
+    if not panel:
+        return {name: {"matches": [], "count": 0, "error": "Data pasar tidak tersedia."} for name in screens}
+    close = ev.value(("field", "close"))
+    pct = ev.value(("call", "change", (1,)))
+    for name, text in screens.items():
         try:
-            df = df.copy()
-            close = df["Close"]
-            df["MA200"] = close.rolling(200).mean()
-            last = df.iloc[-1]
-            ma200 = last.get("MA200")
-            if pd.isna(ma200) or last["Close"] <= ma200:
-                continue
-            high_52w = close.iloc[-252:].max() if len(close) >= 252 else close.max()
-            if high_52w <= 0:
-                continue
-            discount = (1 - last["Close"] / high_52w) * 100
-            if discount < 5 or discount > 15:
-                continue
-            results.append({
-                "ticker": sym, "close": last["Close"], "ma200": ma200,
-                "high_52w": high_52w, "discount_pct": discount,
-            })
-        except Exception:
+            sel = np.flatnonzero(ev.mask(text))
+        except screen_dsl.ScreenSyntaxError as e:
+            out[name] = {"matches": [], "count": 0, "error": str(e)}
             continue
-    results.sort(key=lambda x: x["discount_pct"], reverse=True)  # diskon lebih dalam = lebih "murah"
-    return results[:3]
+        order = sel[_top_n(np.nan_to_num(pct[sel], nan=-np.inf), limit)]
+        out[name] = {
+            "matches": [{"ticker": panel["tickers"][i], "close": float(close[i]), "pct_change": float(pct[i])} for i in order],
+            "count": int(len(sel)),
+            "error": None,
+        }
+    return out
+
+
+def _naive_dates(index: pd.Index) -> pd.DatetimeIndex:
+    """Index tanggal tanpa zona waktu (agar panel saham dan IHSG bisa di-align per tanggal)."""
+    index = pd.DatetimeIndex(index)
+    return (index.tz_localize(None) if index.tz is not None else index).normalize()
+
+
+def get_rs_leaderboard(universe: str = "prioritas", top: int = 10, panel: dict = None) -> list:
+    """
+    Papan peringkat Mansfield RS vs IHSG untuk seluruh ticker hasil scan, dihitung sekali di panel Close
+    (quant_engine.rs_leaderboard). Return Top `top` dict ticker, mansfield_rs, rank, percentile, slope.
+    """
+    if panel is None:
+        panel, _ = get_panel(universe)
+    bench = get_macro_snapshot().get("^JKSE")
+    if not panel or bench is None or bench.empty:
+        return []
+    close = pd.DataFrame(panel["Close"], index=_naive_dates(panel["index"]), columns=panel["tickers"])
+    bench_close = bench["Close"].copy()
+    bench_close.index = _naive_dates(bench_close.index)
+    bench_close = bench_close[~bench_close.index.duplicated(keep="last")]
+    board = rs_leaderboard(close, bench_close, period_sma=52).head(top)
+    return [
+        {"ticker": sym, "mansfield_rs": float(row["Mansfield_RS"]), "rank": int(row["RS_Rank"]),
+         "percentile": float(row["RS_Percentile"]), "slope": float(row["RS_Slope"])}
+        for sym, row in board.iterrows()
+    ]
 
 
 def get_top_sectors(data: dict) -> list:
@@ -276,19 +435,37 @@ def screen_defensive_fallback(data: dict) -> list:
     return results[:3]
 
 
-def run_scan():
+def _with_zones(picks: list) -> list:
+    """Tambahkan harga zona pivot support/resistance terdekat (pivot_zones, lookup cache) ke setiap pick."""
+    for p in picks:
+        entry = pivot_zones.lookup(p["ticker"])
+        sup = pivot_zones.nearest(entry, "support")
+        res = pivot_zones.nearest(entry, "resistance")
+        p["support_zone"] = sup["price"] if sup else None
+        p["resistance_zone"] = res["price"] if res else None
+    return picks
+
+
+def run_scan(universe: str = "prioritas"):
     """
     Jalankan pemindaian lengkap. Return dict day_trade, swing, invest, defensive (fallback).
     Jika tidak ada yang lolos ketiga kategori, isi defensive dengan Top 3 saham defensif
     agar halaman tidak terlihat sepi saat pasar crash.
+    universe: "prioritas" (LQ45 + IDX80) atau "all" (seluruh bursa, lihat fetch_universe_data).
     """
     try:
-        data = fetch_market_data()
+        failed_chunks, from_file = 0, True
+        if universe == "all":
+            data, failed_chunks, from_file = fetch_universe_data()
+        else:
+            data = fetch_market_data()
         if not data:
             return {"day_trade": [], "swing": [], "invest": [], "defensive": [], "error": "Data pasar tidak tersedia (pasar tutup atau gagal fetch)."}
-        day_trade = screen_day_trade(data)
-        swing = screen_swing(data)
-        invest = screen_invest(data)
+        panel, _ = get_panel(universe)
+        pivot_zones.update_panel(panel)
+        day_trade = _with_zones(screen_day_trade(data, panel))
+        swing = _with_zones(screen_swing(data, panel))
+        invest = _with_zones(screen_invest(data, panel))
         defensive = screen_defensive_fallback(data) if (not day_trade and not swing and not invest) else []
         return {
             "day_trade": day_trade,
@@ -296,6 +473,9 @@ def run_scan():
             "invest": invest,
             "defensive": defensive,
             "error": None,
+            "scanned": len(data),
+            "failed_chunks": failed_chunks,
+            "universe_from_file": from_file,
         }
     except Exception as e:
         return {"day_trade": [], "swing": [], "invest": [], "defensive": [], "error": str(e)}
@@ -303,12 +483,12 @@ def run_scan():
 
 def get_ihsg_today():
     """
-    Ambil IHSG (^JKSE): harga terakhir dan perubahan %.
+    Ambil IHSG (^JKSE) dari snapshot makro bersama: harga terakhir dan perubahan %.
     Fallback: Jika data hari ini belum ada (Yahoo telat update indeks), pakai data penutupan
     terakhir yang valid (mis. kemarin) agar tampilan dan perhitungan (mis. Mansfield RS) tidak crash.
     """
     try:
-        df = yf.download("^JKSE", period="5d", auto_adjust=True, progress=False, threads=False)
+        df = get_macro_snapshot().get("^JKSE")
         if df is None or df.empty or len(df) < 1:
             return None, None, None
         # Ambil baris terakhir; jika Close NaN (indeks belum di-update), fallback ke baris sebelumnya
@@ -334,39 +514,122 @@ def get_ihsg_today():
         return None, None, None
 
 
+# Buffer bar intraday per (ticker, interval), sudah WIB, plus jumlah berjalan untuk VWAP (_cum_tpv, _cum_vol).
+# Refresh hanya mengambil bar sejak hari bar terakhir lalu di-merge (timestamp sama: versi baru menang).
+# Juga dipakai sebagai data terakhir yang valid saat Yahoo gagal/circuit open.
+_INTRADAY_DAYS = 5
+_INTRADAY = {}
+_INTRADAY_LOCK = threading.Lock()
+
+
+def _to_wib(df: pd.DataFrame) -> pd.DataFrame:
+    try:
+        if df.index.tzinfo is None:
+            df = df.tz_localize("UTC", ambiguous="infer")
+        df = df.tz_convert("Asia/Jakarta")
+    except Exception:
+        pass
+    return df
+
+
+def _with_running_sums(df: pd.DataFrame, base_tpv: float = 0.0, base_vol: float = 0.0) -> pd.DataFrame:
+    """Tambahkan _cum_tpv / _cum_vol (kumulatif TypicalPrice*Volume dan Volume), mulai dari base."""
+    df = df.copy()
+    vol = df["Volume"].fillna(0)
+    tpv = ((df["High"] + df["Low"] + df["Close"]) / 3 * vol).fillna(0)
+    df["_cum_tpv"] = base_tpv + tpv.cumsum()
+    df["_cum_vol"] = base_vol + vol.cumsum()
+    return df
+
+
+def _merge_intraday(buf: pd.DataFrame, new: pd.DataFrame) -> pd.DataFrame:
+    """
+    Gabungkan bar baru ke buffer: bar buffer sejak timestamp pertama `new` diganti, jumlah berjalan VWAP
+    hanya dihitung untuk bar baru. Buffer dipangkas ke _INTRADAY_DAYS hari terakhir (jumlah di-rebase).
+    """
+    new = new[~new.index.duplicated(keep="last")].sort_index()
+    new = new.drop(columns=["_cum_tpv", "_cum_vol"], errors="ignore")
+    if buf is None or buf.empty:
+        merged = _with_running_sums(new)
+    else:
+        keep = buf[buf.index < new.index[0]]
+        base_tpv = float(keep["_cum_tpv"].iloc[-1]) if len(keep) else 0.0
+        base_vol = float(keep["_cum_vol"].iloc[-1]) if len(keep) else 0.0
+        merged = pd.concat([keep, _with_running_sums(new, base_tpv, base_vol)])
+    days = merged.index.normalize()
+    unique_days = days.unique()
+    if len(unique_days) > _INTRADAY_DAYS:
+        cut = int(np.argmax(days >= unique_days[-_INTRADAY_DAYS]))
+        base = merged.iloc[cut - 1][["_cum_tpv", "_cum_vol"]]
+        merged = merged.iloc[cut:].copy()
+        merged["_cum_tpv"] -= base["_cum_tpv"]
+        merged["_cum_vol"] -= base["_cum_vol"]
+    return merged
+
+
+def _fetch_intraday(t: str, interval: str, buf: pd.DataFrame) -> pd.DataFrame:
+    """Buffer kosong: 5 hari (fallback 1 bulan). Selain itu hanya bar sejak awal hari bar terakhir."""
+    # Respons kosong = gagal (validate): dihitung limiter/circuit breaker, pemanggil memakai buffer stale
+    if buf is None or buf.empty:
+        try:
+            df = rate_limiter.call(data_provider.history, t, period="5d", interval=interval, auto_adjust=True,
+                                   validate=rate_limiter.non_empty)
+        except rate_limiter.EmptyResultError:
+            df = rate_limiter.call(data_provider.history, t, period="1mo", interval=interval, auto_adjust=True,
+                                   validate=rate_limiter.non_empty)
+    else:
+        start = buf.index[-1].strftime("%Y-%m-%d")
+        df = rate_limiter.call(data_provider.history, t, start=start, interval=interval, auto_adjust=True,
+                               validate=rate_limiter.non_empty)
+    return _to_wib(df)
+
+
 @st.cache_data(ttl=300)
 def get_intraday_15m(ticker: str, interval: str = "15m"):
     """
     Data intraday untuk candlestick. WIB. Cache 5 menit (sinkron dengan data saham).
     interval: "5m" (lebih granular) atau "15m". Jika pasar tutup: pakai data akhir sebelum tutup.
     Return (DataFrame, last_timestamp) agar UI bisa tampilkan "Data terakhir: ...".
+    Bar disimpan di buffer per (ticker, interval); refresh hanya mengunduh bar sejak hari bar terakhir.
+    Jika Yahoo gagal (atau circuit breaker open), kembalikan buffer terakhir dengan attrs["stale"]=True.
     """
     if interval not in ("5m", "15m"):
         interval = "15m"
+    t = _ensure_jk(ticker) if not ticker.endswith(".JK") else ticker
+    key = (t, interval)
+    with _INTRADAY_LOCK:
+        buf = _INTRADAY.get(key)
     try:
-        t = _ensure_jk(ticker) if not ticker.endswith(".JK") else ticker
-        obj = yf.Ticker(t)
-        df = obj.history(period="5d", interval=interval, auto_adjust=True)
-        if df is None or df.empty:
-            df = obj.history(period="1mo", interval=interval, auto_adjust=True)
-        if df is None or df.empty:
+        new = _fetch_intraday(t, interval, buf)
+    except Exception:
+        new = pd.DataFrame()
+    if new.empty:
+        if buf is None or buf.empty:
             return None, None
-        try:
-            if df.index.tzinfo is None:
-                df = df.tz_localize("UTC", ambiguous="infer")
-            df = df.tz_convert("Asia/Jakarta")
-        except Exception:
-            pass
-        last_ts = df.index[-1] if len(df) else None
-        return df, last_ts
+        stale = buf.iloc[:]
+        stale.attrs = {**stale.attrs, "stale": True}
+        return stale, stale.index[-1]
+    try:
+        buf = _merge_intraday(buf, new)
     except Exception:
-        return None, None
+        buf = _with_running_sums(new)
+    with _INTRADAY_LOCK:
+        _INTRADAY[key] = buf
+    return buf, buf.index[-1]
 
 
 def vwap_intraday(df: pd.DataFrame) -> pd.Series:
-    """VWAP kumulatif intraday: cumulative( TypicalPrice * Volume ) / cumulative(Volume)."""
+    """
+    VWAP kumulatif intraday: cumulative( TypicalPrice * Volume ) / cumulative(Volume).
+    Frame dari get_intraday_15m sudah membawa jumlah berjalan (_cum_tpv, _cum_vol) yang diperbarui
+    incremental per bar baru, jadi tidak perlu cumsum ulang atas seluruh frame.
+    """
     if df is None or df.empty or "Volume" not in df.columns:
         return pd.Series(dtype=float)
+    if "_cum_tpv" in df.columns and "_cum_vol" in df.columns:
+        vwap = df["_cum_tpv"] / df["_cum_vol"].replace(0, np.nan)
+        # Sama seperti versi cumsum: bar tanpa volume tidak punya nilai VWAP
+        return vwap.where(df["Volume"].fillna(0) != 0)
     typical = (df["High"] + df["Low"] + df["Close"]) / 3
     tp_vol = typical * df["Volume"].replace(0, np.nan)
     return tp_vol.cumsum() / df["Volume"].cumsum()
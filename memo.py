@@ -0,0 +1,168 @@
+"""
+Memo: memoization hasil indikator per isi data (content-addressed), untuk rerun Streamlit yang datanya sama.
+- Setiap klik widget (radio sub-tab, slider risiko) menjalankan ulang seluruh skrip; bar tidak berubah,
+  jadi add_technical_indicators / compute_mansfield_rs / compute_seasonality cukup dihitung sekali.
+- Kunci = (fungsi, sidik jari tiap DataFrame argumen, parameter lain). Sidik jari DataFrame =
+  (jumlah bar, timestamp bar pertama & terakhir, digest isi kolom), jadi ticker/periode berbeda dan bar
+  terakhir yang direvisi (candle hari ini) otomatis menjadi kunci baru tanpa invalidasi manual.
+- LRU dengan anggaran memori (env IDX_MEMO_BUDGET_MB, default 128 MB); entri terlama dibuang lebih dulu.
+- Hasil dikembalikan sebagai salinan, agar pemanggil yang mengubah frame (mis. rename kolom heatmap)
+  tidak merusak isi cache.
+- stats() melaporkan hits, misses, evictions, jumlah entri dan byte terpakai, total dan per fungsi.
+Pemakaian: pasang @memoize pada fungsi murni yang argumennya DataFrame/Series dan parameter hashable.
+"""
+import functools
+import hashlib
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import single_flight
+
+_LOCK = threading.Lock()
+
+# key -> (hasil, perkiraan byte); urutan = LRU (paling lama dipakai di depan)
+_ENTRIES = OrderedDict()
+_BYTES = 0
+
+# nama fungsi -> {"hits", "misses", "evictions"}
+_STATS = {}
+
+
+def _budget_bytes() -> int:
+    try:
+        mb = float(os.environ.get("IDX_MEMO_BUDGET_MB", "128"))
+    except ValueError:
+        mb = 128.0
+    return int(mb * 1024 * 1024)
+
+
+def _digest(*arrays) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    for a in arrays:
+        a = np.ascontiguousarray(a)
+        if a.dtype == object:
+            h.update(repr(a.tolist()).encode("utf-8"))
+        else:
+            h.update(str(a.dtype).encode("ascii"))
+            h.update(a.view(np.uint8).reshape(-1) if a.size else b"")
+    return h.hexdigest()
+
+
+def fingerprint(obj):
+    """Sidik jari isi DataFrame/Series: (tipe, jumlah bar, bar pertama, bar terakhir, kolom, digest)."""
+    if isinstance(obj, pd.Series):
+        obj = obj.to_frame()
+        kind = "series"
+    else:
+        kind = "frame"
+    if len(obj) == 0:
+        return (kind, 0, tuple(map(str, obj.columns)))
+    index = obj.index.asi8 if isinstance(obj.index, pd.DatetimeIndex) else obj.index.to_numpy()
+    columns = [obj[c].to_numpy() for c in obj.columns] if obj.columns.is_unique else [obj.to_numpy()]
+    return (kind, len(obj), str(obj.index[0]), str(obj.index[-1]), tuple(map(str, obj.columns)),
+            _digest(index, *columns))
+
+
+def _key_part(value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return fingerprint(value)
+    return value
+
+
+def _sizeof(obj) -> int:
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True).sum())
+    if isinstance(obj, pd.Series):
+        return int(obj.memory_usage(index=True))
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(_sizeof(k) + _sizeof(v) for k, v in obj.items())
+    if isinstance(obj, (list, tuple)):
+        return sys.getsizeof(obj) + sum(_sizeof(v) for v in obj)
+    return sys.getsizeof(obj)
+
+
+def _copy(obj):
+    if isinstance(obj, (pd.DataFrame, pd.Series, np.ndarray)):
+        return obj.copy()
+    if isinstance(obj, dict):
+        return {k: _copy(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_copy(v) for v in obj]
+    return obj
+
+
+def _bump(name: str, field: str) -> None:
+    s = _STATS.setdefault(name, {"hits": 0, "misses": 0, "evictions": 0})
+    s[field] += 1
+
+
+def _store(name: str, key, value) -> None:
+    global _BYTES
+    size = _sizeof(value)
+    budget = _budget_bytes()
+    if size > budget:
+        return
+    with _LOCK:
+        old = _ENTRIES.pop(key, None)
+        if old is not None:
+            _BYTES -= old[1]
+        _ENTRIES[key] = (value, size)
+        _BYTES += size
+        while _BYTES > budget and _ENTRIES:
+            evicted_key, (_, evicted_size) = _ENTRIES.popitem(last=False)
+            _BYTES -= evicted_size
+            _bump(evicted_key[0], "evictions")
+
+
+def memoize(fn):
+    """Decorator: hasil fn di-cache per isi DataFrame argumen + parameter (lihat modul)."""
+    name = f"{fn.__module__}.{fn.__qualname__}"
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        try:
+            key = (name, tuple(_key_part(a) for a in args),
+                   tuple(sorted((k, _key_part(v)) for k, v in kwargs.items())))
+            hash(key)
+        except TypeError:
+            return fn(*args, **kwargs)
+        with _LOCK:
+            hit = _ENTRIES.get(key)
+            if hit is not None:
+                _ENTRIES.move_to_end(key)
+                _bump(name, "hits")
+        if hit is not None:
+            return _copy(hit[0])
+        with _LOCK:
+            _bump(name, "misses")
+        # Rerun bersamaan untuk data yang sama hanya menghitung sekali
+        value = single_flight.run(("memo", key), fn, *args, **kwargs)
+        _store(name, key, value)
+        return _copy(value)
+    return wrapper
+
+
+def clear() -> None:
+    """Kosongkan semua entri (statistik tetap)."""
+    global _BYTES
+    with _LOCK:
+        _ENTRIES.clear()
+        _BYTES = 0
+
+
+def stats() -> dict:
+    """
+    Statistik memo: {"hits", "misses", "evictions", "entries", "bytes", "budget_bytes", "by_function": {...}}.
+    """
+    with _LOCK:
+        by_fn = {k: dict(v) for k, v in _STATS.items()}
+        entries, used = len(_ENTRIES), _BYTES
+    total = {f: sum(v[f] for v in by_fn.values()) for f in ("hits", "misses", "evictions")}
+    return {**total, "entries": entries, "bytes": used, "budget_bytes": _budget_bytes(), "by_function": by_fn}
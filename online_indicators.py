@@ -0,0 +1,541 @@
+"""
+Online Indicators: state indikator berjalan (streaming) agar setiap bar baru cukup diproses O(1).
+- Setiap indikator menyimpan state ringkas (nilai EMA/RMA terakhir, jendela tetap untuk rata-rata bergulir)
+  dan update() hanya memproses bar baru; nilainya sama dengan kernel batch di indicators.py.
+- seed(...) membangun state dari riwayat secara vektor (sekali saja, lewat indicators.py);
+  to_state()/from_state() mengubah state ke/dari dict JSON agar bisa disimpan di samping history.
+- sync(key, df): state per ticker disimpan di cache_dir("indicator_state"); pemanggilan berikutnya hanya
+  memproses bar yang belum pernah dilihat. df sebaiknya riwayat penuh (awal tetap), bukan slice period yang
+  bergeser setiap hari; Close/Volume bar terakhir state dicocokkan agar riwayat yang di-adjust ulang di-seed ulang. Bar terakhir dianggap sementara (candle hari ini / intraday bisa
+  direvisi): state di-commit sampai bar kedua terakhir dan bar terakhir diterapkan pada salinan.
+Nilai NaN dilewati (tidak mengubah state); volume NaN dihitung 0 seperti OBV batch.
+"""
+import copy
+import json
+import math
+import os
+import re
+import threading
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+import indicators
+from utils import cache_dir
+
+_NAN = float("nan")
+# Bar baru lebih dari ini: seed ulang secara vektor, lebih cepat daripada update satu per satu
+_RESEED_AFTER_BARS = 64
+_STATE_VERSION = 1
+
+
+def _num(x) -> float:
+    try:
+        x = float(x)
+    except (TypeError, ValueError):
+        return _NAN
+    return x
+
+
+def _clean(values) -> np.ndarray:
+    a = np.asarray(values, dtype=float)
+    return a[~np.isnan(a)]
+
+
+class RollingStats:
+    """Mean dan std sampel (ddof=1) atas `window` nilai terakhir: SMA, Bollinger, rata-rata/std volume."""
+
+    kind = "rolling"
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values = deque(maxlen=window)
+        self._ref = 0.0
+        self._sum = 0.0
+        self._sumsq = 0.0
+        self._since_resum = 0
+
+    def _resum(self) -> None:
+        # Jumlah digeser ke nilai tertua (hindari cancellation) dan dihitung ulang tiap `window` update
+        self._ref = self.values[0] if self.values else 0.0
+        d = [v - self._ref for v in self.values]
+        self._sum = math.fsum(d)
+        self._sumsq = math.fsum(v * v for v in d)
+        self._since_resum = 0
+
+    def update(self, x) -> float:
+        x = _num(x)
+        if not math.isnan(x):
+            if len(self.values) == self.window:
+                old = self.values[0] - self._ref
+                self._sum -= old
+                self._sumsq -= old * old
+            self.values.append(x)
+            d = x - self._ref
+            self._sum += d
+            self._sumsq += d * d
+            self._since_resum += 1
+            if self._since_resum >= self.window:
+                self._resum()
+        return self.mean
+
+    @property
+    def full(self) -> bool:
+        return len(self.values) == self.window
+
+    @property
+    def mean(self) -> float:
+        return self._ref + self._sum / self.window if self.full else _NAN
+
+    @property
+    def std(self) -> float:
+        n = self.window
+        if not self.full or n < 2:
+            return _NAN
+        var = (self._sumsq - self._sum * self._sum / n) / (n - 1)
+        return math.sqrt(max(var, 0.0))
+
+    @classmethod
+    def seed(cls, values, window: int) -> "RollingStats":
+        s = cls(window)
+        s.values.extend(_clean(values)[-window:].tolist())
+        s._resum()
+        return s
+
+    def to_state(self) -> dict:
+        return {"kind": self.kind, "window": self.window, "values": list(self.values)}
+
+    @classmethod
+    def from_state(cls, state: dict) -> "RollingStats":
+        return cls.seed(state["values"], int(state["window"]))
+
+
+class EMA:
+    """EMA(span) tanpa adjust: v = v + alpha * (x - v), nilai pertama = x."""
+
+    kind = "ema"
+
+    def __init__(self, span: int, value: float = _NAN):
+        self.span = span
+        self.alpha = 2.0 / (span + 1)
+        self.value = value
+
+    def update(self, x) -> float:
+        x = _num(x)
+        if not math.isnan(x):
+            self.value = x if math.isnan(self.value) else self.value + self.alpha * (x - self.value)
+        return self.value
+
+    @classmethod
+    def seed(cls, values, span: int) -> "EMA":
+        a = _clean(values)
+        return cls(span, float(indicators.ema(a, span)[-1]) if len(a) else _NAN)
+
+    def to_state(self) -> dict:
+        return {"kind": self.kind, "span": self.span, "value": self.value}
+
+    @classmethod
+    def from_state(cls, state: dict) -> "EMA":
+        return cls(int(state["span"]), _num(state["value"]))
+
+
+class MACD:
+    """MACD(fast, slow, signal): line = EMA(fast) - EMA(slow), signal = EMA(signal) dari line."""
+
+    kind = "macd"
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        self.fast, self.slow, self.signal = EMA(fast), EMA(slow), EMA(signal)
+
+    def update(self, x):
+        x = _num(x)
+        if not math.isnan(x):
+            self.signal.update(self.fast.update(x) - self.slow.update(x))
+        return self.line, self.signal.value
+
+    @property
+    def line(self) -> float:
+        return self.fast.value - self.slow.value
+
+    @classmethod
+    def seed(cls, values, fast: int = 12, slow: int = 26, signal: int = 9) -> "MACD":
+        m = cls(fast, slow, signal)
+        a = _clean(values)
+        if len(a):
+            _, sig = indicators.macd(a, fast, slow, signal)
+            m.fast = EMA.seed(a, fast)
+            m.slow = EMA.seed(a, slow)
+            m.signal = EMA(signal, float(sig[-1]))
+        return m
+
+    def to_state(self) -> dict:
+        return {"kind": self.kind, "fast": self.fast.to_state(), "slow": self.slow.to_state(),
+                "signal": self.signal.to_state()}
+
+    @classmethod
+    def from_state(cls, state: dict) -> "MACD":
+        m = cls()
+        m.fast, m.slow, m.signal = (EMA.from_state(state[k]) for k in ("fast", "slow", "signal"))
+        return m
+
+
+class RSI:
+    """RSI(period) dengan rata-rata sederhana gain/loss seperti indicators.rsi (bar pertama dihitung gain 0)."""
+
+    kind = "rsi"
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.prev = _NAN
+        self.gains = RollingStats(period)
+        self.losses = RollingStats(period)
+
+    def update(self, x) -> float:
+        x = _num(x)
+        if not math.isnan(x):
+            delta = 0.0 if math.isnan(self.prev) else x - self.prev
+            self.gains.update(max(delta, 0.0))
+            self.losses.update(max(-delta, 0.0))
+            self.prev = x
+        return self.value
+
+    @property
+    def value(self) -> float:
+        loss = self.losses.mean
+        if math.isnan(loss) or loss == 0:
+            return _NAN
+        return 100 - 100 / (1 + self.gains.mean / loss)
+
+    @classmethod
+    def seed(cls, values, period: int = 14) -> "RSI":
+        r = cls(period)
+        a = _clean(values)
+        if len(a):
+            delta = np.diff(a, prepend=a[0])
+            r.gains = RollingStats.seed(np.maximum(delta, 0.0), period)
+            r.losses = RollingStats.seed(np.maximum(-delta, 0.0), period)
+            r.prev = float(a[-1])
+        return r
+
+    def to_state(self) -> dict:
+        return {"kind": self.kind, "period": self.period, "prev": self.prev,
+                "gains": self.gains.to_state(), "losses": self.losses.to_state()}
+
+    @classmethod
+    def from_state(cls, state: dict) -> "RSI":
+        r = cls(int(state["period"]))
+        r.prev = _num(state["prev"])
+        r.gains = RollingStats.from_state(state["gains"])
+        r.losses = RollingStats.from_state(state["losses"])
+        return r
+
+
+class ATR:
+    """ATR Wilder (RMA): nilai pertama = rata-rata `period` TR pertama, lalu (ATR*(period-1) + TR) / period."""
+
+    kind = "atr"
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.prev_close = _NAN
+        self.count = 0
+        self.total = 0.0
+        self.value = _NAN
+
+    def update(self, high, low, close) -> float:
+        high, low, close = _num(high), _num(low), _num(close)
+        if math.isnan(high) or math.isnan(low) or math.isnan(close):
+            return self.value
+        tr = high - low
+        if not math.isnan(self.prev_close):
+            tr = max(tr, abs(high - self.prev_close), abs(low - self.prev_close))
+        self.prev_close = close
+        self.count += 1
+        if self.count < self.period:
+            self.total += tr
+        elif self.count == self.period:
+            self.value = (self.total + tr) / self.period
+        else:
+            self.value = (self.value * (self.period - 1) + tr) / self.period
+        return self.value
+
+    @classmethod
+    def seed(cls, high, low, close, period: int = 14) -> "ATR":
+        a = cls(period)
+        h, lo, c = (np.asarray(v, dtype=float) for v in (high, low, close))
+        ok = ~(np.isnan(h) | np.isnan(lo) | np.isnan(c))
+        h, lo, c = h[ok], lo[ok], c[ok]
+        if len(c):
+            tr = indicators.true_range(h, lo, c)
+            a.count = len(c)
+            a.prev_close = float(c[-1])
+            if a.count < period:
+                a.total = float(tr.sum())
+            else:
+                a.value = float(indicators.wilder_rma(tr, period)[-1])
+        return a
+
+    def to_state(self) -> dict:
+        return {"kind": self.kind, "period": self.period, "prev_close": self.prev_close,
+                "count": self.count, "total": self.total, "value": self.value}
+
+    @classmethod
+    def from_state(cls, state: dict) -> "ATR":
+        a = cls(int(state["period"]))
+        a.prev_close, a.total, a.value = (_num(state[k]) for k in ("prev_close", "total", "value"))
+        a.count = int(state["count"])
+        return a
+
+
+class OBV:
+    """On-Balance Volume berjalan: +Volume jika Close naik, -Volume jika turun; bar pertama = 0."""
+
+    kind = "obv"
+
+    def __init__(self):
+        self.prev = _NAN
+        self.value = _NAN
+
+    def update(self, close, volume) -> float:
+        close, volume = _num(close), _num(volume)
+        if math.isnan(close):
+            return self.value
+        volume = 0.0 if math.isnan(volume) else volume
+        if math.isnan(self.prev):
+            self.value = 0.0
+        elif close > self.prev:
+            self.value += volume
+        elif close < self.prev:
+            self.value -= volume
+        self.prev = close
+        return self.value
+
+    @classmethod
+    def seed(cls, close, volume) -> "OBV":
+        o = cls()
+        c, v = np.asarray(close, dtype=float), np.asarray(volume, dtype=float)
+        ok = ~np.isnan(c)
+        if ok.any():
+            o.value = float(indicators.obv(c[ok], v[ok])[-1])
+            o.prev = float(c[ok][-1])
+        return o
+
+    def to_state(self) -> dict:
+        return {"kind": self.kind, "prev": self.prev, "value": self.value}
+
+    @classmethod
+    def from_state(cls, state: dict) -> "OBV":
+        o = cls()
+        o.prev, o.value = _num(state["prev"]), _num(state["value"])
+        return o
+
+
+def _col(df: pd.DataFrame, name: str, fallback: str = "Close") -> np.ndarray:
+    return df[name if name in df.columns else fallback].to_numpy(dtype=float)
+
+
+class IndicatorSet:
+    """
+    Semua indikator yang dipakai aplikasi untuk satu ticker: MA20/50/200, Bollinger(20,2), RSI(14), MACD,
+    ATR(14), OBV, dan rata-rata/std volume 20 bar. update(bar) memproses satu bar OHLCV (dict/Series).
+    """
+
+    def __init__(self):
+        self.ma20 = RollingStats(20)
+        self.ma50 = RollingStats(50)
+        self.ma200 = RollingStats(200)
+        self.rsi = RSI(14)
+        self.macd = MACD()
+        self.atr = ATR(14)
+        self.obv = OBV()
+        self.vol20 = RollingStats(20)
+        self.prev_close = _NAN
+        self.close = _NAN
+        self.volume = _NAN
+        self.first = None
+        self.last = None
+        self.bars = 0
+
+    def update(self, bar, ts=None) -> "IndicatorSet":
+        close = _num(bar.get("Close"))
+        high, low = _num(bar.get("High", close)), _num(bar.get("Low", close))
+        volume = _num(bar.get("Volume"))
+        for s in (self.ma20, self.ma50, self.ma200, self.rsi, self.macd):
+            s.update(close)
+        self.atr.update(high, low, close)
+        self.obv.update(close, volume)
+        self.vol20.update(volume)
+        if not math.isnan(close):
+            self.prev_close, self.close = self.close, close
+        self.volume = volume
+        if ts is not None:
+            self.first = self.first if self.first is not None else pd.Timestamp(ts)
+            self.last = pd.Timestamp(ts)
+        self.bars += 1
+        return self
+
+    @classmethod
+    def seed(cls, df: pd.DataFrame) -> "IndicatorSet":
+        """State setelah seluruh bar df, dihitung vektor (tanpa loop per bar)."""
+        s = cls()
+        if df is None or df.empty:
+            return s
+        close = _col(df, "Close")
+        high, low = _col(df, "High"), _col(df, "Low")
+        volume = df["Volume"].to_numpy(dtype=float) if "Volume" in df.columns else np.full(len(df), np.nan)
+        s.ma20, s.ma50, s.ma200 = (RollingStats.seed(close, w) for w in (20, 50, 200))
+        s.rsi = RSI.seed(close, 14)
+        s.macd = MACD.seed(close)
+        s.atr = ATR.seed(high, low, close, 14)
+        s.obv = OBV.seed(close, volume)
+        s.vol20 = RollingStats.seed(volume, 20)
+        valid = _clean(close)
+        s.close = float(valid[-1]) if len(valid) else _NAN
+        s.prev_close = float(valid[-2]) if len(valid) > 1 else _NAN
+        s.volume = float(volume[-1])
+        s.first, s.last, s.bars = pd.Timestamp(df.index[0]), pd.Timestamp(df.index[-1]), len(df)
+        return s
+
+    def values(self) -> dict:
+        """Nilai indikator di bar terakhir (NaN jika jendela belum penuh)."""
+        mid, std = self.ma20.mean, self.ma20.std
+        return {
+            "Close": self.close,
+            "Price_Change": self.close / self.prev_close - 1 if self.prev_close else _NAN,
+            "MA20": mid,
+            "MA50": self.ma50.mean,
+            "MA200": self.ma200.mean,
+            "BB_mid": mid,
+            "BB_upper": mid + 2 * std,
+            "BB_lower": mid - 2 * std,
+            "RSI": self.rsi.value,
+            "MACD": self.macd.line,
+            "MACD_signal": self.macd.signal.value,
+            "ATR": self.atr.value,
+            "OBV": self.obv.value,
+            "Volume": self.volume,
+            "Vol_Avg20": self.vol20.mean,
+            "Vol_Std20": self.vol20.std,
+        }
+
+    def to_state(self) -> dict:
+        return {
+            "version": _STATE_VERSION,
+            "first": self.first.isoformat() if self.first is not None else None,
+            "last": self.last.isoformat() if self.last is not None else None,
+            "bars": self.bars,
+            "prev_close": self.prev_close,
+            "close": self.close,
+            "volume": self.volume,
+            "indicators": {name: getattr(self, name).to_state() for name in _SET_FIELDS},
+        }
+
+    @classmethod
+    def from_state(cls, state: dict) -> "IndicatorSet":
+        if state.get("version") != _STATE_VERSION:
+            raise ValueError("versi state indikator tidak cocok")
+        s = cls()
+        s.first = pd.Timestamp(state["first"]) if state.get("first") else None
+        s.last = pd.Timestamp(state["last"]) if state.get("last") else None
+        s.bars = int(state["bars"])
+        s.prev_close, s.close, s.volume = (_num(state[k]) for k in ("prev_close", "close", "volume"))
+        for name in _SET_FIELDS:
+            raw = state["indicators"][name]
+            setattr(s, name, _KINDS[raw["kind"]].from_state(raw))
+        return s
+
+
+_SET_FIELDS = ("ma20", "ma50", "ma200", "rsi", "macd", "atr", "obv", "vol20")
+_KINDS = {c.kind: c for c in (RollingStats, EMA, MACD, RSI, ATR, OBV)}
+
+# State ter-commit per key (ticker/interval) di memori; disk sebagai cadangan antar proses/restart
+_STATES = {}
+_STATES_LOCK = threading.Lock()
+
+
+def _path(key: str) -> str:
+    safe = re.sub(r"[^A-Za-z0-9._=-]", "_", key)
+    return os.path.join(cache_dir("indicator_state"), f"{safe}.json")
+
+
+def load_state(key: str):
+    """IndicatorSet tersimpan untuk key, atau None jika belum ada / file rusak / versi lama."""
+    try:
+        with open(_path(key), encoding="utf-8") as f:
+            return IndicatorSet.from_state(json.load(f))
+    except Exception:
+        return None
+
+
+def save_state(key: str, state: IndicatorSet) -> None:
+    path = _path(key)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state.to_state(), f)
+        os.replace(tmp, path)
+    except Exception:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+
+
+def _same(a: float, b: float) -> bool:
+    return (math.isnan(a) and math.isnan(b)) or math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-12)
+
+
+def _matches_bar(state, bar) -> bool:
+    """
+    Close/Volume bar terakhir state sama dengan bar di df. Riwayat yang di-adjust ulang (split/dividen,
+    history_store mengunduh ulang seluruh riwayat) mengubah harga lama, jadi state tidak boleh dilanjutkan.
+    """
+    close = _num(bar.get("Close"))
+    if not math.isnan(close) and not _same(close, state.close):
+        return False
+    return _same(_num(bar.get("Volume")), state.volume)
+
+
+def _advance(state, df: pd.DataFrame) -> tuple:
+    """
+    Bawa state sampai bar df.iloc[-2] (bar final). Return (state, berubah?). Seed ulang jika state tidak
+    cocok dengan df (awal riwayat berbeda, bar terakhir state tidak ada di df atau Close/Volume-nya berubah)
+    atau bar baru terlalu banyak.
+    """
+    committed = df.iloc[:-1]
+    if committed.empty:
+        return IndicatorSet(), state is not None
+    if state is not None and state.first == committed.index[0] and state.last is not None:
+        pos = committed.index.searchsorted(state.last)
+        if pos < len(committed) and committed.index[pos] == state.last and _matches_bar(state, committed.iloc[pos]):
+            new = committed.iloc[pos + 1:]
+            if new.empty:
+                return state, False
+            if len(new) <= _RESEED_AFTER_BARS:
+                for ts, bar in zip(new.index, new.to_dict("records")):
+                    state.update(bar, ts)
+                return state, True
+    return IndicatorSet.seed(committed), True
+
+
+def sync(key: str, df: pd.DataFrame) -> dict:
+    """
+    Nilai indikator di bar terakhir df (lihat IndicatorSet.values) memakai state berjalan per key.
+    Hanya bar yang belum pernah dilihat yang diproses; bar terakhir diterapkan ke salinan state.
+    Ditambah Vol_Avg20_prev / Vol_Std20_prev: volume 20 bar sebelum bar terakhir (untuk z-score volume).
+    """
+    if df is None or df.empty or "Close" not in df.columns:
+        return {}
+    with _STATES_LOCK:
+        state = _STATES.get(key)
+    if state is None:
+        state = load_state(key)
+    state, changed = _advance(copy.deepcopy(state), df)
+    with _STATES_LOCK:
+        _STATES[key] = state
+    if changed:
+        save_state(key, state)
+    out = copy.deepcopy(state).update(df.iloc[-1], df.index[-1]).values()
+    out["Vol_Avg20_prev"], out["Vol_Std20_prev"] = state.vol20.mean, state.vol20.std
+    return out
@@ -0,0 +1,204 @@
+"""
+Pivot Zones: support/resistance dari swing pivot multi-timeframe (harian, mingguan, bulanan).
+- Swing high = High yang menjadi maksimum jendela `span` bar sebelum dan sesudahnya (swing low sebaliknya),
+  dideteksi vektor untuk seluruh panel (waktu x ticker) dengan sliding window NumPy. Jendela harus lengkap,
+  jadi bar terakhir (belum terkonfirmasi) tidak dihitung. Pivot harian dan ATR dihitung atas bar milik
+  masing-masing ticker (indicators.compact_rows), jadi tanggal bolong di panel gabungan tidak mengubah zona.
+- Panel harian di-resample ke mingguan dan bulanan sekali untuk semua ticker; pivot timeframe lebih besar
+  berbobot lebih besar (TIMEFRAMES).
+- Pivot berdekatan digabung menjadi zona harga: diurutkan per (ticker, harga), zona baru dimulai bila selisih
+  dengan pivot sebelumnya melebihi toleransi ticker (setengah ATR%, dibatasi 0.5%-3%). Zona membawa rentang
+  low-high, harga tengah (rata-rata berbobot), jumlah sentuhan (pivot) dan timeframe asal; dihitung untuk semua
+  ticker sekaligus (lexsort + bincount/reduceat).
+- Hasil di-cache per (ticker, bar terakhir): run_scan mengisi seluruh universe sekali (update_panel), sehingga
+  scanner, get_support_resistance dan get_trading_plan cukup lookup dict (O(1)).
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+import indicators
+
+# (label, aturan resample (None = harian), span pivot, bobot)
+TIMEFRAMES = (("D", None, 5, 1.0), ("W", "W-FRI", 3, 2.0), ("M", "ME", 2, 3.0))
+
+_TOL_MIN, _TOL_MAX = 0.005, 0.03
+
+# ticker -> hasil compute (dengan "last_bar" dan "start") untuk bar terakhir yang sudah dihitung
+_ZONES = {}
+_LOCK = threading.Lock()
+
+
+def swing_points(high: np.ndarray, low: np.ndarray, span: int):
+    """
+    Mask swing high dan swing low (T x N). Titik t pivot high bila High[t] > semua High span bar sebelumnya dan
+    >= semua High span bar sesudahnya (puncak datar dihitung sekali, di bar pertama); low sebaliknya.
+    """
+    is_high = np.zeros(high.shape, dtype=bool)
+    is_low = np.zeros(low.shape, dtype=bool)
+    width = 2 * span + 1
+    if len(high) < width:
+        return is_high, is_low
+    hw = sliding_window_view(high, width, axis=0)
+    lw = sliding_window_view(low, width, axis=0)
+    complete = ~np.isnan(hw).any(axis=-1) & ~np.isnan(lw).any(axis=-1)
+    mid_h, mid_l = hw[..., span], lw[..., span]
+    with np.errstate(invalid="ignore"):
+        is_high[span:len(high) - span] = complete & (mid_h > hw[..., :span].max(axis=-1)) & (mid_h >= hw[..., span + 1:].max(axis=-1))
+        is_low[span:len(low) - span] = complete & (mid_l < lw[..., :span].min(axis=-1)) & (mid_l <= lw[..., span + 1:].min(axis=-1))
+    return is_high, is_low
+
+
+def _resample(high: np.ndarray, low: np.ndarray, index: pd.DatetimeIndex, rule: str):
+    if rule is None:
+        return high, low
+    return (
+        pd.DataFrame(high, index=index, copy=False).resample(rule).max().to_numpy(),
+        pd.DataFrame(low, index=index, copy=False).resample(rule).min().to_numpy(),
+    )
+
+
+def _last_valid(values: np.ndarray) -> np.ndarray:
+    """Nilai valid terakhir per kolom (NaN jika kolom kosong)."""
+    valid = ~np.isnan(values)
+    rows = len(values) - 1 - np.argmax(valid[::-1], axis=0)
+    out = values[rows, np.arange(values.shape[1])]
+    return np.where(valid.any(axis=0), out, np.nan)
+
+
+def _zone_dicts(lo, hi, center, touches, strength, tf_bits) -> list:
+    labels = [label for label, _, _, _ in TIMEFRAMES]
+    return [
+        {"low": float(lo[k]), "high": float(hi[k]), "price": float(center[k]), "touches": int(touches[k]),
+         "strength": float(strength[k]),
+         "timeframes": "/".join(lb for b, lb in enumerate(labels) if tf_bits[k] >> b & 1)}
+        for k in range(len(lo))
+    ]
+
+
+def compute(high, low, close, index) -> list:
+    """
+    Zona S/R untuk panel harian high/low/close (T x N, index tanggal). Return list per kolom:
+    {"zones": [zona urut harga], "support": [zona di bawah close, terdekat dulu], "resistance": [...], "close"}.
+    Zona: {"low", "high", "price", "touches", "strength", "timeframes"}.
+    """
+    high = np.asarray(high, dtype=float)
+    low = np.asarray(low, dtype=float)
+    close = np.asarray(close, dtype=float)
+    index = pd.DatetimeIndex(index)
+    n_cols = close.shape[1]
+    last_close = _last_valid(close)
+    # Harian & ATR atas bar milik masing-masing ticker: tanggal bolong di panel gabungan tidak memutus jendela
+    valid = ~np.isnan(close)
+    daily = (indicators.compact_rows(high, valid)[0], indicators.compact_rows(low, valid)[0])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        atr = indicators.atr(daily[0], daily[1], indicators.compact_rows(close, valid)[0], 14)
+        atr_pct = _last_valid(atr) / last_close
+    tol = np.clip(np.nan_to_num(atr_pct * 0.5, nan=0.01), _TOL_MIN, _TOL_MAX)
+
+    cols, prices, weights, bits = [], [], [], []
+    for b, (_, rule, span, weight) in enumerate(TIMEFRAMES):
+        h, lo = daily if rule is None else _resample(high, low, index, rule)
+        is_high, is_low = swing_points(h, lo, span)
+        for mask, values in ((is_high, h), (is_low, lo)):
+            rows, c = np.nonzero(mask)
+            cols.append(c)
+            prices.append(values[rows, c])
+            weights.append(np.full(len(c), weight))
+            bits.append(np.full(len(c), 1 << b, dtype=np.int64))
+    col, price = np.concatenate(cols), np.concatenate(prices)
+    weight, bit = np.concatenate(weights), np.concatenate(bits)
+
+    out = [{"zones": [], "support": [], "resistance": [], "close": float(c)} for c in last_close]
+    if not len(col):
+        return out
+    order = np.lexsort((price, col))
+    col, price, weight, bit = col[order], price[order], weight[order], bit[order]
+    new = np.ones(len(col), dtype=bool)
+    new[1:] = (col[1:] != col[:-1]) | (price[1:] > price[:-1] * (1 + tol[col[1:]]))
+    starts = np.flatnonzero(new)
+    zone = np.cumsum(new) - 1
+    touches = np.bincount(zone)
+    strength = np.bincount(zone, weights=weight)
+    center = np.bincount(zone, weights=weight * price) / strength
+    lo, hi = np.minimum.reduceat(price, starts), np.maximum.reduceat(price, starts)
+    tf_bits = np.bitwise_or.reduceat(bit, starts)
+    zone_col = col[starts]
+    bounds = np.searchsorted(zone_col, np.arange(n_cols + 1))
+    for j in range(n_cols):
+        a, b = bounds[j], bounds[j + 1]
+        if a == b:
+            continue
+        zones = _zone_dicts(lo[a:b], hi[a:b], center[a:b], touches[a:b], strength[a:b], tf_bits[a:b])
+        c = out[j]["close"]
+        out[j]["zones"] = zones
+        out[j]["support"] = [z for z in reversed(zones) if z["price"] < c]
+        out[j]["resistance"] = [z for z in zones if z["price"] >= c]
+    return out
+
+
+def _store(ticker: str, result: dict, last_bar, start) -> dict:
+    entry = {**result, "last_bar": last_bar, "start": start}
+    with _LOCK:
+        _ZONES[ticker] = entry
+    return entry
+
+
+def lookup(ticker: str, last_bar=None):
+    """Zona tersimpan untuk ticker (bar terakhirnya harus last_bar bila diberikan) atau None. O(1)."""
+    with _LOCK:
+        entry = _ZONES.get(ticker)
+    if entry is None or (last_bar is not None and entry["last_bar"] != last_bar):
+        return None
+    return entry
+
+
+def update_panel(panel: dict) -> int:
+    """
+    Hitung zona semua ticker panel scanner (market_scanner.build_panel) yang belum ter-cache untuk bar terakhirnya,
+    dalam satu pass. Return jumlah ticker yang dihitung.
+    """
+    if not panel:
+        return 0
+    index = panel["index"]
+    tickers = panel["tickers"]
+    last_bars = index[panel["last"]]
+    starts = index[np.argmax(~np.isnan(panel["Close"]), axis=0)]
+    with _LOCK:
+        stale = [
+            j for j, t in enumerate(tickers)
+            if t not in _ZONES or _ZONES[t]["last_bar"] != last_bars[j] or _ZONES[t]["start"] > starts[j]
+        ]
+    if not stale:
+        return 0
+    results = compute(panel["High"][:, stale], panel["Low"][:, stale], panel["Close"][:, stale], index)
+    for j, result in zip(stale, results):
+        _store(tickers[j], result, last_bars[j], starts[j])
+    return len(stale)
+
+
+def get_zones(ticker: str, df: pd.DataFrame) -> dict:
+    """
+    Zona untuk riwayat harian satu ticker: dari cache bila (ticker, bar terakhir) sama dan riwayat cache tidak
+    lebih pendek; selain itu dihitung dari df dan disimpan. ticker None: dihitung tanpa cache.
+    """
+    if df is None or df.empty:
+        return {"zones": [], "support": [], "resistance": [], "close": None}
+    last_bar, start = df.index[-1], df.index[0]
+    if ticker is not None:
+        entry = lookup(ticker, last_bar)
+        if entry is not None and entry["start"] <= start:
+            return entry
+    result = compute(df[["High"]].to_numpy(), df[["Low"]].to_numpy(), df[["Close"]].to_numpy(), df.index)[0]
+    return _store(ticker, result, last_bar, start) if ticker is not None else result
+
+
+def nearest(entry: dict, side: str, min_strength: float = 2.0):
+    """
+    Zona terdekat dari close di sisi "support"/"resistance" dengan bobot >= min_strength (>= 2 sentuhan harian
+    atau pivot mingguan/bulanan); jika tidak ada, zona terdekat apa pun. None bila sisi itu kosong.
+    """
+    zones = (entry or {}).get(side) or []
+    return next((z for z in zones if z["strength"] >= min_strength), zones[0] if zones else None)
@@ -1,13 +1,17 @@
 """
 Quant Engine: logika kuantitatif untuk IDX-Pro Insight Terminal.
-- ATR (Average True Range) untuk manajemen risiko dan position sizing.
-- Mansfield Relative Strength vs IHSG (momentum komparatif).
+- ATR (Average True Range) untuk manajemen risiko dan position sizing (vektor, juga panel waktu x ticker).
+- Mansfield Relative Strength vs IHSG (momentum komparatif), juga panel/leaderboard untuk seluruh universe.
+- Korelasi & beta bergulir saham x makro (jumlah berjalan, semua pasangan sekaligus).
 - Seasonality Matrix (probabilitas bulanan, win rate).
 Semua perhitungan murni pandas/numpy (tanpa pandas_ta) agar kompatibel Python 3.14+.
 """
 import pandas as pd
 import numpy as np
 
+import indicators
+import memo
+
 
 # --- ATR: Manajemen Risiko Berbasis Volatilitas ---
 def compute_atr(df: pd.DataFrame, period: int = 14) -> pd.Series:
@@ -19,21 +23,17 @@ def compute_atr(df: pd.DataFrame, period: int = 14) -> pd.Series:
     """
     if df is None or df.empty or len(df) < 2:
         return pd.Series(dtype=float)
-    high = df["High"]
-    low = df["Low"]
-    close = df["Close"]
-    prev_close = close.shift(1)
-    tr1 = high - low
-    tr2 = (high - prev_close).abs()
-    tr3 = (low - prev_close).abs()
-    tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
     # Wilder's RMA: ATR(period) pertama = SMA(TR, period), lalu ATR_t = (ATR_{t-1}*(period-1) + TR_t) / period
-    atr_rma = tr.copy().astype(float)
-    atr_rma.iloc[: period - 1] = np.nan
-    atr_rma.iloc[period - 1] = tr.iloc[:period].mean()
-    for i in range(period, len(tr)):
-        atr_rma.iloc[i] = (atr_rma.iloc[i - 1] * (period - 1) + tr.iloc[i]) / period
-    return atr_rma
+    return indicators.atr(df["High"], df["Low"], df["Close"], period)
+
+
+def compute_atr_panel(high, low, close, period: int = 14):
+    """
+    ATR untuk banyak ticker sekaligus: high/low/close berbentuk (waktu x ticker), DataFrame atau ndarray.
+    Return tipe yang sama (DataFrame dengan index/kolom input, atau ndarray). Satu panggilan untuk
+    seluruh universe; per kolom hasilnya sama dengan compute_atr pada ticker tersebut.
+    """
+    return indicators.atr(high, low, close, period)
 
 
 def safe_entry_calculator(
@@ -73,6 +73,7 @@ def safe_entry_calculator(
 
 
 # --- Mansfield Relative Strength: Momentum Komparatif vs IHSG ---
+@memo.memoize
 def compute_mansfield_rs(
     df_stock: pd.DataFrame, df_bench: pd.DataFrame, period_sma: int = 52
 ) -> pd.DataFrame:
@@ -93,12 +94,115 @@ def compute_mansfield_rs(
         return pd.DataFrame()
     j["Ratio"] = j["Price"] / j["Bench"].replace(0, np.nan)
     j = j.dropna(subset=["Ratio"])
-    j["Ratio_SMA"] = j["Ratio"].rolling(period_sma).mean()
+    j["Ratio_SMA"] = indicators.sma(j["Ratio"], period_sma)
     j["Mansfield_RS"] = ((j["Ratio"] / j["Ratio_SMA"]) - 1) * 10
     return j[["Price", "Bench", "Ratio", "Ratio_SMA", "Mansfield_RS"]].dropna(how="all")
 
 
+def mansfield_rs_panel(close, bench, period_sma: int = 52) -> pd.DataFrame:
+    """
+    Mansfield RS untuk banyak ticker sekaligus: close = DataFrame (tanggal x ticker), bench = Series Close
+    benchmark. Rasio dibagi vektor benchmark sekali, SMA rasio dihitung per kolom di atas bar yang valid
+    (setara dropna per ticker). Per kolom hasilnya sama dengan compute_mansfield_rs(...)["Mansfield_RS"].
+    """
+    b = bench.reindex(close.index).to_numpy(dtype=float)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ratio = close.to_numpy(dtype=float) / np.where(b == 0, np.nan, b)[:, None]
+    compact, order, _ = indicators.compact_rows(ratio)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rs_compact = (compact / indicators.sma(compact, period_sma) - 1) * 10
+    rs = np.full_like(ratio, np.nan)
+    np.put_along_axis(rs, order, rs_compact, axis=0)
+    rs[np.isnan(ratio)] = np.nan
+    return pd.DataFrame(rs, index=close.index, columns=close.columns)
+
+
+@memo.memoize
+def rs_leaderboard(close, bench, period_sma: int = 52, slope_bars: int = 10) -> pd.DataFrame:
+    """
+    Papan peringkat RS lintas ticker dalam satu pass: per ticker Mansfield RS terakhir, RS_Rank (1 = terkuat),
+    RS_Percentile (100 = terkuat) dan RS_Slope (kemiringan regresi linear RS per bar atas slope_bars nilai
+    terakhir; > 0 = RS sedang menguat). Ticker tanpa RS (data < period_sma) dilewati. Urut dari rank 1.
+    """
+    rs = mansfield_rs_panel(close, bench, period_sma)
+    compact, _, counts = indicators.compact_rows(rs.to_numpy())
+    cols = np.arange(compact.shape[1])
+    has = counts > 0
+    current = np.where(has, compact[np.maximum(counts - 1, 0), cols], np.nan)
+    # Kemiringan OLS atas slope_bars nilai RS terakhir tiap ticker (x = 0..n-1 dipusatkan)
+    n = slope_bars
+    rows = counts[None, :] - n + np.arange(n)[:, None]
+    window = np.where(rows >= 0, compact[np.maximum(rows, 0), cols[None, :]], np.nan)
+    x = np.arange(n) - (n - 1) / 2
+    slope = (x[:, None] * window).sum(axis=0) / (x * x).sum()
+    out = pd.DataFrame({"Mansfield_RS": current, "RS_Slope": slope}, index=rs.columns)
+    out = out[out["Mansfield_RS"].notna()]
+    out["RS_Rank"] = out["Mansfield_RS"].rank(ascending=False, method="min").astype(int)
+    out["RS_Percentile"] = out["Mansfield_RS"].rank(pct=True) * 100
+    return out.sort_values("RS_Rank")[["Mansfield_RS", "RS_Rank", "RS_Percentile", "RS_Slope"]]
+
+
+# --- Korelasi & Beta Bergulir (saham x makro) ---
+def aligned_returns(close, macro_close):
+    """
+    Return harian sejajar: close = DataFrame (tanggal x ticker) saham, macro_close = DataFrame (tanggal x simbol).
+    Makro di-reindex ke kalender bursa dengan nilai terakhir yang diketahui (libur bursa luar negeri = return 0),
+    lalu keduanya pct_change. Return (stock_ret, macro_ret) dengan index close.
+    """
+    macro = macro_close.reindex(macro_close.index.union(close.index)).ffill().reindex(close.index)
+    return close.pct_change(fill_method=None), macro.pct_change(fill_method=None)
+
+
+def _window_sum(values: np.ndarray, window: int) -> np.ndarray:
+    """Jumlah berjalan `window` baris (axis 0) dari selisih cumsum."""
+    c = np.cumsum(values, axis=0)
+    c[window:] -= c[:-window].copy()
+    return c
+
+
+def rolling_corr_beta(stock_ret, macro_ret, window: int, min_periods: int = None):
+    """
+    Korelasi & beta bergulir semua pasangan (ticker, simbol makro) sekaligus: stock_ret (T x N) dan macro_ret
+    (T x M) yang sudah sejajar. Jumlah berjalan n, Σx, Σy, Σx², Σy², Σxy per `window` bar hanya atas bar yang
+    keduanya valid (pairwise seperti pandas rolling.corr); kurang dari min_periods (default window) -> NaN.
+    Return (corr, beta) ndarray T x N x M, beta = cov / var(makro).
+    """
+    x = np.asarray(stock_ret, dtype=float)
+    y = np.asarray(macro_ret, dtype=float)
+    min_periods = window if min_periods is None else min_periods
+    # Geser ke rata-rata kolom (cov/var tidak berubah) agar selisih cumsum tetap presisi
+    x = x - np.nansum(x, axis=0) / np.maximum((~np.isnan(x)).sum(axis=0), 1)
+    y = y - np.nansum(y, axis=0) / np.maximum((~np.isnan(y)).sum(axis=0), 1)
+    valid = ~np.isnan(x)[:, :, None] & ~np.isnan(y)[:, None, :]
+    xs = np.where(valid, np.nan_to_num(x)[:, :, None], 0.0)
+    ys = np.where(valid, np.nan_to_num(y)[:, None, :], 0.0)
+    n = _window_sum(valid.astype(float), window)
+    sx, sy = _window_sum(xs, window), _window_sum(ys, window)
+    sxx, syy, sxy = _window_sum(xs * xs, window), _window_sum(ys * ys, window), _window_sum(xs * ys, window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = sxy - sx * sy / n
+        var_x = sxx - sx * sx / n
+        var_y = syy - sy * sy / n
+        corr = cov / np.sqrt(var_x * var_y)
+        beta = cov / var_y
+    bad = (n < max(min_periods, 2)) | ~(var_x > 1e-14 * n) | ~(var_y > 1e-14 * n)
+    corr[bad] = np.nan
+    beta[bad] = np.nan
+    return np.clip(corr, -1.0, 1.0), beta
+
+
 # --- Seasonality: Probabilitas Bulanan (Win Rate & Rata-rata Return) ---
+def month_end_closes(df: pd.DataFrame) -> pd.Series:
+    """Close terakhir tiap bulan kalender (index = akhir bulan); bulan berjalan ikut sebagai nilai sementara."""
+    return df["Close"].resample("ME").last().dropna()
+
+
+def monthly_returns(df: pd.DataFrame) -> pd.Series:
+    """Return bulanan dari Close akhir bulan (dipakai compute_seasonality dan seasonality_cube)."""
+    return month_end_closes(df).pct_change().dropna()
+
+
+@memo.memoize
 def compute_seasonality(df: pd.DataFrame, min_years: int = 5) -> dict:
     """
     Analisis musiman: monthly returns, rata-rata return per bulan (Jan-Des),
@@ -113,9 +217,7 @@ def compute_seasonality(df: pd.DataFrame, min_years: int = 5) -> dict:
             "heatmap_df": None,
             "years": [],
         }
-    # Resample ke bulanan: ambil Close terakhir tiap bulan
-    close = df["Close"].resample("ME").last().dropna()
-    monthly_ret = close.pct_change().dropna()
+    monthly_ret = monthly_returns(df)
     if monthly_ret.empty:
         return {
             "monthly_returns": None,
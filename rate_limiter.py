@@ -0,0 +1,168 @@
+"""
+Rate Limiter: pembatas laju adaptif (token bucket) untuk semua panggilan keluar ke Yahoo Finance.
+- Jalur sehat tanpa jeda: selama token tersedia (burst _CAPACITY, isi ulang _MAX_RATE per detik)
+  acquire() langsung kembali; tidak ada time.sleep tetap seperti sebelumnya.
+- Saat gagal: laju dipotong setengah dan retry memakai exponential backoff dengan jitter;
+  setiap sukses memulihkan laju sedikit demi sedikit sampai _MAX_RATE lagi.
+- state() untuk observasi: token tersisa, laju saat ini, antrean (pemanggil yang menunggu), kegagalan beruntun.
+- call() juga melewati circuit_breaker: saat upstream diputus, CircuitOpenError langsung dilempar (tanpa retry).
+- yfinance melaporkan simbol tidak dikenal/delisting (dan rate limit pada download batch) dengan DataFrame kosong,
+  bukan exception: call(..., validate=non_empty) melempar EmptyResultError ke pemanggil. Untuk satu simbol,
+  Yahoo tetap menjawab, jadi tidak dihitung gangguan provider (ticker salah ketik tidak membuka circuit breaker
+  untuk semua pengguna); batch banyak simbol yang kosong dihitung gagal dengan empty_is_failure=True.
+Pemakaian: rate_limiter.call(fn, *args, retries=3, validate=non_empty, **kwargs) atau
+acquire()/report_success()/report_failure().
+"""
+import random
+import threading
+import time
+
+import circuit_breaker
+
+# Token bucket per provider: kapasitas burst dan laju isi ulang (token/detik) saat sehat / minimum saat gangguan
+_CAPACITY = 20.0
+_MAX_RATE = 8.0
+_MIN_RATE = 0.5
+# Pemulihan laju per sukses (aditif) dan backoff retry: base * 2^(percobaan) dengan jitter, dibatasi _BACKOFF_MAX_SEC
+_RECOVER_STEP = 0.5
+_BACKOFF_BASE_SEC = 0.5
+_BACKOFF_MAX_SEC = 20.0
+
+
+class EmptyResultError(ValueError):
+    """Hasil fn ditolak validate (mis. DataFrame kosong dari yfinance)."""
+
+
+def non_empty(result) -> bool:
+    """Validator call(): hasil bukan None dan tidak kosong (DataFrame/Series/dict/list)."""
+    if result is None:
+        return False
+    empty = getattr(result, "empty", None)
+    if empty is not None:
+        return not empty
+    try:
+        return len(result) > 0
+    except TypeError:
+        return True
+
+
+class _Bucket:
+    __slots__ = ("lock", "tokens", "rate", "updated", "waiting", "failures", "calls", "errors")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.tokens = _CAPACITY
+        self.rate = _MAX_RATE
+        self.updated = time.monotonic()
+        self.waiting = 0
+        self.failures = 0
+        self.calls = 0
+        self.errors = 0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(_CAPACITY, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+_BUCKETS = {}
+_BUCKETS_LOCK = threading.Lock()
+
+
+def _bucket(provider: str) -> _Bucket:
+    with _BUCKETS_LOCK:
+        b = _BUCKETS.get(provider)
+        if b is None:
+            b = _BUCKETS[provider] = _Bucket()
+        return b
+
+
+def acquire(provider: str = "yahoo") -> float:
+    """Ambil satu token (blok sampai tersedia). Return lama menunggu (detik); 0 di jalur sehat."""
+    b = _bucket(provider)
+    waited = 0.0
+    with b.lock:
+        b.waiting += 1
+    try:
+        while True:
+            with b.lock:
+                now = time.monotonic()
+                b._refill(now)
+                if b.tokens >= 1.0:
+                    b.tokens -= 1.0
+                    b.calls += 1
+                    return waited
+                pause = (1.0 - b.tokens) / b.rate
+            time.sleep(pause)
+            waited += pause
+    finally:
+        with b.lock:
+            b.waiting -= 1
+
+
+def report_success(provider: str = "yahoo") -> None:
+    b = _bucket(provider)
+    with b.lock:
+        b.failures = 0
+        b.rate = min(_MAX_RATE, b.rate + _RECOVER_STEP)
+
+
+def report_failure(provider: str = "yahoo") -> None:
+    b = _bucket(provider)
+    with b.lock:
+        b.failures += 1
+        b.errors += 1
+        b.rate = max(_MIN_RATE, b.rate / 2)
+
+
+def backoff_delay(attempt: int) -> float:
+    """Jeda sebelum retry ke-attempt (0-based): full jitter dalam [0, base * 2^attempt], maks _BACKOFF_MAX_SEC."""
+    return random.uniform(0, min(_BACKOFF_MAX_SEC, _BACKOFF_BASE_SEC * (2 ** attempt)))
+
+
+def call(fn, *args, retries: int = 1, provider: str = "yahoo", validate=None, empty_is_failure: bool = False, **kwargs):
+    """
+    Jalankan fn(*args, **kwargs) di bawah limiter. Exception dihitung sebagai kegagalan dan di-retry
+    (maks retries percobaan total) dengan backoff berjitter; exception terakhir diteruskan ke pemanggil.
+    validate(result) -> False (mis. non_empty untuk DataFrame kosong) melempar EmptyResultError. Default hasil
+    ditolak dihitung jawaban sah (sukses, tanpa retry: simbol memang tidak ada); empty_is_failure=True
+    (download batch banyak simbol) menghitungnya kegagalan seperti exception.
+    Jika circuit breaker provider sedang open, langsung lempar circuit_breaker.CircuitOpenError.
+    """
+    for attempt in range(max(retries, 1)):
+        if not circuit_breaker.allow(provider):
+            raise circuit_breaker.CircuitOpenError(provider)
+        acquire(provider)
+        try:
+            result = fn(*args, **kwargs)
+            rejected = validate is not None and not validate(result)
+            if rejected and empty_is_failure:
+                raise EmptyResultError(getattr(fn, "__name__", "call"))
+        except Exception:
+            report_failure(provider)
+            circuit_breaker.record_failure(provider)
+            if attempt >= retries - 1 or circuit_breaker.is_open(provider):
+                raise
+            time.sleep(backoff_delay(attempt))
+            continue
+        report_success(provider)
+        circuit_breaker.record_success(provider)
+        if rejected:
+            # Yahoo menjawab, hanya simbolnya tanpa data: bukan gangguan provider
+            raise EmptyResultError(getattr(fn, "__name__", "call"))
+        return result
+
+
+def state(provider: str = "yahoo") -> dict:
+    """Kondisi limiter: tokens, rate (token/detik), queue_depth, consecutive_failures, calls, errors."""
+    b = _bucket(provider)
+    with b.lock:
+        b._refill(time.monotonic())
+        return {
+            "tokens": round(b.tokens, 2),
+            "rate": b.rate,
+            "max_rate": _MAX_RATE,
+            "queue_depth": b.waiting,
+            "consecutive_failures": b.failures,
+            "calls": b.calls,
+            "errors": b.errors,
+        }
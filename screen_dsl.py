@@ -0,0 +1,376 @@
+"""
+Screen DSL: bahasa ekspresi kecil untuk screen saham buatan pengguna, dikompilasi ke operasi vektor di panel
+universe (lihat market_scanner.build_panel). Contoh:
+    close > ma(200) and rsi(14) between 40 and 65
+    bars >= 21 and volume >= 1.2 * avg_volume(20) and close > open
+- Operator: + - * /, perbandingan (> >= < <= == !=), `x between a and b` (inklusif), and / or / not, kurung.
+- Nama (nilai di bar terakhir tiap ticker): open, high, low, close, volume, prev_close, vwap (Typical Price
+  (H+L+C)/3, proxy VWAP harian), bars (jumlah bar ticker).
+- Fungsi: ma/sma(n), ema(n), rsi(n=14), macd(fast=12, slow=26, signal=9), macd_signal(...), atr(n=14),
+  avg_volume(n=20) (rata-rata n bar sebelum bar terakhir), highest(n) / lowest(n) (Close n bar terakhir),
+  change(n=1) (% perubahan Close n bar), bb_upper(n=20, k=2), bb_lower(n=20, k=2).
+- Setiap ekspresi dikompilasi menjadi pohon node (tuple); node yang sama dari screen mana pun dihitung sekali
+  per Evaluator, jadi banyak screen aktif berbagi indikator (mis. rsi(14) hanya dihitung satu kali).
+NaN (data belum cukup) membuat perbandingan tidak diketahui: bernilai False dan tetap False di bawah `not`
+(logika tiga nilai), sehingga ticker tersebut tidak lolos.
+"""
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import indicators
+
+
+class ScreenSyntaxError(ValueError):
+    """Ekspresi screen tidak valid (token, sintaks, nama/fungsi tidak dikenal, atau tipe tidak cocok)."""
+
+
+_FIELDS = {"open", "high", "low", "close", "volume", "prev_close", "vwap", "bars"}
+
+# nama fungsi -> (argumen default, jumlah argumen minimum)
+_FUNCTIONS = {
+    "ma": ((), 1),
+    "sma": ((), 1),
+    "ema": ((), 1),
+    "rsi": ((14,), 0),
+    "macd": ((12, 26, 9), 0),
+    "macd_signal": ((12, 26, 9), 0),
+    "atr": ((14,), 0),
+    "avg_volume": ((20,), 0),
+    "highest": ((), 1),
+    "lowest": ((), 1),
+    "change": ((1,), 0),
+    "bb_upper": ((20, 2), 0),
+    "bb_lower": ((20, 2), 0),
+}
+_MAX_ARGS = {"ma": 1, "sma": 1, "ema": 1, "highest": 1, "lowest": 1}
+
+_TOKEN = re.compile(r"\s*(?:(\d+(?:\.\d*)?|\.\d+)|([A-Za-z_][A-Za-z0-9_]*)|(>=|<=|==|!=|[<>+\-*/(),]))")
+_KEYWORDS = {"and", "or", "not", "between"}
+_COMPARE = {">", ">=", "<", "<=", "==", "!="}
+_TOKEN_LABEL = {"num": "angka", "name": "nama/fungsi", "op": "operator", "kw": "kata kunci"}
+
+
+def _tokenize(text: str) -> list:
+    tokens, pos = [], 0
+    text = text.strip()
+    while pos < len(text):
+        m = _TOKEN.match(text, pos)
+        if not m or m.end() == pos:
+            raise ScreenSyntaxError(f"karakter tidak dikenal di posisi {pos}: {text[pos:pos + 10]!r}")
+        num, name, op = m.groups()
+        if num is not None:
+            tokens.append(("num", float(num)))
+        elif name is not None:
+            low = name.lower()
+            tokens.append(("kw", low) if low in _KEYWORDS else ("name", low))
+        else:
+            tokens.append(("op", op))
+        pos = m.end()
+    return tokens
+
+
+class _Parser:
+    """Recursive descent; setiap node = (tipe, ...) dengan tipe hasil "num" atau "bool" di _kind."""
+
+    def __init__(self, text: str):
+        self.tokens = _tokenize(text)
+        self.i = 0
+
+    def _peek(self, kind=None, value=None) -> bool:
+        if self.i >= len(self.tokens):
+            return False
+        k, v = self.tokens[self.i]
+        return (kind is None or k == kind) and (value is None or v == value)
+
+    def _take(self, kind=None, value=None):
+        if not self._peek(kind, value):
+            got = self.tokens[self.i][1] if self.i < len(self.tokens) else "akhir ekspresi"
+            raise ScreenSyntaxError(f"diharapkan {value or _TOKEN_LABEL.get(kind, kind)}, ditemukan {got!r}")
+        self.i += 1
+        return self.tokens[self.i - 1][1]
+
+    def parse(self):
+        node = self._or()
+        if self.i != len(self.tokens):
+            raise ScreenSyntaxError(f"token berlebih: {self.tokens[self.i][1]!r}")
+        return _expect(node, "bool")
+
+    def _or(self):
+        node = self._and()
+        while self._peek("kw", "or"):
+            self._take()
+            node = ("or", _expect(node, "bool"), _expect(self._and(), "bool"))
+        return node
+
+    def _and(self):
+        node = self._not()
+        while self._peek("kw", "and"):
+            self._take()
+            node = ("and", _expect(node, "bool"), _expect(self._not(), "bool"))
+        return node
+
+    def _not(self):
+        if self._peek("kw", "not"):
+            self._take()
+            return ("not", _expect(self._not(), "bool"))
+        return self._compare()
+
+    def _compare(self):
+        left = self._sum()
+        if self._peek("kw", "between"):
+            self._take()
+            low = self._sum()
+            self._take("kw", "and")
+            high = self._sum()
+            return ("between", _expect(left, "num"), _expect(low, "num"), _expect(high, "num"))
+        if self._peek("op") and self.tokens[self.i][1] in _COMPARE:
+            op = self._take()
+            return ("cmp", op, _expect(left, "num"), _expect(self._sum(), "num"))
+        return left
+
+    def _sum(self):
+        node = self._term()
+        while self._peek("op", "+") or self._peek("op", "-"):
+            op = self._take()
+            node = ("arith", op, _expect(node, "num"), _expect(self._term(), "num"))
+        return node
+
+    def _term(self):
+        node = self._unary()
+        while self._peek("op", "*") or self._peek("op", "/"):
+            op = self._take()
+            node = ("arith", op, _expect(node, "num"), _expect(self._unary(), "num"))
+        return node
+
+    def _unary(self):
+        if self._peek("op", "-"):
+            self._take()
+            return ("arith", "*", ("const", -1.0), _expect(self._unary(), "num"))
+        return self._atom()
+
+    def _atom(self):
+        if self._peek("num"):
+            return ("const", self._take())
+        if self._peek("op", "("):
+            self._take()
+            node = self._or()
+            self._take("op", ")")
+            return node
+        name = self._take("name")
+        if self._peek("op", "("):
+            self._take()
+            args = []
+            while not self._peek("op", ")"):
+                if args:
+                    self._take("op", ",")
+                args.append(self._take("num"))
+            self._take("op", ")")
+            return _call(name, args)
+        if name not in _FIELDS:
+            raise ScreenSyntaxError(f"nama tidak dikenal: {name!r}")
+        return ("field", name)
+
+
+def _call(name: str, args: list) -> tuple:
+    if name not in _FUNCTIONS:
+        raise ScreenSyntaxError(f"fungsi tidak dikenal: {name}()")
+    defaults, required = _FUNCTIONS[name]
+    limit = _MAX_ARGS.get(name, len(defaults))
+    if not required <= len(args) <= limit:
+        expected = f"{limit}" if required == limit else f"{required}-{limit}"
+        raise ScreenSyntaxError(f"{name}() menerima {expected} argumen, diberikan {len(args)}")
+    args = list(args) + list(defaults[len(args):])
+    windows = args if name not in ("bb_upper", "bb_lower") else args[:1]
+    if any(a < 1 or a != int(a) for a in windows):
+        raise ScreenSyntaxError(f"{name}(): periode harus bilangan bulat >= 1")
+    name = "ma" if name == "sma" else name
+    return ("call", name, tuple(int(a) if a == int(a) else a for a in args))
+
+
+def _kind(node) -> str:
+    return "bool" if node[0] in ("or", "and", "not", "between", "cmp") else "num"
+
+
+def _expect(node, kind: str):
+    if _kind(node) != kind:
+        what = "kondisi (perbandingan)" if kind == "bool" else "angka"
+        raise ScreenSyntaxError(f"diharapkan {what}, ditemukan {_render(node)}")
+    return node
+
+
+def _render(node) -> str:
+    if node[0] == "const":
+        return f"{node[1]:g}"
+    if node[0] == "field":
+        return node[1]
+    if node[0] == "call":
+        return f"{node[1]}({', '.join(f'{a:g}' for a in node[2])})"
+    return node[0]
+
+
+class Screen:
+    """Screen terkompilasi: teks asli dan pohon node (tuple, bisa di-hash untuk berbagi subekspresi)."""
+
+    __slots__ = ("text", "node")
+
+    def __init__(self, text: str, node: tuple):
+        self.text = text
+        self.node = node
+
+    def __repr__(self) -> str:
+        return f"Screen({self.text!r})"
+
+
+def compile_screen(text: str) -> Screen:
+    """Kompilasi teks ekspresi menjadi Screen. ScreenSyntaxError jika tidak valid."""
+    if not text or not text.strip():
+        raise ScreenSyntaxError("ekspresi kosong")
+    return Screen(text.strip(), _Parser(text).parse())
+
+
+# Jumlah node yang nilainya disimpan per Evaluator (LRU); Evaluator dipakai bersama lintas rerun dan sesi
+_MAX_CACHED_NODES = 256
+
+
+class Evaluator:
+    """
+    Evaluasi node di atas satu panel (dict dari build_panel). Nilai tiap node (vektor satu nilai per ticker,
+    di bar terakhir ticker itu) disimpan (LRU _MAX_CACHED_NODES), jadi subekspresi yang sama antar screen
+    hanya dihitung sekali.
+    """
+
+    def __init__(self, panel: dict):
+        self.panel = panel
+        self._valid = ~np.isnan(panel["Close"])
+        self.last = self._valid.sum(axis=0) - 1
+        self.cols = np.arange(len(panel["tickers"]))
+        self._rows = {}
+        # node -> (nilai, mask ticker yang nilainya diketahui / None untuk angka); urutan = LRU
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _series(self, field: str) -> np.ndarray:
+        """
+        Field panel dalam urutan bar milik tiap ticker (indicators.compact_rows): tanggal tanpa bar ticker itu
+        dibuang, jadi indikator sama dengan dihitung per ticker. Baris self.last = bar terakhir tiap ticker.
+        """
+        hit = self._rows.get(field)
+        if hit is None:
+            hit = self._rows[field] = indicators.compact_rows(self.panel[field], self._valid)[0]
+        return hit
+
+    def _at_last(self, values: np.ndarray, offset: int = 0) -> np.ndarray:
+        rows = self.last - offset
+        out = values[np.maximum(rows, 0), self.cols]
+        return np.where(rows >= 0, out, np.nan)
+
+    def _field(self, name: str) -> np.ndarray:
+        p = self.panel
+        if name == "bars":
+            return p["rows"].astype(float)
+        if name == "prev_close":
+            return self._at_last(self._series("Close"), 1)
+        if name == "vwap":
+            h, l, c = (self._at_last(self._series(f)) for f in ("High", "Low", "Close"))
+            return np.where(np.isnan(h) | np.isnan(l), c, (h + l + c) / 3)
+        return self._at_last(self._series(name.capitalize()))
+
+    def _function(self, name: str, args: tuple) -> np.ndarray:
+        close = self._series("Close")
+        if name == "ma":
+            return self._at_last(indicators.sma(close, args[0]))
+        if name == "ema":
+            return self._at_last(indicators.ema(close, args[0]))
+        if name == "rsi":
+            return self._at_last(indicators.rsi(close, args[0]))
+        if name in ("macd", "macd_signal"):
+            line, signal = indicators.macd(close, *args)
+            return self._at_last(line if name == "macd" else signal)
+        if name == "atr":
+            return self._at_last(indicators.atr(self._series("High"), self._series("Low"), close, args[0]))
+        if name == "avg_volume":
+            return self._at_last(indicators.sma(self._series("Volume"), args[0], min_periods=1), 1)
+        if name in ("highest", "lowest"):
+            roll = pd.DataFrame(close).rolling(args[0], min_periods=1)
+            return self._at_last((roll.max() if name == "highest" else roll.min()).to_numpy())
+        if name == "change":
+            now, before = self._at_last(close), self._at_last(close, args[0])
+            with np.errstate(invalid="ignore", divide="ignore"):
+                return np.where(before > 0, (now / before - 1) * 100, np.nan)
+        if name in ("bb_upper", "bb_lower"):
+            _, upper, lower = indicators.bollinger(close, args[0], args[1])
+            return self._at_last(upper if name == "bb_upper" else lower)
+        raise ScreenSyntaxError(f"fungsi tidak dikenal: {name}()")
+
+    def value(self, node) -> np.ndarray:
+        """Vektor nilai node (float untuk angka, bool untuk kondisi), satu elemen per ticker panel."""
+        if isinstance(node, Screen):
+            node = node.node
+        return self._eval(node)[0]
+
+    def _eval(self, node):
+        """(nilai, known) node; known = mask ticker yang kondisinya diketahui (operand tidak NaN), None untuk angka."""
+        with self._lock:
+            hit = self._cache.get(node)
+            if hit is not None:
+                self._cache.move_to_end(node)
+                return hit
+        op = node[0]
+        known = None
+        with np.errstate(invalid="ignore", divide="ignore"):
+            if op == "const":
+                out = np.full(len(self.cols), node[1])
+            elif op == "field":
+                out = self._field(node[1])
+            elif op == "call":
+                out = self._function(node[1], node[2])
+            elif op == "arith":
+                a, b = self.value(node[2]), self.value(node[3])
+                out = {"+": np.add, "-": np.subtract, "*": np.multiply, "/": np.divide}[node[1]](a, b)
+            elif op == "cmp":
+                a, b = self.value(node[2]), self.value(node[3])
+                out = {">": np.greater, ">=": np.greater_equal, "<": np.less, "<=": np.less_equal,
+                       "==": np.equal, "!=": np.not_equal}[node[1]](a, b)
+                known = ~np.isnan(a) & ~np.isnan(b)
+            elif op == "between":
+                x, lo, hi = self.value(node[1]), self.value(node[2]), self.value(node[3])
+                out = (x >= lo) & (x <= hi)
+                known = ~np.isnan(x) & ~np.isnan(lo) & ~np.isnan(hi)
+            elif op == "and":
+                (a, ka), (b, kb) = self._eval(node[1]), self._eval(node[2])
+                out = a & b
+                # Logika tiga nilai: False pasti jika salah satu operand pasti False
+                known = (ka & kb) | (ka & ~a) | (kb & ~b)
+            elif op == "or":
+                (a, ka), (b, kb) = self._eval(node[1]), self._eval(node[2])
+                out = a | b
+                known = (ka & kb) | a | b
+            else:  # not: kondisi yang tidak diketahui (NaN) tetap tidak lolos
+                a, ka = self._eval(node[1])
+                out = ~a & ka
+                known = ka
+        entry = (out, known)
+        with self._lock:
+            self._cache[node] = entry
+            self._cache.move_to_end(node)
+            while len(self._cache) > _MAX_CACHED_NODES:
+                self._cache.popitem(last=False)
+        return entry
+
+    def mask(self, screen) -> np.ndarray:
+        """Mask boolean ticker yang lolos screen (Screen atau teks)."""
+        if isinstance(screen, str):
+            screen = compile_screen(screen)
+        return self.value(screen.node)
+
+
+# Kriteria bawaan scanner dalam DSL (setara screen_day_trade / screen_swing / screen_invest), juga contoh untuk UI
+PRESETS = {
+    "day_trade": "bars >= 21 and volume >= 1.2 * avg_volume(20) and avg_volume(20) > 0 and close > open and close > vwap",
+    "swing": "bars >= 35 and close > ma(20) and rsi(14) between 40 and 65 and macd() > macd_signal()",
+    "invest": "bars >= 200 and close > ma(200) and (1 - close / highest(252)) * 100 between 5 and 15",
+}
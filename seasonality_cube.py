@@ -0,0 +1,229 @@
+"""
+Seasonality Cube: return bulanan (ticker x tahun x bulan) untuk seluruh universe dalam satu array.
+- compute_seasonality menghitung satu ticker per panggilan (resample + pivot 10 tahun data). Cube menyimpan
+  return bulanan semua ticker sekaligus sebagai float32 (NaN = tidak ada data), sehingga pertanyaan lintas
+  saham ("win rate tertinggi bulan depan di LQ45") cukup dijawab dengan reduksi array (lihat scan()).
+- Hanya bulan yang sudah selesai yang masuk cube. update() incremental: setelah akhir bulan hanya bulan baru
+  yang dihitung dari Close akhir bulan riwayat 1 tahun; ticker baru di universe dihitung dari riwayat penuh.
+  Jika tertinggal lebih dari _INCREMENTAL_MAX_MONTHS bulan (atau rebuild=True), cube dibangun ulang.
+- Disimpan ringkas di cache_dir("seasonality")/<universe>.npz; cache_warmer memperbaruinya setelah penutupan.
+- get_cube/scan tidak pernah membangun cube di thread UI: cache dingin atau tertinggal memicu update() di
+  background (satu thread per universe); selama belum ada cube, scan() kosong dan building() bernilai True.
+"""
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+import history_store
+import single_flight
+from market_scanner import TICKERS_PRIORITAS, UNIVERSE_CHUNK_SIZE, _UNIVERSE_WORKERS, _jk_list, load_universe
+from quant_engine import month_end_closes
+from utils import cache_dir
+
+_TZ = "Asia/Jakarta"
+_INCREMENTAL_MAX_MONTHS = 6
+
+# universe -> (mtime file, cube) agar file tidak dibaca ulang setiap scan
+_CUBES = {}
+_CUBES_LOCK = threading.Lock()
+
+# universe yang sedang diperbarui di background (lihat _update_in_background)
+_BUILDING = set()
+
+
+def _path(universe: str) -> str:
+    return os.path.join(cache_dir("seasonality"), f"{universe}.npz")
+
+
+def _last_complete_month() -> pd.Period:
+    return pd.Timestamp.now(tz=_TZ).tz_localize(None).to_period("M") - 1
+
+
+def _universe_tickers(universe: str) -> list:
+    return _jk_list(load_universe()[0] if universe == "all" else TICKERS_PRIORITAS)
+
+
+def _month_end_convert(df: pd.DataFrame, period: str) -> pd.Series:
+    """Konversi per chunk untuk get_many_chunked: riwayat -> Close akhir bulan (ringkas)."""
+    return month_end_closes(history_store.slice_period(df, period))
+
+
+def _fetch_closes(tickers: list, period: str) -> dict:
+    if not tickers:
+        return {}
+    closes, _ = history_store.get_many_chunked(
+        tickers, period=period, chunk_size=UNIVERSE_CHUNK_SIZE, workers=_UNIVERSE_WORKERS, convert=_month_end_convert
+    )
+    return closes
+
+
+def _fill(returns: np.ndarray, year0: int, row: int, closes: pd.Series, after: pd.Period, through: pd.Period) -> None:
+    """Isi returns[row] dengan return bulan (after, through] dari Close akhir bulan (after=None: semua)."""
+    index = closes.index.tz_localize(None) if closes.index.tz is not None else closes.index
+    months = index.to_period("M")
+    ret = closes.pct_change()
+    keep = (months <= through) & ret.notna().to_numpy() & (months.year >= year0)
+    if after is not None:
+        keep &= months > after
+    if keep.any():
+        returns[row, months.year[keep] - year0, months.month[keep] - 1] = ret.to_numpy()[keep]
+
+
+def _build(tickers: list, through: pd.Period) -> dict:
+    closes = _fetch_closes(tickers, "max")
+    tickers = [t for t in tickers if t in closes]
+    first = min((c.index[0].year for c in closes.values()), default=through.year)
+    years = np.arange(first, through.year + 1)
+    returns = np.full((len(tickers), len(years), 12), np.nan, dtype=np.float32)
+    for i, t in enumerate(tickers):
+        _fill(returns, first, i, closes[t], None, through)
+    return {"tickers": np.array(tickers), "years": years, "returns": returns, "through": through}
+
+
+def _extend(cube: dict, tickers: list, through: pd.Period) -> dict:
+    """Tambah bulan (cube.through, through] untuk ticker lama dan riwayat penuh untuk ticker baru."""
+    known = {t: i for i, t in enumerate(cube["tickers"].tolist())}
+    recent = _fetch_closes([t for t in tickers if t in known], "1y")
+    fresh = _fetch_closes([t for t in tickers if t not in known], "max")
+    tickers = [t for t in tickers if t in known or t in fresh]
+    rows = [known.get(t, -1) for t in tickers]
+    year0 = int(cube["years"][0])
+    years = np.arange(year0, max(through.year, int(cube["years"][-1])) + 1)
+    old = cube["returns"]
+    returns = np.full((len(tickers), len(years), 12), np.nan, dtype=np.float32)
+    for i, r in enumerate(rows):
+        if r >= 0:
+            returns[i, :old.shape[1]] = old[r]
+    for i, (t, r) in enumerate(zip(tickers, rows)):
+        if r >= 0 and t in recent:
+            _fill(returns, year0, i, recent[t], cube["through"], through)
+        elif t in fresh:
+            # Bulan sebelum tahun pertama cube tidak disimpan (di luar sumbu tahun)
+            _fill(returns, year0, i, fresh[t], None, through)
+    return {"tickers": np.array(tickers), "years": years, "returns": returns, "through": through}
+
+
+def _save(universe: str, cube: dict) -> None:
+    path = _path(universe)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            np.savez_compressed(
+                f, tickers=cube["tickers"], years=cube["years"], returns=cube["returns"],
+                through=np.array(str(cube["through"])),
+            )
+        os.replace(tmp, path)
+    except Exception:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+
+
+def load(universe: str = "prioritas"):
+    """Cube tersimpan {"tickers", "years", "returns" (float32 ticker x tahun x 12), "through"} atau None."""
+    path = _path(universe)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    with _CUBES_LOCK:
+        hit = _CUBES.get(universe)
+    if hit is not None and hit[0] == mtime:
+        return hit[1]
+    try:
+        with np.load(path, allow_pickle=False) as z:
+            cube = {
+                "tickers": z["tickers"], "years": z["years"], "returns": z["returns"],
+                "through": pd.Period(str(z["through"]), freq="M"),
+            }
+    except Exception:
+        return None
+    with _CUBES_LOCK:
+        _CUBES[universe] = (mtime, cube)
+    return cube
+
+
+def _update(universe: str, rebuild: bool) -> dict:
+    through = _last_complete_month()
+    tickers = _universe_tickers(universe)
+    cube = None if rebuild else load(universe)
+    if cube is not None and cube["through"] == through and set(tickers) <= set(cube["tickers"].tolist()):
+        return cube
+    if cube is None or (through - cube["through"]).n > _INCREMENTAL_MAX_MONTHS or cube["through"] > through:
+        cube = _build(tickers, through)
+    else:
+        cube = _extend(cube, tickers, through)
+    _save(universe, cube)
+    return cube
+
+
+def update(universe: str = "prioritas", rebuild: bool = False) -> dict:
+    """Perbarui cube sampai bulan terakhir yang sudah selesai (incremental bila memungkinkan) dan simpan."""
+    return single_flight.run(("seasonality_cube", universe, rebuild), _update, universe, rebuild)
+
+
+def _update_in_background(universe: str) -> None:
+    with _CUBES_LOCK:
+        if universe in _BUILDING:
+            return
+        _BUILDING.add(universe)
+
+    def _job():
+        try:
+            update(universe)
+        except Exception:
+            pass
+        finally:
+            with _CUBES_LOCK:
+                _BUILDING.discard(universe)
+
+    threading.Thread(target=_job, name=f"seasonality-cube-{universe}", daemon=True).start()
+
+
+def building(universe: str = "prioritas") -> bool:
+    """True selama update() background untuk universe masih berjalan."""
+    with _CUBES_LOCK:
+        return universe in _BUILDING
+
+
+def get_cube(universe: str = "prioritas"):
+    """
+    Cube tersimpan tanpa menunggu download: jika belum ada (None) atau tertinggal dari bulan terakhir yang
+    selesai, update() dijalankan di background dan cube lama (atau None) dikembalikan seketika.
+    """
+    cube = load(universe)
+    if cube is None or cube["through"] < _last_complete_month():
+        _update_in_background(universe)
+    return cube
+
+
+def scan(month: int = None, universe: str = "prioritas", tickers: list = None, top: int = 10, min_years: int = 5) -> list:
+    """
+    Saham dengan win rate (% tahun positif) tertinggi untuk bulan `month` (1-12, default bulan depan WIB),
+    seri diurutkan dengan rata-rata return. tickers membatasi kandidat (mis. market_scanner.LQ45).
+    Hanya ticker dengan minimal min_years tahun data bulan itu. Return list dict ticker, month, win_rate,
+    avg_return_pct, years; kosong selama cube pertama masih dibangun (lihat building()).
+    """
+    if month is None:
+        month = (pd.Timestamp.now(tz=_TZ).month % 12) + 1
+    cube = get_cube(universe)
+    if cube is None or not len(cube["tickers"]):
+        return []
+    r = cube["returns"][:, :, month - 1]
+    years = (~np.isnan(r)).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        win_rate = (r > 0).sum(axis=1) / years * 100
+        avg = np.nansum(r, axis=1) / years * 100
+    ok = years >= min_years
+    if tickers is not None:
+        ok &= np.isin(cube["tickers"], _jk_list(tickers))
+    idx = np.flatnonzero(ok)
+    order = idx[np.lexsort((-avg[idx], -win_rate[idx]))][:top]
+    return [
+        {"ticker": str(cube["tickers"][i]), "month": month, "win_rate": float(win_rate[i]),
+         "avg_return_pct": float(avg[i]), "years": int(years[i])}
+        for i in order
+    ]
@@ -0,0 +1,94 @@
+"""
+Single Flight: penggabungan request identik yang berjalan bersamaan (request coalescing) dalam satu proses.
+- Jika beberapa sesi Streamlit memanggil fungsi yang sama dengan argumen yang sama saat cache masih dingin,
+  hanya satu pemanggil yang benar-benar fetch ke Yahoo; sisanya menunggu dan memakai hasil yang sama.
+- Error dari fetch juga dibagikan ke semua penunggu (tidak ada retry beruntun dari tiap sesi).
+- stats() melaporkan berapa pemanggil yang digabung, total dan per fungsi.
+Pemakaian: pasang @coalesce tepat di bawah @st.cache_data, atau panggil run(key, fn, *args) langsung.
+"""
+import functools
+import threading
+
+_LOCK = threading.Lock()
+
+# key -> _Call yang sedang berjalan
+_INFLIGHT = {}
+
+# nama fungsi -> {"calls", "executed", "coalesced"}
+_STATS = {}
+
+
+class _Call:
+    __slots__ = ("event", "result", "error", "waiters")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+def _bump(name: str, field: str) -> None:
+    s = _STATS.setdefault(name, {"calls": 0, "executed": 0, "coalesced": 0})
+    s[field] += 1
+
+
+def run(key, fn, *args, **kwargs):
+    """
+    Jalankan fn(*args, **kwargs) untuk key, kecuali sudah ada pemanggilan key yang sama sedang berjalan:
+    dalam hal itu tunggu hasilnya dan kembalikan hasil (atau error) yang sama.
+    """
+    name = getattr(fn, "__qualname__", str(fn))
+    with _LOCK:
+        _bump(name, "calls")
+        call = _INFLIGHT.get(key)
+        leader = call is None
+        if leader:
+            call = _Call()
+            _INFLIGHT[key] = call
+        else:
+            call.waiters += 1
+            _bump(name, "coalesced")
+
+    if not leader:
+        call.event.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    try:
+        call.result = fn(*args, **kwargs)
+        return call.result
+    except BaseException as e:
+        call.error = e
+        raise
+    finally:
+        with _LOCK:
+            _INFLIGHT.pop(key, None)
+            _bump(name, "executed")
+        call.event.set()
+
+
+def coalesce(fn):
+    """Decorator: pemanggilan bersamaan dengan argumen sama (hashable) digabung menjadi satu eksekusi."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        key = (fn.__module__, fn.__qualname__, args, tuple(sorted(kwargs.items())))
+        try:
+            hash(key)
+        except TypeError:
+            return fn(*args, **kwargs)
+        return run(key, fn, *args, **kwargs)
+    return wrapper
+
+
+def stats() -> dict:
+    """
+    Statistik penggabungan: {"calls", "executed", "coalesced", "in_flight", "by_function": {...}}.
+    coalesced = jumlah pemanggil yang tidak fetch sendiri karena menumpang request yang sedang berjalan.
+    """
+    with _LOCK:
+        by_fn = {k: dict(v) for k, v in _STATS.items()}
+        in_flight = len(_INFLIGHT)
+    total = {f: sum(v[f] for v in by_fn.values()) for f in ("calls", "executed", "coalesced")}
+    return {**total, "in_flight": in_flight, "by_function": by_fn}
@@ -2,6 +2,7 @@
 Helper functions: format angka IDR, tanggal, dan utilitas umum.
 Digunakan di seluruh IDX-Pro Insight Terminal.
 """
+import os
 from datetime import datetime
 from typing import Union
 
@@ -47,3 +48,15 @@ def format_pct(value: Union[int, float], decimals: int = 2) -> str:
         return f"{float(value) * 100:.{decimals}f}%"
     except (TypeError, ValueError):
         return "-"
+
+
+def cache_dir(name: str = "") -> str:
+    """
+    Direktori cache lokal di disk (dibuat otomatis jika belum ada).
+    Root: env IDX_CACHE_DIR, default folder .cache di samping aplikasi.
+    Contoh: cache_dir("history") -> ".../.cache/history"
+    """
+    root = os.environ.get("IDX_CACHE_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+    path = os.path.join(root, name) if name else root
+    os.makedirs(path, exist_ok=True)
+    return path